@@ -1,7 +1,17 @@
+import importlib
+
 from mayo.cli import meta
-from mayo import task
-from mayo import override
-from mayo import objects
 
-__all__ = [task, override, objects]
+# these import TensorFlow, and are only loaded on first access, so that the
+# command line interface starts quickly
+__all__ = ['task', 'override', 'objects']
+
+
+def __getattr__(name):
+    if name not in __all__:
+        raise AttributeError(
+            'module {!r} has no attribute {!r}'.format(__name__, name))
+    return importlib.import_module('{}.{}'.format(__name__, name))
+
+
 locals().update(meta())
@@ -3,13 +3,12 @@ import sys
 import base64
 
 import yaml
-import tensorflow as tf
-
 from docopt import docopt
 
 from mayo.log import log
 from mayo.config import Config
-from mayo.session import Test, Evaluate, Train, Search, Profile
+from mayo.parse import load_yaml
+from mayo.util import import_from_string
 
 _root = os.path.dirname(__file__)
 
@@ -31,7 +30,7 @@ def _vigenere(key, string, decode=False):
 
 def meta():
     meta_file = os.path.join(_root, 'meta.yaml')
-    meta_dict = yaml.load(open(meta_file, 'r'))
+    meta_dict = load_yaml(meta_file)
     meta_dict['__root__'] = _root
     meta_dict['__executable__'] = os.path.basename(sys.argv[0])
     email = '__email__'
@@ -130,12 +129,14 @@ Arguments:
         'search',
     ]
 
+    # sessions import TensorFlow, and are only imported when needed
     _session_map = {
-        'train': Train,
-        'search': Search,
-        'test': Test,
-        'validate': Evaluate,
-        'profile': Profile,
+        'train': 'mayo.session.Train',
+        'search': 'mayo.session.Search',
+        'test': 'mayo.session.Test',
+        'validate': 'mayo.session.Evaluate',
+        'plot': 'mayo.session.Plotting',
+        'profile': 'mayo.session.Profile',
     }
     _keys_map = {
         'train': _train_keys,
@@ -143,6 +144,7 @@ Arguments:
         'profile': _train_keys,
         'test': _test_keys,
         'validate': _validate_keys,
+        'plot': _validate_keys,
     }
 
     def _get_session(self, action=None):
@@ -161,6 +163,7 @@ Arguments:
             keys += self._keys_map[action]
         except KeyError:
             raise TypeError('Action {!r} not recognized.'.format(action))
+        cls = import_from_string(cls)
         self._validate_config(keys, action)
         if not isinstance(self.session, cls):
             log.info('Starting a {} session...'.format(action))
@@ -170,6 +173,7 @@ Arguments:
     def cli_profile_timeline(self):
         """Performs training profiling to produce timeline.json.  """
         # TODO integrate this into Profile.
+        import tensorflow as tf
         from tensorflow.python.client import timeline
         options = tf.RunOptions(trace_level=tf.RunOptions.FULL_TRACE)
         run_metadata = tf.RunMetadata()
@@ -191,7 +195,7 @@ Arguments:
 
     def cli_plot(self):
         """Plots activation maps as images and parameters as histograms."""
-        return self._get_session('validate').plot()
+        return self._get_session('plot').plot()
 
     def cli_train(self):
         """Performs training.  """
@@ -207,16 +211,69 @@ Arguments:
 
     def cli_eval(self):
         """Evaluates the accuracy of a saved model.  """
+        shards = self.config.get('eval.shards', 1)
+        if shards > 1:
+            from mayo.session.eval import eval_sharded
+            keys = self._model_keys + self._dataset_keys
+            self._validate_config(keys + self._validate_keys, 'eval')
+            return eval_sharded(self.config, shards)
         return self._get_session('validate').eval()
 
     def cli_eval_all(self):
         """Evaluates all checkpoints for accuracy.  """
-        result = self._get_session('validate').eval_all()
+        workers = self.config.get('eval.workers', 1)
+        if workers > 1:
+            from mayo.session.eval import eval_all_parallel
+            keys = self._model_keys + self._dataset_keys
+            self._validate_config(keys + self._validate_keys, 'eval-all')
+            result = eval_all_parallel(self.config, workers)
+        else:
+            result = self._get_session('validate').eval_all()
+        if result is None:
+            log.error_exit('No checkpoints were evaluated.')
         file_name = 'eval_all.csv'
         with open(file_name, 'w') as f:
             f.write(result.csv())
         log.info(
             'Evaluation results saved in {!r}.'.format(file_name))
+        return result
+
+    def cli_eval_densities(self):
+        """Evaluates a gated model at multiple gate densities.  """
+        densities = self.config.get(
+            'eval.densities', [d / 10 for d in range(1, 11)])
+        result = self._get_session('validate').eval_densities(densities)
+        if result is None:
+            log.error_exit('No densities were evaluated.')
+        file_name = 'eval_densities.csv'
+        with open(file_name, 'w') as f:
+            f.write(result.csv())
+        log.info(
+            'Evaluation results saved in {!r}.'.format(file_name))
+        return result
+
+    def cli_sweep(self):
+        """Evaluates a grid of configuration and overrider values.  """
+        mode = self.config.get('sweep.mode', 'session')
+        if mode == 'pool':
+            from mayo.sweep import SweepPool
+            result = SweepPool(self.config, self.commands()).run()
+        elif mode == 'session':
+            from mayo.sweep import Sweep
+            tuner = None
+            if self.config.get('sweep.fine_tune'):
+                tuner = self._get_session('train')
+            session = self._get_session('validate')
+            result = Sweep(session, self.config, tuner).sweep()
+        else:
+            raise ValueError('Unrecognized sweep mode {!r}.'.format(mode))
+        if result is None:
+            log.error_exit('No sweep points were evaluated.')
+        file_name = 'sweep.csv'
+        with open(file_name, 'w') as f:
+            f.write(result.csv())
+        log.info('Sweep results saved in {!r}.'.format(file_name))
+        return result
 
     def cli_test(self):
         """Perform inference for custom test data.  """
@@ -250,6 +307,32 @@ Arguments:
             f.write(self.config.to_yaml())
         log.info('Config successfully exported to {!r}.'.format(name))
 
+    def cli_shrink(self):
+        """Removes pruned channels to produce a smaller model.  """
+        model = self._get_session('validate').shrink()
+        name = 'shrunk.yaml'
+        with open(name, 'w') as f:
+            yaml.dump({'model': model}, f, explicit_start=True, indent=4)
+        log.info(
+            'Shrunk model saved in {!r}, use it with '
+            '"system.checkpoint.load=shrunk".'.format(name))
+
+    def cli_export_sparse(self):
+        """Exports pruned weights in a compressed sparse format.  """
+        name = 'sparse.npz'
+        self._get_session('validate').export_sparse(name)
+        log.info(
+            'Use "system.sparse.load={}" to execute sparse layers with '
+            'weight densities below "system.sparse.threshold".'.format(name))
+
+    def cli_export_compressed(self):
+        """Exports quantized weights in a packed-integer container.  """
+        name = self.config.model.name + '.mpk'
+        self._get_session('validate').export_compressed(name)
+        log.info(
+            'Use "system.checkpoint.load={}" to load the container.'
+            .format(name))
+
     def cli_info(self):
         """Prints parameter and layer info of the model.  """
         plumbing = self.config.system.info.get('plumbing')
@@ -263,6 +346,20 @@ Arguments:
             for table in info.get('overriders', {}).values():
                 print(table.format())
 
+    def cli_static_info(self):
+        """Prints layer info estimated without instantiating the model.  """
+        from mayo.net.static import StaticNet
+        shape = self.config.dataset.task.preprocess.shape
+        batch_size = self.config.system.batch_size_per_gpu
+        inputs = {'input': (
+            batch_size, shape.height, shape.width, shape.channels)}
+        variables = self.config.system.info.get('variables')
+        if variables:
+            from mayo.net.numpy import load_variables
+            variables = load_variables(variables)
+        net = StaticNet(self.config.model, inputs, variables)
+        print(net.info()['layers'].format())
+
     def cli_interact(self):
         """Interacts with the train/eval session using iPython.  """
         self._get_session().interact()
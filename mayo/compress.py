@@ -0,0 +1,334 @@
+import os
+import json
+import struct
+import collections
+
+import numpy as np
+
+from mayo.log import log
+from mayo.util import Bits, Table
+
+
+class CompressError(Exception):
+    """Unable to read or write a packed-integer container.  """
+
+
+_magic = b'MAYOPACK'
+_version = 1
+# magic, version, header length
+_preamble = struct.Struct('<8sHI')
+# align payloads to 8 bytes
+_alignment = 8
+suffix = '.mpk'
+
+
+def _container(width):
+    """The smallest little-endian unsigned type that holds `width` bits.  """
+    for dtype in (np.uint8, np.uint16, np.uint32, np.uint64):
+        if width <= 8 * np.dtype(dtype).itemsize:
+            return np.dtype(dtype).newbyteorder('<')
+    raise CompressError('Unable to pack {}-bit codes.'.format(width))
+
+
+def _groups(width):
+    # every 8 codes of `width` bits take exactly `width` bytes, the j-th
+    # code in a group starts at a constant byte and bit offset, and lies
+    # in a window of bytes within the group, assembled in the smallest type
+    # holding it
+    span = (width + 7 + 7) // 8
+    if span > 8:
+        raise CompressError('Unable to pack {}-bit codes.'.format(width))
+    window = _container(8 * span).type
+    for j in range(8):
+        start = j * width
+        end = (start + width - 1) // 8
+        yield start // 8, np.uint8(start % 8), window, end - start // 8 + 1
+
+
+def pack_bits(codes, width):
+    """
+    Packs unsigned integer `codes` into bytes of `width`-bit words, least
+    significant bit first.  Codes with byte-sized widths are stored as
+    little-endian integers.
+    """
+    dtype = _container(width)
+    codes = codes.astype(dtype).ravel()
+    if width == 8 * dtype.itemsize:
+        return np.frombuffer(codes.tobytes(), dtype=np.uint8)
+    size = codes.size
+    codes = np.concatenate([codes, np.zeros(-size % 8, dtype=dtype)])
+    codes = codes.reshape(-1, 8)
+    data = np.zeros((codes.shape[0], width), dtype=np.uint8)
+    for j, (byte, shift, window, span) in enumerate(_groups(width)):
+        value = codes[:, j].astype(window) << window(shift)
+        for k in range(span):
+            data[:, byte + k] |= (value >> window(8 * k)).astype(np.uint8)
+    return data.ravel()[:(size * width + 7) // 8]
+
+
+def unpack_bits(data, width, size):
+    """Unpacks `size` codes of `width` bits from bytes in `data`.  """
+    dtype = _container(width)
+    if width == 8 * dtype.itemsize:
+        codes = np.frombuffer(data, dtype=dtype, count=size)
+        return codes.astype(dtype.type)
+    groups = (size + 7) // 8
+    data = np.frombuffer(data, dtype=np.uint8)[:groups * width]
+    padded = np.zeros(groups * width, dtype=np.uint8)
+    padded[:data.size] = data
+    padded = padded.reshape(groups, width)
+    codes = np.empty((groups, 8), dtype=dtype)
+    mask = (1 << width) - 1
+    for j, (byte, shift, window, span) in enumerate(_groups(width)):
+        value = padded[:, byte].astype(window)
+        for k in range(1, span):
+            value |= padded[:, byte + k].astype(window) << window(8 * k)
+        codes[:, j] = (value >> window(shift)) & window(mask)
+    return codes.ravel()[:size]
+
+
+def encode_fixed(value, width, point):
+    # quantized values are integer multiples of 2 ** (point - width)
+    codes = np.round(value * 2.0 ** (width - point)).astype(np.int64)
+    return codes + 2 ** (width - 1), width
+
+
+def decode_fixed(codes, shape, width, point):
+    codes = codes.astype(np.int64) - 2 ** (width - 1)
+    return (codes * 2.0 ** (point - width)).reshape(shape)
+
+
+def encode_shift(value, width, exponent_bias):
+    # zero, or a sign bit and a biased exponent
+    nonzero = value != 0
+    exponent = np.log2(np.abs(np.where(nonzero, value, 1)))
+    exponent = np.round(exponent).astype(np.int64) + exponent_bias
+    codes = 1 + exponent + (value < 0) * 2 ** width
+    return np.where(nonzero, codes, 0), width + 2
+
+
+def decode_shift(codes, shape, width, exponent_bias):
+    codes = codes.astype(np.int64)
+    sign = np.where(codes > 2 ** width, -1.0, 1.0)
+    exponent = (codes - 1) % 2 ** width - exponent_bias
+    value = np.where(codes == 0, 0.0, sign * 2.0 ** exponent)
+    return value.reshape(shape)
+
+
+def encode_ternary(value, base, scale):
+    return np.sign(value).astype(np.int64) % 3, 2
+
+
+def decode_ternary(codes, shape, base, scale):
+    sign = np.where(codes == 2, -1, codes.astype(np.int64))
+    return sign.reshape(shape) * 2.0 ** base * np.asarray(scale)
+
+
+_codecs = {
+    'fixed': (encode_fixed, decode_fixed),
+    'shift': (encode_shift, decode_shift),
+    'ternary': (encode_ternary, decode_ternary),
+}
+
+
+def _decode(entry, data):
+    payload = data[entry['offset']:entry['offset'] + entry['nbytes']]
+    shape = tuple(entry['shape'])
+    codec = entry['codec']
+    if codec == 'raw':
+        return np.frombuffer(payload, dtype=entry['dtype']).reshape(shape)
+    size = int(np.prod(shape))
+    codes = unpack_bits(payload, entry['bits'], size)
+    _, decode = _codecs[codec]
+    value = decode(codes, shape, **entry['params'])
+    return value.astype(entry['dtype'])
+
+
+def _read(path):
+    with open(path, 'rb') as f:
+        data = f.read()
+    magic, version, length = _preamble.unpack_from(data)
+    if magic != _magic:
+        raise CompressError(
+            '{!r} is not a packed-integer container.'.format(path))
+    if version != _version:
+        raise CompressError(
+            'Unsupported container version {} in {!r}.'.format(version, path))
+    start = _preamble.size
+    header = json.loads(data[start:start + length].decode('utf-8'))
+    data = np.frombuffer(data, dtype=np.uint8, offset=header['offset'])
+    return header, data
+
+
+def load(path):
+    """Loads a mapping of variable names to decoded values.  """
+    header, data = _read(path)
+    values = collections.OrderedDict()
+    for entry in header['tensors']:
+        values[entry['name']] = _decode(entry, data)
+    return values
+
+
+def load_codes(path):
+    """
+    Loads a mapping of variable names to their unpacked integer codes, and the
+    header entries describing the codecs, for integer inference engines.
+    """
+    header, data = _read(path)
+    codes = collections.OrderedDict()
+    for entry in header['tensors']:
+        if entry['codec'] == 'raw':
+            codes[entry['name']] = (_decode(entry, data), entry)
+            continue
+        payload = data[entry['offset']:entry['offset'] + entry['nbytes']]
+        size = int(np.prod(entry['shape']))
+        value = unpack_bits(payload, entry['bits'], size)
+        codes[entry['name']] = (value.reshape(entry['shape']), entry)
+    return codes
+
+
+def save(path, entries):
+    """
+    Writes a container, `entries` is a list of (header entry, payload) pairs.
+    """
+    tensors = []
+    payloads = []
+    offset = 0
+    for entry, payload in entries:
+        payload = payload.tobytes()
+        padding = -len(payload) % _alignment
+        tensors.append(dict(entry, offset=offset, nbytes=len(payload)))
+        payloads.append(payload + b'\0' * padding)
+        offset += len(payload) + padding
+    header = {'tensors': tensors, 'offset': 0}
+    # header offset is self-referential, iterate until stable
+    while True:
+        raw_header = json.dumps(header).encode('utf-8')
+        size = _preamble.size + len(raw_header)
+        payload_offset = size + (-size % _alignment)
+        if header['offset'] == payload_offset:
+            break
+        header['offset'] = payload_offset
+    with open(path, 'wb') as f:
+        f.write(_preamble.pack(_magic, _version, len(raw_header)))
+        f.write(raw_header)
+        f.write(b'\0' * (payload_offset - size))
+        for payload in payloads:
+            f.write(payload)
+
+
+def _quantizer_types():
+    # overriders import TensorFlow, which loading containers does not need
+    from mayo.override.quantize.fixed import FixedPointQuantizer
+    from mayo.override.quantize.float import ShiftQuantizer
+    from mayo.override.quantize.ternary import TernaryQuantizer
+    return FixedPointQuantizer, ShiftQuantizer, TernaryQuantizer
+
+
+class Compress(object):
+    """
+    Exports variables in a packed-integer container, where quantized
+    variables are stored as bit-packed integer codes derived from their
+    quantizer hyperparameters, and the remaining variables are stored
+    verbatim.
+    """
+    def __init__(self, session, config):
+        super().__init__()
+        self.session = session
+        self.config = config
+        self.net = session.task.nets[0]
+
+    @staticmethod
+    def _quantizer(overrider):
+        # chains of overriders are sequences
+        if isinstance(overrider, collections.Sequence):
+            overriders = list(overrider)
+        else:
+            overriders = [overrider]
+        # the last quantizer determines the representation
+        types = _quantizer_types()
+        for o in reversed(overriders):
+            if isinstance(o, types):
+                return o
+
+    def _codec(self, quantizer):
+        FixedPointQuantizer, ShiftQuantizer, TernaryQuantizer = \
+            _quantizer_types()
+        if isinstance(quantizer, FixedPointQuantizer):
+            info = quantizer.info()
+            if info.width > 32:
+                return None
+            return 'fixed', {'width': info.width, 'point': info.point}
+        if isinstance(quantizer, ShiftQuantizer):
+            info = quantizer.info()
+            return 'shift', {
+                'width': info.width, 'exponent_bias': info.exponent_bias}
+        if isinstance(quantizer, TernaryQuantizer):
+            base, scale = self.session.run([quantizer.base, quantizer.scale])
+            return 'ternary', {'base': int(base), 'scale': scale.tolist()}
+        return None
+
+    def _quantized(self):
+        quantized = {}
+        for overriders in self.net.overriders.values():
+            for key, o in overriders.items():
+                if key == 'gradient':
+                    continue
+                quantizer = self._quantizer(o)
+                if quantizer is None:
+                    continue
+                codec = self._codec(quantizer)
+                if codec is None:
+                    continue
+                quantized[o.before.op.name] = (o.after, codec)
+        return quantized
+
+    def _entries(self):
+        quantized = self._quantized()
+        variables = {v.op.name: v for v in self.session.global_variables()}
+        tensors = dict(variables)
+        # overridden variables are stored as overrider outputs
+        quantized = {n: q for n, q in quantized.items() if n in variables}
+        tensors.update({n: t for n, (t, _) in quantized.items()})
+        values = self.session.run(tensors)
+        for name in sorted(values):
+            value = np.asarray(values[name])
+            entry = {
+                'name': name, 'shape': list(value.shape),
+                'dtype': value.dtype.str, 'codec': 'raw',
+            }
+            if name in quantized:
+                codec, params = quantized[name][1]
+                encode, decode = _codecs[codec]
+                codes, bits = encode(value, **params)
+                if np.all(decode(codes, value.shape, **params) == value):
+                    entry.update(codec=codec, params=params, bits=bits)
+                    yield entry, pack_bits(codes, bits)
+                    continue
+                log.warn(
+                    'Values of {!r} are not representable with {!r} codec '
+                    'using {}, storing them verbatim.'
+                    .format(name, codec, params))
+            yield entry, np.ascontiguousarray(value)
+
+    def _info(self, entries):
+        table = Table(['variable', 'codec', 'bits', 'original', 'packed'])
+        for entry, payload in entries:
+            itemsize = np.dtype(entry['dtype']).itemsize
+            original = 8 * np.prod(entry['shape']) * itemsize
+            table.add_row((
+                entry['name'], entry['codec'], entry.get('bits', ''),
+                Bits(max(original, 8)), Bits(max(8 * payload.nbytes, 8))))
+        return table
+
+    def export(self, path):
+        entries = list(self._entries())
+        print(self._info(entries).format())
+        save(path, entries)
+        original = sum(
+            np.prod(e['shape']) * np.dtype(e['dtype']).itemsize
+            for e, _ in entries)
+        ratio = original / os.path.getsize(path)
+        log.info(
+            'Packed-integer container saved to {!r}, compression ratio '
+            '{:.2f}x.'.format(path, ratio))
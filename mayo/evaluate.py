@@ -0,0 +1,102 @@
+import os
+import json
+import hashlib
+
+import yaml
+
+from mayo.log import log
+from mayo.util import Table, Percent
+
+
+def percent_stats(stats):
+    """Re-wraps metrics in `stats`, stored as plain floats, as `Percent`.  """
+    return {
+        k: v if k == 'epoch' else Percent(v) for k, v in stats.items()}
+
+
+class EvalCache(object):
+    """
+    Evaluation results of checkpoints, kept in "eval_all.json" alongside
+    them.  Results are keyed by the hashes of the checkpoint index file,
+    which holds checksums of all saved tensors, and of the unresolved
+    configuration mapping `config`, excluding `system`, `eval` and `sweep`
+    settings.
+    """
+    file_name = 'eval_all.json'
+    _ignored_keys = ['system', 'eval', 'sweep']
+
+    def __init__(self, config, checkpoint):
+        super().__init__()
+        self.checkpoint = checkpoint
+        self.path = os.path.join(checkpoint.directory(), self.file_name)
+        config = {
+            k: v for k, v in config.items() if k not in self._ignored_keys}
+        config = yaml.dump(config).encode('utf-8')
+        self._config_hash = hashlib.sha1(config).hexdigest()
+        try:
+            with open(self.path, 'r') as f:
+                self._results = json.load(f)
+        except FileNotFoundError:
+            self._results = {}
+        except ValueError:
+            log.warn(
+                'Ignoring corrupted evaluation cache {!r}.'.format(self.path))
+            self._results = {}
+
+    def _key(self, epoch):
+        digest = hashlib.sha1(self._config_hash.encode('utf-8'))
+        with open(self.checkpoint.index_file(epoch), 'rb') as f:
+            digest.update(f.read())
+        return digest.hexdigest()
+
+    def get(self, epoch):
+        stats = self._results.get(self._key(epoch))
+        if stats is None:
+            return None
+        return percent_stats(dict(stats, epoch=epoch))
+
+    def set(self, epoch, stats):
+        self._results[self._key(epoch)] = dict(stats, epoch=epoch)
+        temp = '{}.{}.tmp'.format(self.path, os.getpid())
+        try:
+            with open(temp, 'w') as f:
+                json.dump(self._results, f, indent=4, sort_keys=True)
+            os.replace(temp, self.path)
+        except OSError as e:
+            log.warn(
+                'Unable to save evaluation cache {!r}: {}'
+                .format(self.path, e))
+
+
+def eval_range(config, epochs):
+    """Filters `epochs` with the range specified in "eval.range".  """
+    eval_range = config.get('eval.range', {})
+    from_epoch = eval_range.get('from', 0)
+    to_epoch = eval_range.get('to', -1)
+    step = eval_range.get('step', 1)
+    for e in epochs[::step]:
+        if e < from_epoch:
+            continue
+        if to_epoch > 0 and e > to_epoch:
+            continue
+        yield e
+
+
+def shard_size(num_examples, num_shards, index):
+    """
+    The number of records in the `index`-th of `num_shards` shards, where
+    a shard takes every `num_shards`-th record starting from `index`.
+    """
+    return (num_examples - index + num_shards - 1) // num_shards
+
+
+def eval_table(epochs, results):
+    table = None
+    for e in epochs:
+        stats = results.get(e)
+        if stats is None:
+            continue
+        stats = {k: v for k, v in stats.items() if k != 'epoch'}
+        table = table or Table(['epoch'] + list(sorted(stats)))
+        table.add_row(dict({'epoch': e}, **stats))
+    return table
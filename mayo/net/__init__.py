@@ -1,4 +1,14 @@
-from mayo.net.tf import TFNet
+import importlib
 
 
-__all__ = [TFNet]
+# `TFNet` imports TensorFlow, and is only loaded on first access, so that
+# the TensorFlow-free networks, e.g. `mayo.net.static.StaticNet`, can be
+# used without it
+__all__ = ['TFNet']
+
+
+def __getattr__(name):
+    if name not in __all__:
+        raise AttributeError(
+            'module {!r} has no attribute {!r}'.format(__name__, name))
+    return importlib.import_module('mayo.net.tf').TFNet
@@ -1,6 +1,8 @@
 import collections
 
-from mayo.util import object_from_params
+import networkx as nx
+
+from mayo.util import Table, memoize_property, object_from_params, unknown
 from mayo.net.graph import Graph, TensorNode, LayerNode, SplitNode, JoinNode
 
 
@@ -12,12 +14,15 @@ class NetBase(object):
         self._instantiate()
 
     def _init_graph(self, model, inputs):
-        self._graph = Graph(model)
+        self._graph = self._build_graph(model)
         # initialize inputs
         input_nodes = self._graph.input_nodes()
         for n in input_nodes:
             self._tensors[n] = inputs[n.name]
 
+    def _build_graph(self, model):
+        return Graph(model)
+
     def inputs(self):
         return {n.name: self._tensors[n] for n in self._graph.input_nodes()}
 
@@ -34,8 +39,16 @@ class NetBase(object):
     def info(self):
         return {}
 
+    @memoize_property
+    def _input_nodes(self):
+        return set(self._graph.input_nodes())
+
+    @memoize_property
+    def _topological_order(self):
+        return list(self._graph.topological_order())
+
     def _get_analyzer(self, analyzer_map, node):
-        if node in self._graph.input_nodes():
+        if node in self._input_nodes:
             func = analyzer_map.get('input')
         else:
             func = analyzer_map.get(type(node))
@@ -52,7 +65,7 @@ class NetBase(object):
 
     def _node_analysis(self, node, analyzer_map, info):
         analyzer = self._get_analyzer(analyzer_map, node)
-        if node in self._graph.input_nodes():
+        if node in self._input_nodes:
             info[node] = analyzer(node, info.get(node, {}))
             return
         pred_nodes = node.predecessors
@@ -93,30 +106,95 @@ class NetBase(object):
         else:
             raise TypeError('Unexpected node type {!r}.'.format(node))
 
-    def dataflow_analysis(self, analyzer_map, info=None):
+    def dataflow_analysis(self, analyzer_map, info=None, nodes=None):
+        """
+        Propagates `info` through the graph in topological order with
+        `analyzer_map`.  If `nodes` is specified, only these nodes are
+        analyzed, and `info` must hold the results of their predecessors.
+        """
         info = info or {}
-        for node in self._graph.topological_order():
-            self._node_analysis(node, analyzer_map, info)
+        for node in self._topological_order:
+            if nodes is None or node in nodes:
+                self._node_analysis(node, analyzer_map, info)
         return info
 
     def _instantiate(self):
+        # shapes and estimates of previous instantiations are stale
+        self._shapes = None
+        self._estimates = {}
         func_map = {'layer': self._instantiate_layer}
         self._tensors = self.dataflow_analysis(func_map, self._tensors)
 
+    def _unified_shapes(self):
+        if self._shapes is None:
+            self._shapes = self.shapes(unified=True)
+        return self._shapes
+
     def _instantiate_layer(self, node, tensors):
         func, params = object_from_params(node.params, self, 'instantiate_')
         # instantiation
         return func(node, tensors, params)
 
-    def estimate(self):
-        func_map = {'layer': self._estimate_layer}
-        return self.dataflow_analysis(func_map)
-
-    def _estimate_layer(self, node, in_info):
-        shapes = self.shapes(unified=True)
+    def estimate(self, changed=None):
+        """
+        Estimates layer statistics.  Results are memoized, so that only
+        `changed` nodes and nodes downstream of them are re-estimated, e.g.
+        when their hyperparameters or overriders are updated.  All nodes
+        are re-estimated if `changed` is not specified.
+        """
+        if changed is None:
+            self._estimates = {}
+        for node in changed or ():
+            self._estimates.pop(node, None)
+            for each in nx.descendants(self._graph.nx_graph, node):
+                self._estimates.pop(each, None)
+        stale = set(self._topological_order) - set(self._estimates)
+        if stale:
+            self._prepare_estimate(stale)
+            func_map = {'layer': self._estimate_layer}
+            self._estimates = self.dataflow_analysis(
+                func_map, self._estimates, stale)
+        return dict(self._estimates)
+
+    def _prepare_estimate(self, nodes):
+        """Override this method to prepare for estimating `nodes`.  """
+
+    def _layer_info(self):
+        stats = self.estimate()
+        keys = set()
+        for node, stat in stats.items():
+            if isinstance(stat, list):
+                for each in stat:
+                    keys |= set(each)
+            elif isinstance(stat, dict):
+                keys |= set(stat)
+            else:
+                raise TypeError('Unrecognized type.')
+        keys = sorted(k for k in keys if not k.startswith('_'))
+        layer_info = Table(['layer', 'shape'] + keys)
+        for node, shape in self.shapes(unified=False).items():
+            if isinstance(node, LayerNode):
+                values = stats.get(node, {})
+                values = tuple(values.get(k, unknown) for k in keys)
+            else:
+                values = tuple([unknown] * len(keys))
+            layer_info.add_row((node.formatted_name(), shape) + values)
+        layer_info.footer_sum('macs')
+        layer_info.footer_sum('mem_weights')
+        layer_info.footer_sum('mem_activation')
+        # layer_info.footer_sum('alu_moves')
+        # layer_info.footer_sum('offcache_moves')
+        # layer_info.footer_max('optimal_cache')
+        return layer_info
+
+    def _layer_shapes(self, node):
+        shapes = self._unified_shapes()
         in_shape = [shapes[p] for p in node.predecessors]
         in_shape = in_shape[0] if len(in_shape) == 1 else in_shape
-        out_shape = shapes[node]
+        return in_shape, shapes[node]
+
+    def _estimate_layer(self, node, in_info):
+        in_shape, out_shape = self._layer_shapes(node)
         try:
             func, params = object_from_params(node.params, self, 'estimate_')
         except NotImplementedError:
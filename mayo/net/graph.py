@@ -1,15 +1,22 @@
+import os
 import re
+import pickle
 import pprint
+import hashlib
 import weakref
-import itertools
 import collections
 
 import networkx as nx
 
+from mayo.log import log
 from mayo.util import ensure_list, recursive_apply
 from mayo.parse import ArithTag, _DotDict
 
 
+_kwarg_regex = re.compile(
+    r'\^\(([_a-zA-Z][_a-zA-Z0-9\.]*)\)', re.MULTILINE)
+
+
 def _replace_module_kwargs(params):
     kwargs = params.get('kwargs', {})
     replace_map = {
@@ -17,9 +24,10 @@ def _replace_module_kwargs(params):
         for key, default_value in kwargs.items()}
 
     def replace_str(value):
-        regex = r'\^\(([_a-zA-Z][_a-zA-Z0-9\.]*)\)'
+        if '^(' not in value:
+            return value
         while True:
-            keys = re.findall(regex, value, re.MULTILINE)
+            keys = _kwarg_regex.findall(value)
             if not keys:
                 break
             for k in keys:
@@ -61,26 +69,44 @@ def _replace_module_kwargs(params):
 
 
 class NodeBase(object):
-    def __init__(self, name, module, graph):
+    """
+    A node in the DAG graph, identified by its class, name and module path.
+
+    Nodes are hashed on every lookup in the many node-keyed dictionaries
+    used for analysis, so the hash is computed once on construction.  Once
+    the graph is built, `id` holds the index of the node in the
+    topological order of the graph.
+    """
+    __slots__ = ('name', 'module', 'graph', 'id', '_hash')
+
+    def __init__(self, name, module, graph=None):
         super().__init__()
         self.name = name
         self.module = tuple(module)
-        self.graph = weakref.ref(graph)
+        self.graph = None if graph is None else weakref.ref(graph)
+        self.id = None
+        self._hash = hash(self._eq_key())
 
     def __getstate__(self):
         return {
             'name': self.name,
             'module': self.module,
             'graph': None,
+            'id': self.id,
         }
 
+    def __setstate__(self, state):
+        for key, value in state.items():
+            setattr(self, key, value)
+        self._hash = hash(self._eq_key())
+
     @property
     def predecessors(self):
-        return list(self.graph().nx_graph.predecessors(self))
+        return self.graph().predecessors(self)
 
     @property
     def successors(self):
-        return list(self.graph().nx_graph.successors(self))
+        return self.graph().successors(self)
 
     def formatted_name(self):
         return '{}/{}'.format('/'.join(self.module), self.name)
@@ -89,11 +115,15 @@ class NodeBase(object):
         return (self.__class__, self.name, self.module)
 
     def __hash__(self):
-        return hash(self._eq_key())
+        return self._hash
 
     def __eq__(self, other):
+        if self is other:
+            return True
         if self.__class__ is not other.__class__:
             return False
+        if self._hash != other._hash:
+            return False
         return self._eq_key() == other._eq_key()
 
     def __repr__(self):
@@ -103,27 +133,51 @@ class NodeBase(object):
 
 class TensorNode(NodeBase):
     """ A tensor-specifying node.  """
+    __slots__ = ()
 
 
 class LayerNode(NodeBase):
     """ A layer-specifying node.  """
-    def __init__(self, name, params, module, graph):
+    __slots__ = ('params', )
+
+    def __init__(self, name, params, module, graph=None):
         super().__init__(name, module, graph)
         self.params = params
 
+    def __getstate__(self):
+        state = super().__getstate__()
+        params = self.params
+        if isinstance(params, _DotDict):
+            # views of the configuration cannot be pickled, we store
+            # the resolved parameters instead
+            params = params.asdict()
+        state['params'] = params
+        return state
+
+    def __setstate__(self, state):
+        params = state.pop('params')
+        if isinstance(params, collections.Mapping):
+            params = _DotDict(params, normalize=False)
+        super().__setstate__(state)
+        self.params = params
+
 
 class MultiNodeBase(NodeBase):
-    def __init__(self, nodes, module, graph):
+    __slots__ = ()
+
+    def __init__(self, nodes, module, graph=None):
         name = '{{{}}}'.format(', '.join(nodes))
         super().__init__(name, module, graph)
 
 
 class JoinNode(MultiNodeBase):
     """ A node to concat input nodes.  """
+    __slots__ = ()
 
 
 class SplitNode(MultiNodeBase):
     """ A node to split input nodes.  """
+    __slots__ = ()
 
 
 class GraphError(Exception):
@@ -149,12 +203,27 @@ class Graph(object):
         self.nx_graph = nx.OrderedMultiDiGraph()
         self._input_names = inputs = model.get('inputs', 'input')
         self._output_names = outputs = model.get('outputs', 'output')
+        self._order = self._adjacency = None
+        self._nodes = {}
         self._add_module(inputs, outputs, model['name'], model, [])
         self._optimize()
         self._validate()
-        # import pdb; pdb.set_trace()
+        self._freeze()
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        for node in self.nx_graph.nodes():
+            node.graph = weakref.ref(self)
+
+    def _intern(self, node):
+        # equal nodes are created repeatedly during construction, we keep
+        # the first one, so that the graph refers to a single object for
+        # each node
+        return self._nodes.setdefault(node, node)
 
     def add_edge(self, from_node, to_node):
+        self._order = self._adjacency = None
+        from_node, to_node = self._intern(from_node), self._intern(to_node)
         self.nx_graph.add_edge(from_node, to_node)
         if from_node == to_node:
             raise ValueError('Self-loop is not allowed.')
@@ -181,8 +250,20 @@ class Graph(object):
         return nx.has_path(self.nx_graph, from_node, to_node)
 
     def remove_node(self, node):
+        self._order = self._adjacency = None
+        self._nodes.pop(node, None)
         return self.nx_graph.remove_node(node)
 
+    def predecessors(self, node):
+        if self._adjacency is None:
+            return tuple(self.nx_graph.predecessors(node))
+        return self._adjacency[node][0]
+
+    def successors(self, node):
+        if self._adjacency is None:
+            return tuple(self.nx_graph.successors(node))
+        return self._adjacency[node][1]
+
     def _filter_nodes(self, func):
         return [n for n in self.nodes() if func(n)]
 
@@ -193,7 +274,13 @@ class Graph(object):
         return self._filter_nodes(lambda n: isinstance(n, LayerNode))
 
     def topological_order(self):
-        return nx.topological_sort(self.nx_graph)
+        if self._order is None:
+            return tuple(nx.topological_sort(self.nx_graph))
+        return self._order
+
+    def node(self, index):
+        """ Returns the node with the integer id `index`.  """
+        return self._order[index]
 
     def _add_module(
             self, from_names, to_names,
@@ -286,37 +373,53 @@ class Graph(object):
                 self.add_edge(split_node, each_node)
 
     def _optimize(self):
-        while True:
-            changed = self._optimize_propagation()
-            if not changed:
-                return
-
-    def _optimize_propagation(self):
-        changed = False
-        # remove redundant tensor nodes from graph
-        for node in list(self.nodes()):
-            if not isinstance(node, TensorNode):
-                continue
-            preds = node.predecessors
-            succs = node.successors
-            if not (len(preds) == len(succs) == 1):
-                continue
-            changed = True
-            # remove current node as it is redundant
-            self.remove_node(node)
-            self.add_edge(preds[0], succs[0])
-        # remove nodes not connected to output
-        output_nodes = self.output_nodes()
+        self._remove_disconnected()
+        self._remove_redundant()
+
+    def _remove_disconnected(self):
+        # remove nodes not connected to output, with a single reverse
+        # reachability sweep from the outputs
+        connected = set()
+        for o in self.output_nodes():
+            connected.add(o)
+            connected |= nx.ancestors(self.nx_graph, o)
         for node in list(self.nodes()):
-            if not any(self.has_path(node, o) for o in output_nodes):
+            if node not in connected:
                 self.remove_node(node)
-        return changed
+
+    def _remove_redundant(self):
+        # remove redundant tensor nodes from graph, a removal can only make
+        # its neighbours redundant, so we revisit them afterwards
+        nodes = list(self.nodes())
+        while nodes:
+            neighbors = collections.OrderedDict()
+            for node in nodes:
+                if not isinstance(node, TensorNode):
+                    continue
+                if node not in self.nx_graph:
+                    continue
+                preds = node.predecessors
+                succs = node.successors
+                if not (len(preds) == len(succs) == 1):
+                    continue
+                # remove current node as it is redundant
+                self.remove_node(node)
+                self.add_edge(preds[0], succs[0])
+                neighbors[preds[0]] = neighbors[succs[0]] = None
+            nodes = list(neighbors)
 
     def _ensure_connection(self, from_nodes, to_nodes):
-        iterator = itertools.product(
-            ensure_list(from_nodes), ensure_list(to_nodes))
-        for i, o in iterator:
-            if not any(nx.all_simple_paths(self.nx_graph, i, o)):
+        to_nodes = ensure_list(to_nodes)
+        for i in ensure_list(from_nodes):
+            # breadth-first search until all outputs are reached
+            unreached = set(to_nodes)
+            for _, node in nx.bfs_edges(self.nx_graph, i):
+                unreached.discard(node)
+                if not unreached:
+                    break
+            for o in to_nodes:
+                if o not in unreached:
+                    continue
                 undirected = self.nx_graph.to_undirected()
                 subgraphs = pprint.pformat(list(
                     nx.connected_components(undirected)))
@@ -327,11 +430,109 @@ class Graph(object):
 
     def _validate(self):
         # graph is acyclic
-        cycles = nx.simple_cycles(self.nx_graph)
-        try:
-            cycle = next(cycles)
-        except StopIteration:
-            pass
-        else:
+        if not nx.is_directed_acyclic_graph(self.nx_graph):
+            cycle = [edge[0] for edge in nx.find_cycle(self.nx_graph)]
             raise GraphCyclicError(
                 'Graph is not acyclic, contains a cycle {}'.format(cycle))
+
+    def _freeze(self):
+        # the graph is no longer modified after construction, number nodes
+        # in topological order and snapshot their adjacencies, which would
+        # otherwise be rebuilt from the networkx graph on every access
+        self._order = tuple(nx.topological_sort(self.nx_graph))
+        adjacency = {}
+        for index, node in enumerate(self._order):
+            node.id = index
+            adjacency[node] = (
+                tuple(self.nx_graph.predecessors(node)),
+                tuple(self.nx_graph.successors(node)))
+        self._adjacency = adjacency
+
+
+# bump this to invalidate snapshots when graph construction changes
+_snapshot_version = 1
+# pickled graphs keyed by the hashes of their model descriptions
+_snapshots = {}
+
+
+def _model_hash(model):
+    root = model
+    if isinstance(model, _DotDict):
+        root = model._root
+        model = model.asdict(eval=False)
+    if isinstance(root, _DotDict):
+        root = root.asdict(eval=False)
+    # parameters of nodes can refer to anything in the configuration
+    content = pickle.dumps((_snapshot_version, model, root))
+    return hashlib.sha1(content).hexdigest()
+
+
+def _snapshot_file(path, key):
+    return os.path.join(path, '{}.graph'.format(key))
+
+
+def _load_snapshot(key, path):
+    snapshot = _snapshots.get(key)
+    if snapshot is None and path:
+        try:
+            with open(_snapshot_file(path, key), 'rb') as f:
+                snapshot = f.read()
+        except FileNotFoundError:
+            return None
+    if snapshot is None:
+        return None
+    try:
+        graph = pickle.loads(snapshot)
+    except Exception as e:
+        log.warn(
+            'Unable to restore graph snapshot {!r}, rebuilding: {}.'
+            .format(key, e))
+        return None
+    _snapshots[key] = snapshot
+    log.debug('Restored graph snapshot {!r}.'.format(key))
+    return graph
+
+
+def _save_snapshot(keys, snapshot, path):
+    for key in keys:
+        _snapshots[key] = snapshot
+        if not path:
+            continue
+        os.makedirs(path, exist_ok=True)
+        # write atomically, as other processes may read it concurrently
+        file_name = _snapshot_file(path, key)
+        temp_name = '{}.{}.tmp'.format(file_name, os.getpid())
+        with open(temp_name, 'wb') as f:
+            f.write(snapshot)
+        os.replace(temp_name, file_name)
+
+
+def cached_graph(model, path=None):
+    """
+    Returns the graph of `model`, restored from a snapshot of the graph
+    built earlier from the same configuration, either in the current
+    process or in the `path` directory if specified.  It falls back to
+    building the graph whenever a snapshot cannot be used.
+
+    Parameters of layer nodes in restored graphs are resolved, and do not
+    follow later changes in the configuration.
+    """
+    try:
+        key = _model_hash(model)
+    except (pickle.PicklingError, TypeError, AttributeError) as e:
+        log.debug('Unable to hash model description: {}.'.format(e))
+        return Graph(model)
+    graph = _load_snapshot(key, path)
+    if graph is not None:
+        return graph
+    graph = Graph(model)
+    try:
+        snapshot = pickle.dumps(graph)
+        # building a graph writes module parameters with their kwargs
+        # replaced to the configuration, which changes its hash
+        keys = {key, _model_hash(model)}
+    except Exception as e:
+        log.debug('Unable to snapshot graph: {}.'.format(e))
+        return graph
+    _save_snapshot(keys, snapshot, path)
+    return graph
@@ -0,0 +1,11 @@
+from mayo.net.numpy.base import NumPyNetError, load_variables
+from mayo.net.numpy.layers import Layers
+from mayo.net.numpy.hadamard import HadamardLayers
+from mayo.net.numpy.integer import IntegerNet
+
+
+class NumPyNet(Layers, HadamardLayers):
+    """ A class to collate all NumPy layer mixins.  """
+
+
+__all__ = [NumPyNet, IntegerNet, NumPyNetError, load_variables]
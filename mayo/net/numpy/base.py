@@ -0,0 +1,187 @@
+import math
+import collections
+
+import numpy as np
+
+from mayo.log import log
+from mayo.util import object_from_params, multi_objects_from_params
+from mayo.net.base import NetBase
+
+
+class NumPyNetError(Exception):
+    """Unable to run the network with NumPy.  """
+
+
+def load_variables(path):
+    """
+    Loads a mapping of variable names to values from a packed-integer
+    container (.mpk), a NumPy archive (.npz) or a TensorFlow checkpoint.
+    """
+    from mayo import compress
+    if path.endswith(compress.suffix):
+        return compress.load(path)
+    if path.endswith('.npz'):
+        with np.load(path) as data:
+            return {k: data[k] for k in data.files}
+    import tensorflow as tf
+    reader = tf.train.NewCheckpointReader(path)
+    return {
+        name: reader.get_tensor(name)
+        for name in reader.get_variable_to_shape_map()}
+
+
+def pad_same(size, kernel, stride):
+    """Paddings of a spatial dimension for TensorFlow's 'SAME' padding.  """
+    out_size = int(math.ceil(size / stride))
+    total = max((out_size - 1) * stride + kernel - size, 0)
+    return total // 2, total - total // 2
+
+
+def windows(tensor, kernel, stride):
+    """
+    A strided [N, H', W', K_h, K_w, C] view of sliding windows over an NHWC
+    tensor, without copying.
+    """
+    n, h, w, c = tensor.shape
+    (kh, kw), (sh, sw) = kernel, stride
+    out_shape = (n, (h - kh) // sh + 1, (w - kw) // sw + 1, kh, kw, c)
+    sn, sh_, sw_, sc = tensor.strides
+    strides = (sn, sh_ * sh, sw_ * sw, sh_, sw_, sc)
+    return np.lib.stride_tricks.as_strided(
+        tensor, out_shape, strides, writeable=False)
+
+
+class NumPyNetBase(NetBase):
+    """
+    Runs inference of the DAG graph with NumPy.
+
+    `variables` is a mapping from variable names in the TensorFlow graph to
+    their values, e.g. loaded with `load_variables()`.  Overriders described
+    in the model are applied in their NumPy form with their hyperparameters
+    taken from `variables` when available.
+    """
+    def __init__(self, model, inputs, variables):
+        self._variables = variables
+        self._overridden = {}
+        self._overriders = {}
+        super().__init__(model, inputs)
+
+    def run(self, inputs):
+        """Reuses the graph and overridden variables for new inputs.  """
+        self._tensors = collections.OrderedDict()
+        for n in self._graph.input_nodes():
+            self._tensors[n] = inputs[n.name]
+        self._instantiate()
+        return self.outputs()
+
+    def shapes(self, unified=True):
+        shapes = {}
+        for node, tensors in self._tensors.items():
+            if isinstance(tensors, collections.Sequence):
+                shapes[node] = [t.shape for t in tensors]
+            else:
+                shapes[node] = tensors.shape
+        return shapes
+
+    def _instantiate_layer(self, node, tensors):
+        try:
+            func, params = object_from_params(
+                node.params, self, 'instantiate_')
+        except NotImplementedError:
+            func = self.generic_instantiate
+            params = dict(node.params)
+        tensors = self.instantiate_numeric_padding(node, tensors, params)
+        log.debug(
+            'Running {!r} of type {!r}.'
+            .format(node.formatted_name(), node.params['type']))
+        return func(node, tensors, params)
+
+    def generic_instantiate(self, node, tensors, params):
+        raise NotImplementedError(
+            '{!r} does not know how to run layer with type {!r}.'
+            .format(self, node.params['type']))
+
+    def instantiate_numeric_padding(self, node, tensors, params):
+        pad = params.get('padding')
+        if pad is None:
+            return tensors
+        if isinstance(pad, str):
+            params['padding'] = pad.upper()
+            return tensors
+        if isinstance(pad, int):
+            paddings = [[0, 0], [pad, pad], [pad, pad], [0, 0]]
+        elif isinstance(pad, collections.Sequence):
+            pad_h, pad_w = pad
+            if isinstance(pad_h, int):
+                pad_h = [pad_h] * 2
+            if isinstance(pad_w, int):
+                pad_w = [pad_w] * 2
+            paddings = [[0, 0], pad_h, pad_w, [0, 0]]
+        else:
+            raise ValueError(
+                'We do not know what to do with a padding {!r}, we accept an '
+                'integer, a string or a sequence of height and width paddings '
+                '[pad_h, pad_w].'.format(pad))
+        # disable pad for next layer
+        params['padding'] = 'VALID'
+        if isinstance(tensors, collections.Sequence):
+            return [np.pad(t, paddings, 'constant') for t in tensors]
+        return np.pad(tensors, paddings, 'constant')
+
+    def _create_overriders(self, node, key):
+        try:
+            return self._overriders[node, key]
+        except KeyError:
+            pass
+        overriders = node.params.get('overrider', {}).get(key)
+        if overriders:
+            overriders = list(reversed(sorted(
+                overriders.values(), key=lambda p: p.get('_priority', 0))))
+            overriders = [
+                cls(session=None, **p)
+                for cls, p in multi_objects_from_params(overriders)]
+        self._overriders[node, key] = overriders = overriders or []
+        return overriders
+
+    def _apply_overrider(self, overrider, scope, value):
+        prefix = '{}/{}.'.format(scope, overrider.__class__.__name__)
+        for name, param in overrider.parameters.items():
+            saved = self._variables.get(prefix + name)
+            if saved is None:
+                saved = overrider._parameter_variables_assignment.get(name)
+            if saved is None:
+                saved = param.initial
+            if saved is None:
+                raise NumPyNetError(
+                    'Unable to find the value of overrider parameter {!r}.'
+                    .format(prefix + name))
+            overrider._parameter_variables[name] = np.asarray(saved)
+        if not overrider.enable:
+            return value
+        log.debug('Overriding {!r} with {!r}.'.format(scope, overrider))
+        return overrider._apply(value)
+
+    def override(self, node, key, value, scope=None):
+        """Applies overriders `overrider.<key>` of `node` on `value`.  """
+        scope = scope or '{}/{}'.format(node.formatted_name(), key)
+        for o in self._create_overriders(node, key):
+            value = self._apply_overrider(o, scope, value)
+        return value
+
+    def variable(self, node, name, default=None):
+        """Gets the value of a variable of `node` with overriders applied.  """
+        key = '{}/{}'.format(node.formatted_name(), name)
+        try:
+            return self._overridden[key]
+        except KeyError:
+            pass
+        value = self._variables.get(key)
+        if value is None:
+            return default
+        value = self.override(node, name, np.asarray(value), key)
+        self._overridden[key] = value
+        return value
+
+    def has_variable(self, node, name):
+        key = '{}/{}'.format(node.formatted_name(), name)
+        return key in self._variables
@@ -0,0 +1,71 @@
+import math
+
+import scipy.linalg
+import numpy as np
+
+
+def walsh_hadamard(value, block=1):
+    """
+    Fast Walsh-Hadamard transform on the last dimension of `value`, with the
+    same butterfly stages as its TensorFlow counterpart.
+    """
+    channels = value.shape[-1]
+    if not block:
+        return value @ scipy.linalg.hadamard(channels).astype(value.dtype)
+    shape = value.shape
+    width = channels
+    while width > block:
+        width //= 2
+        lower, upper = np.moveaxis(value.reshape(-1, 2, width), 1, 0)
+        value = np.stack([lower + upper, lower - upper], axis=1)
+    if width > 1:
+        hadamard = scipy.linalg.hadamard(width).astype(value.dtype)
+        value = value.reshape(-1, width) @ hadamard
+    return value.reshape(shape)
+
+
+class HadamardLayers(object):
+    @staticmethod
+    def _is_power_of_two(num):
+        return 2 ** int(math.log(num, 2)) == num
+
+    def instantiate_zipf(self, node, tensor, params):
+        channels = tensor.shape[-1]
+        scales = np.array([1 / (n + 1) for n in range(channels)])
+        return tensor * (scales / np.sum(scales))
+
+    def instantiate_hadamard(self, node, tensor, params):
+        channels = tensor.shape[-1]
+        if not self._is_power_of_two(channels):
+            raise ValueError(
+                'Number of channels must be a power of 2 for hadamard layer.')
+        if params.get('variable_scales', False):
+            name = '{}/channel_scale'.format('/'.join(node.module))
+            tensor = tensor * self._variables[name]
+        tensor = walsh_hadamard(tensor, params.get('block', 0))
+        # normalization & activation
+        normalizer_fn = params.get('normalizer_fn', None)
+        if normalizer_fn:
+            tensor = self._normalize(
+                node, tensor, params.get('normalizer_params'), 'BatchNorm/')
+        activation_fn = self._activation_fn(params)
+        if activation_fn:
+            tensor = activation_fn(tensor)
+        return tensor
+
+    def instantiate_hadamard_convolution(self, node, tensor, params):
+        channels = tensor.shape[-1]
+        out_channels = params.get('num_outputs', channels)
+        if not self._is_power_of_two(channels):
+            raise ValueError('Number of input channels must be 2^n.')
+        if not self._is_power_of_two(out_channels):
+            raise ValueError('Number of output channels must be 2^n.')
+        if out_channels == channels:
+            conv = self._depthwise(node, tensor, params)
+        else:
+            conv_params = dict(params, num_groups=channels)
+            conv = self._convolve(node, tensor, conv_params)
+        biases = self.variable(node, 'biases')
+        if biases is not None:
+            conv = conv + biases
+        return self.instantiate_hadamard(node, conv, params)
@@ -0,0 +1,172 @@
+import math
+
+import numpy as np
+
+from mayo.log import log
+from mayo.util import Percent, Table
+from mayo.net.numpy.layers import Layers
+from mayo.net.numpy.hadamard import HadamardLayers
+
+
+def integer_type(width):
+    """The smallest NumPy integer type that holds `width`-bit values.  """
+    for dtype in (np.int8, np.int16, np.int32):
+        if width <= np.iinfo(dtype).bits:
+            return dtype
+    return np.int64
+
+
+def fraction_bits(value):
+    """
+    The smallest number of fractional bits required to represent all values
+    in `value` exactly, and the number of integral bits of the largest
+    magnitude.
+    """
+    nonzero = value[value != 0].astype(np.float64)
+    if not nonzero.size:
+        return 0, 0
+    mantissa, exponent = np.frexp(nonzero)
+    # the lowest set bit in the 53-bit mantissa
+    mantissa = (mantissa * 2.0 ** 53).astype(np.int64)
+    lowest = np.log2(mantissa & -mantissa).astype(np.int64)
+    return int(np.max(53 - exponent - lowest)), int(np.max(exponent))
+
+
+def accumulate(acc, width, saturate=True):
+    """
+    Fits integer sums `acc` into a `width`-bit accumulator, which either
+    saturates or wraps around, and counts the sums that overflow.
+    """
+    bound = 2 ** (width - 1)
+    overflows = np.count_nonzero((acc < -bound) | (acc >= bound))
+    if not overflows:
+        return acc, 0
+    if saturate:
+        return np.clip(acc, -bound, bound - 1), overflows
+    return (acc + bound) % (2 * bound) - bound, overflows
+
+
+class IntegerNet(Layers, HadamardLayers):
+    """
+    Bit-accurate integer simulation of fixed-point models.
+
+    Convolutions and fully-connected layers with `FixedPointQuantizer`
+    weights multiply integer weight codes with integer inputs.  Inputs use
+    the fewest fractional bits that represent them exactly, which recovers
+    the format of fixed-point quantized activations, or are rounded to
+    `activation_width` bits otherwise.  Biases are aligned to the accumulator
+    format and accumulated sums larger than `accumulator_width` bits either
+    saturate or wrap around; overflows are counted for each layer.  The
+    remaining layers are computed in floating-point.
+
+    Accumulation is computed with float64 BLAS, which is exact as long as
+    the sums fit in its 53-bit mantissa, or with int64 otherwise.
+    """
+    _exact_bits = 53
+
+    def __init__(
+            self, model, inputs, variables, accumulator_width=32,
+            saturate=True, activation_width=16):
+        if not 2 <= accumulator_width <= 62:
+            raise ValueError('Accumulator width must be between 2 and 62.')
+        self.accumulator_width = accumulator_width
+        self.saturate = saturate
+        self.activation_width = activation_width
+        self.statistics = {}
+        super().__init__(model, inputs, variables)
+
+    def _weight_format(self, node, name):
+        overriders = self._create_overriders(node, name)
+        if not overriders:
+            return None
+        # overriders are already imported by their instantiation
+        from mayo.override.quantize.fixed import FixedPointQuantizer
+        for o in overriders:
+            if isinstance(o, FixedPointQuantizer):
+                # parameters are resolved when weights are overridden
+                self.variable(node, name)
+                width = int(o._parameter_variables['width'])
+                point = int(o._parameter_variables['point'])
+                return width, point
+        return None
+
+    def _to_integer(self, node, value):
+        frac, integral = fraction_bits(value)
+        limit = self.activation_width - 1 - integral
+        if frac > limit:
+            log.debug(
+                'Inputs of {!r} are rounded to {} fractional bits.'
+                .format(node.formatted_name(), limit))
+            frac = limit
+        codes = np.round(value * 2.0 ** frac)
+        width = int(np.max(np.abs(codes), initial=0)).bit_length() + 1
+        return codes.astype(integer_type(width)), width, frac
+
+    def _accumulate(self, node, acc):
+        acc, overflows = accumulate(acc, self.accumulator_width, self.saturate)
+        stats = self.statistics[node]
+        stats['overflows'] += overflows
+        stats['count'] += acc.size
+        return acc
+
+    def _integer(self, node, tensor, params, func, name):
+        weight_format = self._weight_format(node, name)
+        if weight_format is None:
+            return None
+        width, point = weight_format
+        weights = self.variable(node, name)
+        weight_frac = width - point
+        weights = np.round(weights * 2.0 ** weight_frac)
+        weights = weights.astype(integer_type(width))
+        inputs, input_width, input_frac = self._to_integer(node, tensor)
+        fan_in = weights.size // weights.shape[-1]
+        bits = width + input_width + math.ceil(math.log2(fan_in))
+        dtype = np.float64 if bits <= self._exact_bits else np.int64
+        acc = func(node, inputs.astype(dtype), params, weights.astype(dtype))
+        acc = acc.astype(np.int64)
+        frac = weight_frac + input_frac
+        biases = self.variable(node, 'biases')
+        if biases is not None:
+            acc += np.round(biases * 2.0 ** frac).astype(np.int64)
+        stats = self.statistics.setdefault(node, {
+            'weights': weight_format, 'overflows': 0, 'count': 0})
+        stats['inputs'] = (input_width, input_width - input_frac)
+        acc = self._accumulate(node, acc)
+        tensor = (acc * 2.0 ** -frac).astype(np.float32)
+        return self._finalize(node, tensor, params, add_biases=False)
+
+    def instantiate_convolution(self, node, tensor, params):
+        name = 'weights'
+        if params.get('num_groups', 1) != 1:
+            name = 'groupwise_weights'
+        output = self._integer(node, tensor, params, self._convolve, name)
+        if output is None:
+            return super().instantiate_convolution(node, tensor, params)
+        return output
+
+    def instantiate_depthwise_convolution(self, node, tensor, params):
+        output = self._integer(
+            node, tensor, params, self._depthwise, 'depthwise_weights')
+        if output is None:
+            return super().instantiate_depthwise_convolution(
+                node, tensor, params)
+        return output
+
+    def instantiate_fully_connected(self, node, tensor, params):
+        output = self._integer(
+            node, tensor, params, self._fully_connected, 'weights')
+        if output is None:
+            return super().instantiate_fully_connected(node, tensor, params)
+        return output
+
+    def info(self):
+        table = Table(['layer', 'weights', 'inputs', 'overflows', 'rate'])
+        for node, stats in self.statistics.items():
+            table.add_row((
+                node.formatted_name(),
+                '{}-bit, point {}'.format(*stats['weights']),
+                '{}-bit, point {}'.format(*stats['inputs']),
+                stats['overflows'],
+                Percent(stats['overflows'] / max(stats['count'], 1))))
+        table.footer_sum('overflows')
+        return {'integer': table}
@@ -0,0 +1,254 @@
+import numpy as np
+
+from mayo.net.numpy.base import NumPyNetBase, pad_same, windows
+
+
+def _pair(value):
+    if isinstance(value, int):
+        return [value, value]
+    return list(value)
+
+
+def _axis(value):
+    if value is None or isinstance(value, int):
+        return value
+    return tuple(value)
+
+
+def _sigmoid(x):
+    return 1 / (1 + np.exp(-x))
+
+
+def _softmax(x):
+    x = np.exp(x - np.max(x, axis=-1, keepdims=True))
+    return x / np.sum(x, axis=-1, keepdims=True)
+
+
+class Layers(NumPyNetBase):
+    """ Runs "config.model" model definition with NumPy.  """
+    _activations = {
+        'relu': lambda x: np.maximum(x, 0),
+        'relu6': lambda x: np.clip(x, 0, 6),
+        'elu': lambda x: np.where(x > 0, x, np.expm1(np.minimum(x, 0))),
+        'sigmoid': _sigmoid,
+        'tanh': np.tanh,
+        'leaky_relu': lambda x: np.where(x > 0, x, 0.2 * x),
+        'softmax': _softmax,
+        'identity': lambda x: x,
+    }
+
+    def _activation_fn(self, params, default='relu'):
+        fn = params.get('activation_fn', default)
+        if fn is None:
+            return None
+        if not isinstance(fn, str):
+            fn = fn.__name__
+        name = fn.split('.')[-1]
+        try:
+            return self._activations[name]
+        except KeyError:
+            raise NotImplementedError(
+                '{!r} does not implement activation function {!r}.'
+                .format(self, fn))
+
+    def _normalize(self, node, tensor, params, prefix=''):
+        params = dict(params or {})
+        gamma = self.variable(node, prefix + 'gamma')
+        beta = self.variable(node, prefix + 'beta')
+        mean = self.variable(node, prefix + 'moving_mean')
+        variance = self.variable(node, prefix + 'moving_variance')
+        inv = 1 / np.sqrt(variance + params.get('epsilon', 0.001))
+        if gamma is not None:
+            inv = inv * gamma
+        tensor = (tensor - mean) * inv
+        if beta is not None:
+            tensor = tensor + beta
+        return tensor
+
+    def _finalize(
+            self, node, tensor, params, default_activation='relu',
+            add_biases=True):
+        """Biases, normalization, overriders and activation.  """
+        biases = self.variable(node, 'biases') if add_biases else None
+        if biases is not None:
+            tensor = tensor + biases
+        normalizer_fn = params.get('normalizer_fn')
+        if normalizer_fn:
+            if not str(normalizer_fn).endswith('batch_norm'):
+                raise NotImplementedError(
+                    '{!r} does not implement normalizer {!r}.'
+                    .format(self, normalizer_fn))
+            tensor = self._normalize(
+                node, tensor, params.get('normalizer_params'), 'BatchNorm/')
+        activations = '{}/activations'.format(node.formatted_name())
+        tensor = self.override(node, 'activation', tensor, activations)
+        activation_fn = self._activation_fn(params, default_activation)
+        if activation_fn:
+            tensor = activation_fn(tensor)
+        return tensor
+
+    def _pad(self, tensor, kernel, stride, padding, value=0):
+        if padding != 'SAME':
+            return tensor
+        paddings = [(0, 0)]
+        for size, k, s in zip(tensor.shape[1:3], kernel, stride):
+            paddings.append(pad_same(size, k, s))
+        paddings.append((0, 0))
+        return np.pad(tensor, paddings, 'constant', constant_values=value)
+
+    def _windows(self, tensor, params, default_stride=1, value=0):
+        kernel = _pair(params['kernel_size'])
+        stride = _pair(params.get('stride', default_stride))
+        if params.get('rate', 1) not in (1, [1, 1]):
+            raise NotImplementedError(
+                '{!r} does not implement dilated convolutions.'.format(self))
+        padding = params.get('padding', 'SAME')
+        tensor = self._pad(tensor, kernel, stride, padding, value)
+        return windows(tensor, kernel, stride)
+
+    def _convolve(self, node, tensor, params, weights=None):
+        groups = params.get('num_groups', 1)
+        patches = self._windows(tensor, params)
+        if weights is None:
+            name = 'weights' if groups == 1 else 'groupwise_weights'
+            weights = self.variable(node, name)
+        if groups == 1:
+            return np.tensordot(patches, weights, axes=3)
+        # block-diagonal weights, one block for each group
+        n, h, w, kh, kw, c = patches.shape
+        patches = patches.reshape(n, h, w, kh, kw, groups, c // groups)
+        weights = weights.reshape(kh, kw, c // groups, groups, -1)
+        output = np.einsum(
+            'nhwijgc,ijcgo->nhwgo', patches, weights, optimize=True)
+        return output.reshape(n, h, w, -1)
+
+    def instantiate_convolution(self, node, tensor, params):
+        tensor = self._convolve(node, tensor, params)
+        return self._finalize(node, tensor, params)
+
+    def _depthwise(self, node, tensor, params, weights=None):
+        patches = self._windows(tensor, params)
+        if weights is None:
+            weights = self.variable(node, 'depthwise_weights')
+        output = np.einsum(
+            'nhwijc,ijcm->nhwcm', patches, weights, optimize=True)
+        n, h, w, c, m = output.shape
+        return output.reshape(n, h, w, c * m)
+
+    def instantiate_depthwise_convolution(self, node, tensor, params):
+        tensor = self._depthwise(node, tensor, params)
+        return self._finalize(node, tensor, params)
+
+    def _fully_connected(self, node, tensor, params, weights=None):
+        if weights is None:
+            weights = self.variable(node, 'weights')
+        return np.tensordot(tensor, weights, axes=1)
+
+    def instantiate_fully_connected(self, node, tensor, params):
+        tensor = self._fully_connected(node, tensor, params)
+        return self._finalize(node, tensor, params)
+
+    def _kernel_size(self, tensor, params):
+        kernel = params['kernel_size']
+        if kernel == 'global':
+            kernel = [None, None]
+        kernel = _pair(kernel) if kernel is not None else [None, None]
+        shape = tensor.shape[1:3]
+        return [min(s, k or s) for s, k in zip(shape, kernel)]
+
+    def _pool(self, tensor, params, value):
+        params = dict(params, kernel_size=self._kernel_size(tensor, params))
+        params.setdefault('padding', 'VALID')
+        # skip pooling with 1x1 kernel @ stride 1, which is a no-op
+        if params['kernel_size'] == [1, 1] and params.get('stride', 1) == 1:
+            return None
+        return self._windows(tensor, params, default_stride=2, value=value)
+
+    def instantiate_max_pool(self, node, tensor, params):
+        patches = self._pool(tensor, params, -np.inf)
+        if patches is None:
+            return tensor
+        return patches.max(axis=(3, 4))
+
+    def instantiate_average_pool(self, node, tensor, params):
+        patches = self._pool(tensor, params, 0)
+        if patches is None:
+            return tensor
+        # padded values are excluded from averages
+        ones = np.ones(tensor.shape[:3] + (1, ), dtype=tensor.dtype)
+        counts = self._pool(ones, params, 0).sum(axis=(3, 4))
+        return patches.sum(axis=(3, 4)) / counts
+
+    def instantiate_reduce_mean(self, node, tensor, params):
+        keepdims = params.get('keep_dims', params.get('keepdims', False))
+        return np.mean(tensor, axis=_axis(params['axis']), keepdims=keepdims)
+
+    def instantiate_softmax(self, node, tensor, params):
+        return _softmax(tensor)
+
+    def instantiate_dropout(self, node, tensor, params):
+        return tensor
+
+    def instantiate_local_response_normalization(self, node, tensor, params):
+        radius = params.get('depth_radius', 5)
+        bias = params.get('bias', 1)
+        alpha = params.get('alpha', 1)
+        beta = params.get('beta', 0.5)
+        squares = np.pad(
+            tensor ** 2, [(0, 0)] * 3 + [(radius, radius)], 'constant')
+        cumsum = np.cumsum(squares, axis=-1)
+        cumsum = np.concatenate(
+            [np.zeros(cumsum.shape[:3] + (1, )), cumsum], axis=-1)
+        sums = cumsum[..., 2 * radius + 1:] - cumsum[..., :-2 * radius - 1]
+        return tensor / (bias + alpha * sums) ** beta
+
+    def instantiate_batch_normalization(self, node, tensor, params):
+        normalizer_params = dict(params.get('normalizer_params') or {})
+        normalizer_params.update(params)
+        tensor = self._normalize(node, tensor, normalizer_params)
+        activation_fn = self._activation_fn(params, None)
+        if activation_fn:
+            tensor = activation_fn(tensor)
+        return tensor
+
+    def instantiate_squeeze(self, node, tensor, params):
+        axis = params.get('axis', params.get('squeeze_dims'))
+        return np.squeeze(tensor, axis=_axis(axis))
+
+    def instantiate_flatten(self, node, tensor, params):
+        return tensor.reshape(tensor.shape[0], -1)
+
+    def instantiate_concat(self, node, tensors, params):
+        return np.concatenate(tensors, axis=params.get('axis', -1))
+
+    def instantiate_space_to_depth(self, node, tensor, params):
+        block = params['block_size']
+        n, h, w, c = tensor.shape
+        tensor = tensor.reshape(n, h // block, block, w // block, block, c)
+        tensor = tensor.transpose(0, 1, 3, 2, 4, 5)
+        return tensor.reshape(n, h // block, w // block, block * block * c)
+
+    def instantiate_add(self, node, tensors, params):
+        return sum(tensors[1:], tensors[0])
+
+    def instantiate_mul(self, node, tensors, params):
+        if len(tensors) != 2:
+            raise ValueError('Multiplication expects exactly two inputs.')
+        return tensors[0] * tensors[1]
+
+    def instantiate_activation(self, node, tensor, params):
+        mode = params['mode']
+        if mode not in self._activations:
+            raise TypeError(
+                '{!r} cannot instantiate activation of type {!r}.'
+                .format(self, mode))
+        return self._activations[mode](tensor)
+
+    def instantiate_identity(self, node, tensor, params):
+        activation_fn = self._activation_fn(params, None)
+        if activation_fn:
+            return activation_fn(tensor)
+        return tensor
+
+    def instantiate_pad(self, node, tensor, params):
+        return tensor
@@ -0,0 +1,240 @@
+import math
+import collections
+
+from mayo.log import log
+from mayo.util import Percent, object_from_params
+from mayo.net.base import NetBase
+from mayo.net.estimate import (
+    LayerEstimateMixin, apply_density, estimate_gate_overhead, multiply,
+    reduce_weight_statistics)
+
+
+def _pair(value):
+    if isinstance(value, int):
+        return [value, value]
+    return list(value)
+
+
+def _axes(axis, ndims):
+    axis = [axis] if isinstance(axis, int) else list(axis)
+    return sorted(a % ndims for a in axis)
+
+
+def _out_size(size, kernel, stride, rate, padding):
+    if padding == 'SAME':
+        return int(math.ceil(size / stride))
+    if padding == 'VALID':
+        kernel = (kernel - 1) * rate + 1
+        return int(math.ceil((size - kernel + 1) / stride))
+    raise ValueError('Unrecognized padding {!r}.'.format(padding))
+
+
+class StaticNet(LayerEstimateMixin, NetBase):
+    """
+    Infers the shapes of the DAG graph and estimates layer statistics in
+    pure Python, without instantiating the model.
+
+    `inputs` maps input names to their shapes.  The densities and bit-widths
+    of weights are taken from overrider parameters in `variables`, e.g.
+    loaded with `load_variables()`, when available, or from overrider
+    hyperparameters in the model description otherwise.  Gated convolutions
+    are assumed to keep their configured densities.
+    """
+    def __init__(self, model, inputs, variables=None):
+        self._variables = variables or {}
+        inputs = {k: tuple(v) for k, v in inputs.items()}
+        super().__init__(model, inputs)
+
+    def shapes(self, unified=True):
+        return dict(self._tensors)
+
+    def info(self):
+        return {'layers': self._layer_info()}
+
+    def _instantiate_layer(self, node, shape):
+        try:
+            func, params = object_from_params(
+                node.params, self, 'instantiate_')
+        except NotImplementedError:
+            func = self.generic_instantiate
+            params = dict(node.params)
+        shape = self.instantiate_numeric_padding(node, shape, params)
+        shape = func(node, shape, params)
+        log.debug(
+            'Inferred shape of {!r}: {}.'
+            .format(node.formatted_name(), shape))
+        return shape
+
+    def generic_instantiate(self, node, shape, params):
+        raise NotImplementedError(
+            '{!r} does not know the output shape of layer type {!r}.'
+            .format(self, node.params['type']))
+
+    def instantiate_numeric_padding(self, node, shapes, params):
+        pad = params.get('padding')
+        if pad is None:
+            return shapes
+        if isinstance(pad, str):
+            params['padding'] = pad.upper()
+            return shapes
+        if isinstance(pad, int):
+            paddings = [[pad, pad], [pad, pad]]
+        elif isinstance(pad, collections.Sequence):
+            paddings = [_pair(p) for p in pad]
+        else:
+            raise ValueError(
+                'We do not know what to do with a padding {!r}, we accept an '
+                'integer, a string or a sequence of height and width paddings '
+                '[pad_h, pad_w].'.format(pad))
+        # disable pad for next layer
+        params['padding'] = 'VALID'
+
+        def padded(shape):
+            n, h, w, c = shape
+            return (n, h + sum(paddings[0]), w + sum(paddings[1]), c)
+
+        if isinstance(shapes, list):
+            return [padded(s) for s in shapes]
+        return padded(shapes)
+
+    def _spatial(self, shape, params, channels, default_stride=1):
+        n, h, w, _ = shape
+        kernel = _pair(params['kernel_size'])
+        stride = _pair(params.get('stride', default_stride))
+        rate = _pair(params.get('rate', 1))
+        padding = params.get('padding', 'SAME').upper()
+        h, w = (
+            _out_size(*args, padding)
+            for args in zip((h, w), kernel, stride, rate))
+        return (n, h, w, channels)
+
+    def instantiate_convolution(self, node, shape, params):
+        channels = params['num_outputs'] * params.get('num_groups', 1)
+        return self._spatial(shape, params, channels)
+
+    instantiate_gated_convolution = instantiate_convolution
+
+    def instantiate_depthwise_convolution(self, node, shape, params):
+        channels = shape[-1] * params.get('depth_multiplier', 1)
+        return self._spatial(shape, params, channels)
+
+    def instantiate_hadamard_convolution(self, node, shape, params):
+        channels = params.get('num_outputs', shape[-1])
+        return self._spatial(shape, params, channels)
+
+    def _pool(self, shape, params):
+        kernel = params['kernel_size']
+        if kernel == 'global':
+            kernel = None
+        kernel = _pair(kernel) if kernel is not None else [None, None]
+        kernel = [min(s, k or s) for s, k in zip(shape[1:3], kernel)]
+        params = dict(params, kernel_size=kernel)
+        params.setdefault('padding', 'VALID')
+        # skip pooling with 1x1 kernel @ stride 1, which is a no-op
+        if kernel == [1, 1] and params.get('stride', 1) == 1:
+            return shape
+        return self._spatial(shape, params, shape[-1], default_stride=2)
+
+    def instantiate_max_pool(self, node, shape, params):
+        return self._pool(shape, params)
+
+    def instantiate_average_pool(self, node, shape, params):
+        return self._pool(shape, params)
+
+    def instantiate_reduce_mean(self, node, shape, params):
+        keepdims = params.get('keep_dims', params.get('keepdims', False))
+        axis = params.get('axis')
+        axes = range(len(shape)) if axis is None else _axes(axis, len(shape))
+        if keepdims:
+            return tuple(1 if i in axes else s for i, s in enumerate(shape))
+        return tuple(s for i, s in enumerate(shape) if i not in axes)
+
+    def instantiate_fully_connected(self, node, shape, params):
+        return tuple(shape[:-1]) + (params['num_outputs'], )
+
+    def _identity(self, node, shape, params):
+        return shape
+
+    instantiate_softmax = _identity
+    instantiate_dropout = _identity
+    instantiate_local_response_normalization = _identity
+    instantiate_batch_normalization = _identity
+    instantiate_activation = _identity
+    instantiate_identity = _identity
+    instantiate_pad = _identity
+    instantiate_zipf = _identity
+    instantiate_hadamard = _identity
+
+    def instantiate_squeeze(self, node, shape, params):
+        axis = params.get('axis', params.get('squeeze_dims'))
+        if axis is None:
+            return tuple(s for s in shape if s != 1)
+        axes = _axes(axis, len(shape))
+        return tuple(s for i, s in enumerate(shape) if i not in axes)
+
+    def instantiate_flatten(self, node, shape, params):
+        return (shape[0], multiply(shape[1:]))
+
+    def instantiate_concat(self, node, shapes, params):
+        axis = _axes(params.get('axis', -1), len(shapes[0]))[0]
+        shape = list(shapes[0])
+        shape[axis] = sum(s[axis] for s in shapes)
+        return tuple(shape)
+
+    def instantiate_space_to_depth(self, node, shape, params):
+        block = params['block_size']
+        n, h, w, c = shape
+        return (n, h // block, w // block, block * block * c)
+
+    def instantiate_add(self, node, shapes, params):
+        return shapes[0]
+
+    instantiate_mul = instantiate_add
+
+    def instantiate_crop(self, node, shape, params):
+        cropping = params.get('cropping')
+        if isinstance(cropping, int):
+            cropping = [cropping, cropping]
+        (top, bottom), (left, right) = (_pair(c) for c in cropping)
+        n, h, w, c = shape
+        return (n, h - top - bottom, w - left - right, c)
+
+    def _overrider_value(self, node, params, name):
+        key = '{}/weights/{}.{}'.format(
+            node.formatted_name(), params['type'].split('.')[-1], name)
+        value = self._variables.get(key)
+        if value is None:
+            return params.get(name)
+        return value
+
+    def _weight_statistics(self, node):
+        statistics = []
+        overriders = node.params.get('overrider', {}).get('weights') or {}
+        for params in overriders.values():
+            mask = self._overrider_value(node, params, 'mask')
+            if mask is not None:
+                density = mask.mean()
+            else:
+                density = self._overrider_value(node, params, 'density')
+            statistics.append({
+                'density': density,
+                'width': self._overrider_value(node, params, 'width'),
+            })
+        return reduce_weight_statistics(statistics)
+
+    def estimate_gated_convolution(
+            self, node, in_info, in_shape, out_shape, params):
+        out_info = self._estimate_convolution(in_shape, out_shape, params)
+        active_density = 1
+        if params.get('enable', True):
+            active_density = Percent(params.get('density', 1))
+            out_info.update(density=active_density, active=active_density)
+        density, bitwidth = self._weight_statistics(node)
+        out_info = apply_density(
+            in_info, out_info, in_shape, out_shape, density, bitwidth)
+        weights, macs = estimate_gate_overhead(
+            in_shape, out_shape, in_info.get('density', 1), active_density,
+            params)
+        out_info['weights'] += weights
+        out_info['macs'] += macs
+        return out_info
@@ -3,10 +3,13 @@ import collections
 import tensorflow as tf
 
 from mayo.log import log
-from mayo.util import Table, object_from_params, unknown
+from mayo.util import Table, object_from_params
 from mayo.override import ChainOverrider
-from mayo.net.base import LayerNode, JoinNode, NetBase
+from mayo.override.base import batch_info
+from mayo.net.base import JoinNode, NetBase
+from mayo.net.graph import cached_graph
 from mayo.net.tf.transform import ParameterTransformer
+from mayo.net.tf.estimate import weight_statistics_overriders
 
 
 class TFNetBase(NetBase):
@@ -19,6 +22,12 @@ class TFNetBase(NetBase):
         super().__init__(model, inputs)
         self._verify_io()
 
+    def _build_graph(self, model):
+        cache = self.session.config.system.get('graph_cache', {})
+        if not cache.get('enable'):
+            return super()._build_graph(model)
+        return cached_graph(model, cache.get('path'))
+
     def _verify_io(self):
         nodes = list(self._graph.input_nodes())
         if len(nodes) != 1 and nodes[0].name != 'input':
@@ -39,34 +48,6 @@ class TFNetBase(NetBase):
     def variables(self):
         return self._transformer.variables
 
-    def _layer_info(self):
-        stats = self.estimate()
-        keys = set()
-        for node, stat in stats.items():
-            if isinstance(stat, list):
-                for each in stat:
-                    keys |= set(each)
-            elif isinstance(stat, dict):
-                keys |= set(stat)
-            else:
-                raise TypeError('Unrecognized type.')
-        keys = sorted(k for k in keys if not k.startswith('_'))
-        layer_info = Table(['layer', 'shape'] + keys)
-        for node, shape in self.shapes(unified=False).items():
-            if isinstance(node, LayerNode):
-                values = stats.get(node, {})
-                values = tuple(values.get(k, unknown) for k in keys)
-            else:
-                values = tuple([unknown] * len(keys))
-            layer_info.add_row((node.formatted_name(), shape) + values)
-        layer_info.footer_sum('macs')
-        layer_info.footer_sum('mem_weights')
-        layer_info.footer_sum('mem_activation')
-        # layer_info.footer_sum('alu_moves')
-        # layer_info.footer_sum('offcache_moves')
-        # layer_info.footer_max('optimal_cache')
-        return layer_info
-
     def _overrider_info(self):
         overriders = []
         for os in self.overriders.values():
@@ -82,8 +63,8 @@ class TFNetBase(NetBase):
             else:
                 flatten_overriders.append(o)
         info_dict = {}
-        for o in flatten_overriders:
-            info = o.info()
+        infos = batch_info(self.session, flatten_overriders)
+        for o, info in zip(flatten_overriders, infos):
             if not info:
                 continue
             table = info_dict.setdefault(o.__class__, Table(info._fields))
@@ -205,8 +186,18 @@ class TFNetBase(NetBase):
             return [tf.pad(t, paddings) for t in tensors]
         return tf.pad(tensors, paddings)
 
+    def _prepare_estimate(self, nodes):
+        # infos of weight overriders are fetched in a single run
+        overriders = []
+        for node in nodes:
+            o = self.overriders.get(node, {}).get('weights')
+            overriders += weight_statistics_overriders(o)
+        infos = batch_info(self.session, overriders)
+        self._weight_infos = dict(zip(overriders, infos))
+
     def _estimate_layer(self, node, in_info):
         out_info = super()._estimate_layer(node, in_info)
+        in_shape, out_shape = self._layer_shapes(node)
         log.debug(
             'Estimated statistics for {!r}: {}.'
             .format(node.formatted_name(), out_info))
@@ -214,7 +205,7 @@ class TFNetBase(NetBase):
             if k == ['gradient', 'normalization']:
                 log.warn('Normalization/gradient estimation not supported.')
                 continue
-            out_info = o.estimate(out_info, in_info)
+            out_info = o.estimate(out_info, in_info, in_shape, out_shape)
             log.debug(
                 'Overrider {!r} modified statistics: {}.'.format(o, out_info))
         return out_info
@@ -1,11 +1,106 @@
 import math
+import numbers
 
+import numpy as np
 import tensorflow as tf
 
 from mayo.util import memoize_method, memoize_property, null_scope
 from mayo.net.graph import LayerNode
 
 
+# collection of gate density variables
+density_collection = 'mayo.gate.density'
+# collection of streaming gate statistics
+statistics_collection = 'mayo.gate.statistics'
+
+
+def _flatten(tensors):
+    return [tf.reshape(t, [int(t.shape[0]), -1]) for t in tensors]
+
+
+def _num_active(tensors, density):
+    num_elements = sum(int(t.shape[-1]) for t in tensors)
+    num_active = tf.ceil(num_elements * density)
+    return tf.cast(num_active, tf.int32), num_elements
+
+
+def _fixed_top_k_threshold(tensor, num_active):
+    # only the top responses are found for a fixed number of active elements
+    if num_active >= int(tensor.shape[-1]):
+        return tf.fill([tf.shape(tensor)[0], 1], -np.inf)
+    top, _ = tf.nn.top_k(tensor, k=(num_active + 1))
+    return tf.reduce_min(top, axis=[1], keepdims=True)
+
+
+def top_k_threshold(tensors, density, default_density=None):
+    """
+    For each sample, finds the threshold of responses in `tensors` that
+    keeps a `density` portion of them, i.e. the largest response of
+    disabled elements, or -inf if all elements are active.  A `density`
+    tensor is adjustable at run time, which requires sorting all responses,
+    unless it keeps as many elements active as `default_density`.
+    """
+    tensors = _flatten(tensors)
+    tensor = tf.concat(tensors, axis=-1) if len(tensors) > 1 else tensors[0]
+    num_elements = int(tensor.shape[-1])
+    if isinstance(density, numbers.Real):
+        num_active = int(math.ceil(num_elements * density))
+        return _fixed_top_k_threshold(tensor, num_active)
+    num_active, _ = _num_active(tensors, density)
+
+    def adjusted():
+        # sort once to support a dynamic number of active elements
+        top, _ = tf.nn.top_k(tensor, k=num_elements)
+        disabled = tf.fill([tf.shape(top)[0], 1], -np.inf)
+        top = tf.concat([top, disabled], axis=1)
+        return top[:, num_active:num_active + 1]
+
+    if default_density is None:
+        return adjusted()
+    default_active = int(math.ceil(num_elements * default_density))
+    return tf.cond(
+        tf.equal(num_active, default_active),
+        lambda: _fixed_top_k_threshold(tensor, default_active), adjusted)
+
+
+def histogram_threshold(tensors, density, bins=1024):
+    """
+    Approximates `top_k_threshold()` with per-sample histograms of
+    responses that are merged across `tensors`, without concatenating or
+    sorting them.  The threshold is linearly interpolated within the bin
+    where the number of larger responses reaches the number of active
+    elements, so its error is bounded by the bin width.
+    """
+    tensors = _flatten(tensors)
+    num_active, _ = _num_active(tensors, density)
+    num_samples = int(tensors[0].shape[0])
+    lower = tf.reduce_min([tf.reduce_min(t) for t in tensors])
+    upper = tf.reduce_max([tf.reduce_max(t) for t in tensors])
+    width = tf.maximum((upper - lower) / bins, 1e-12)
+    offsets = tf.expand_dims(tf.range(num_samples) * bins, 1)
+    counts = 0
+    for t in tensors:
+        index = tf.cast(tf.floor((t - lower) / width), tf.int32)
+        index = tf.clip_by_value(index, 0, bins - 1) + offsets
+        counts += tf.unsorted_segment_sum(
+            tf.ones_like(t), index, num_samples * bins)
+    counts = tf.reshape(counts, [num_samples, bins])
+    # the number of responses in each bin and above
+    above = tf.cumsum(counts, axis=1, reverse=True)
+    num_active = tf.cast(num_active, tf.float32)
+    # the highest bin with more responses than active elements
+    index = tf.reduce_sum(tf.cast(above > num_active, tf.int32), axis=1) - 1
+    mask = tf.one_hot(tf.maximum(index, 0), bins)
+    count = tf.reduce_sum(counts * mask, axis=1)
+    excess = tf.reduce_sum(above * mask, axis=1) - num_active
+    # assumes responses are uniformly distributed within the bin
+    fraction = excess / tf.maximum(count, 1)
+    threshold = lower + width * (tf.cast(index, tf.float32) + fraction)
+    threshold = tf.where(
+        index < 0, tf.fill([num_samples], -np.inf), threshold)
+    return tf.expand_dims(threshold, 1)
+
+
 class GateError(Exception):
     """Gating-related exceptions.  """
 
@@ -18,6 +113,42 @@ class GateGranularityTypeError(GateError):
     """Incorrect granularity used.  """
 
 
+def sparse_convolution(
+        tensor, weights, actives, stride, padding, skip_inputs=False):
+    """
+    Computes a convolution only for the active output channels of each
+    sample, where `actives` is a [N, C_out] boolean tensor.  The weights of
+    active channels are gathered, convolved, and the results are scattered
+    into zero-filled outputs.  With `skip_inputs`, input channels that are
+    entirely zero, e.g. inactive outputs of a preceding gated convolution,
+    are also skipped.
+    """
+    out_channels = int(weights.shape[-1])
+    if isinstance(stride, int):
+        stride = [stride, stride]
+    stride = [1] + list(stride) + [1]
+
+    def convolve(args):
+        value, active = args
+        value = tf.expand_dims(value, 0)
+        kernel = weights
+        if skip_inputs:
+            nonzero = tf.reduce_any(tf.not_equal(value, 0), axis=[0, 1, 2])
+            inputs = tf.where(nonzero)[:, 0]
+            value = tf.gather(value, inputs, axis=3)
+            kernel = tf.gather(kernel, inputs, axis=2)
+        outputs = tf.where(active)[:, 0]
+        kernel = tf.gather(kernel, outputs, axis=3)
+        output = tf.nn.conv2d(value, kernel, stride, padding)
+        # [1, H, W, k] -> [k, H, W] to scatter channels
+        output = tf.transpose(output[0], [2, 0, 1])
+        shape = tf.concat([[out_channels], tf.shape(output)[1:]], axis=0)
+        output = tf.scatter_nd(tf.expand_dims(outputs, 1), output, shape)
+        return tf.transpose(output, [1, 2, 0])
+
+    return tf.map_fn(convolve, (tensor, actives), dtype=tensor.dtype)
+
+
 class GatedConvolutionBase(object):
     _must = object()
     _defaults = {
@@ -30,6 +161,16 @@ class GatedConvolutionBase(object):
         'threshold': 'online',
         'decay': 0.9997,
         'trainable': True,
+        # 'dense' or 'sparse', the latter computes only active channels
+        # during inference
+        'execution': 'dense',
+        'skip_inputs': False,
+        # local and global thresholds are estimated either exactly with
+        # top_k, or approximately with histograms of responses, every
+        # `threshold_interval` steps
+        'threshold_method': 'exact',
+        'threshold_bins': 1024,
+        'threshold_interval': 1,
     }
 
     def __init__(
@@ -40,8 +181,8 @@ class GatedConvolutionBase(object):
         self.is_training = constructor.is_training
         self.node = node
         self._regularization_losses = []
-        self._init_convolution(conv_input, conv_params)
         self._init_gate_params(gate_params)
+        self._init_convolution(conv_input, conv_params)
 
     def _init_convolution(self, tensor, params):
         self.kernel_size = params['kernel_size']
@@ -60,9 +201,58 @@ class GatedConvolutionBase(object):
         params['activation_fn'] = None
         # instantiate convolution
         self.input = tensor
-        self.conved = self.constructor.instantiate_convolution(
-            self.node, tensor, params)
         self.conv_params = params
+        if self._sparse_execution():
+            self.conved = self._sparse_convolution(tensor, params)
+        else:
+            self.conved = self.constructor.instantiate_convolution(
+                self.node, tensor, params)
+
+    def _sparse_execution(self):
+        if self.execution == 'dense':
+            return False
+        if self.execution != 'sparse':
+            raise GateParameterValueError(
+                'Unrecognized execution {!r}, we accept "dense" or "sparse".'
+                .format(self.execution))
+        if self.is_training or not self.enable or self.density >= 1:
+            return False
+        if self.granularity != 'channel':
+            return False
+        params = self.conv_params
+        if params.get('num_groups', 1) != 1:
+            return False
+        return params.get('rate', 1) in (1, [1, 1])
+
+    def _sparse_convolution(self, tensor, params):
+        kernel = self.kernel_size
+        if isinstance(kernel, int):
+            kernel = [kernel, kernel]
+        channels = int(tensor.shape[-1])
+        # variables are created as in slim.conv2d to keep checkpoints
+        weights = tf.get_variable(
+            '{}/weights'.format(self.scope),
+            list(kernel) + [channels, self.num_outputs],
+            initializer=params.get(
+                'weights_initializer',
+                tf.contrib.layers.xavier_initializer()),
+            regularizer=params.get('weights_regularizer', None),
+            trainable=params.get('trainable', True))
+        actives = tf.cast(self.actives(), tf.bool)
+        actives = tf.reshape(actives, [-1, self.num_outputs])
+        output = sparse_convolution(
+            tensor, weights, actives, self.stride, self.padding,
+            self.skip_inputs)
+        biases_initializer = params.get(
+            'biases_initializer', tf.zeros_initializer())
+        if biases_initializer is None:
+            return output
+        biases = tf.get_variable(
+            '{}/biases'.format(self.scope), [self.num_outputs],
+            initializer=biases_initializer,
+            regularizer=params.get('biases_regularizer', None),
+            trainable=params.get('trainable', True))
+        return tf.nn.bias_add(output, biases)
 
     def _update_defaults(self, defaults):
         pass
@@ -184,16 +374,53 @@ class GatedConvolutionBase(object):
         return self.constructor.instantiate_convolution(
             None, subsampled, params)
 
+    @memoize_property
+    def _keep_maps(self):
+        session = self.constructor.session
+        if not session.keep_gate_maps:
+            return False
+        return session.config.system.plot.get('gates', False)
+
     def _register(self, name, tensor):
+        if not self._keep_maps:
+            return tensor
         history = None if self.is_training else 'infinite'
         self.estimator.register(
             tensor, 'gate.{}'.format(name), self.node, history=history)
         return tensor
 
+    def _register_statistics(self, active):
+        """
+        Reduces active maps in the graph, so that only the number of active
+        elements in the current batch, and streaming counters of active
+        elements and elements active in any sample are fetched.
+        """
+        active = tf.cast(active, tf.float32)
+        size = tf.cast(tf.size(active), tf.float32)
+        counts = tf.stack([tf.reduce_sum(active), size])
+        self.estimator.register(counts, 'gate.counts', self.node, history=1)
+        collections = [tf.GraphKeys.LOCAL_VARIABLES, statistics_collection]
+        with tf.variable_scope(self.scope):
+            total_counts = tf.get_variable(
+                'gate/counts', [2], dtype=tf.float64,
+                initializer=tf.zeros_initializer(), trainable=False,
+                collections=collections)
+            union = tf.get_variable(
+                'gate/union', active.shape[1:], dtype=tf.float32,
+                initializer=tf.zeros_initializer(), trainable=False,
+                collections=collections)
+        total_counts = tf.assign_add(total_counts, tf.cast(counts, tf.float64))
+        union = tf.assign(
+            union, tf.maximum(union, tf.reduce_max(active, axis=0)))
+        self.estimator.register(
+            [total_counts, union], 'gate.stream', self.node, history=1)
+
     @memoize_method
     def gate(self):
         tensor = self._predictor('gate')
         self._register('gamma', tensor)
+        if self.enable:
+            self.constructor.gate_gammas[self.node] = tensor
         return tensor
 
     @staticmethod
@@ -234,46 +461,66 @@ class GatedConvolutionBase(object):
         self.estimator.register(var, 'gate.threshold', node=node, **debug)
         return var
 
+    @memoize_property
+    def density_variable(self):
+        """
+        The gate density as a variable, so that it can be adjusted without
+        rebuilding the graph.  It is a local variable, so the density in the
+        configuration is never overwritten by checkpoints.
+        """
+        collections = [tf.GraphKeys.LOCAL_VARIABLES, density_collection]
+        with tf.variable_scope(self.scope):
+            return tf.get_variable(
+                'gate/density', [], dtype=tf.float32,
+                initializer=tf.constant_initializer(self.density),
+                trainable=False, collections=collections)
+
     def _find_threshold(self, tensor):
-        if tensor.shape.ndims != 2:
-            tensor = tf.reshape(tensor, (tensor.shape[0], -1))
-        num_elements = int(tensor.shape[-1])
-        num_active = math.ceil(num_elements * self.density)
-        if num_active == num_elements:
-            # all active, not gating
-            return None
-        # top_k, where k is the number of active channels
-        top, _ = tf.nn.top_k(tensor, k=(num_active + 1))
-        # disable channels with smaller responses
-        return tf.reduce_min(top, axis=[1], keepdims=True)
+        return top_k_threshold(
+            [tensor], self.density_variable, self.density)
+
+    def _estimate_threshold(self, tensors):
+        if self.threshold_method == 'exact':
+            return top_k_threshold(
+                tensors, self.density_variable, self.density)
+        if self.threshold_method == 'histogram':
+            return histogram_threshold(
+                tensors, self.density_variable, self.threshold_bins)
+        raise GateParameterValueError(
+            'Unrecognized threshold method {!r}, we accept "exact" or '
+            '"histogram".'.format(self.threshold_method))
 
     def _finalizer(self):
         if self.threshold == 'online':
             return
         elif self.threshold == 'global':
-            outputs = []
-            gammas = self.estimator.get_tensors('gate.gamma')
-            for node, tensor in gammas.items():
-                if node.params['gate_params'].get('enable', True):
-                    outputs.append(tensor)
+            outputs = list(self.constructor.gate_gammas.values())
             if not outputs:
                 raise ValueError(
                     'Gated convolution did not register any gammas '
                     'for thresholding.')
-            outputs = tf.concat(outputs, axis=-1)
         elif self.threshold == 'local':
-            outputs = self.gate()
+            outputs = [self.gate()]
         else:
             raise GateParameterValueError('Unexpected threshold type.')
-        threshold = self._find_threshold(outputs)
-        if threshold is None:
-            return
-        threshold = tf.reduce_mean(threshold)
-        # exponential moving average
-        update_op = tf.assign(
-            self._threshold_variable,
-            self.decay * self._threshold_variable +
-            (1 - self.decay) * threshold)
+        var = self._threshold_variable
+
+        def update():
+            threshold = tf.reduce_mean(self._estimate_threshold(outputs))
+            # exponential moving average, unchanged if all channels are
+            # active
+            average = self.decay * var + (1 - self.decay) * threshold
+            average = tf.where(tf.is_finite(threshold), average, var)
+            return tf.identity(tf.assign(var, average))
+
+        interval = self.threshold_interval
+        if interval > 1:
+            # estimate the threshold every `interval` steps
+            step = tf.cast(self.constructor.session.num_steps, tf.int64)
+            update_op = tf.cond(
+                tf.equal(step % interval, 0), update, lambda: tf.identity(var))
+        else:
+            update_op = update()
         ops = self.constructor.session.extra_train_ops
         if self.threshold == 'global':
             ops['gate'] = update_op
@@ -294,8 +541,6 @@ class GatedConvolutionBase(object):
         # find threshold
         if self.threshold == 'online':
             threshold = self._find_threshold(flattened)
-            if threshold is None:
-                return tf.ones(tensor.shape, dtype=tf.float32)
         elif self.threshold in ['local', 'global']:
             threshold = self._threshold_variable
             node = self.node if self.threshold == 'local' else 'gate'
@@ -306,6 +551,7 @@ class GatedConvolutionBase(object):
         active = tf.stop_gradient(active)
         # register to estimator
         self._register('active', active)
+        self._register_statistics(active)
         return active
 
     @memoize_method
@@ -4,8 +4,9 @@ import functools
 import numpy as np
 
 from mayo.log import log
-from mayo.util import Percent, memoize_method
-from mayo.net.tf.estimate import multiply, mask_density, apply_sparsity
+from mayo.util import Percent, memoize_method, memoize_property
+from mayo.net.estimate import estimate_gate_overhead
+from mayo.net.tf.estimate import apply_sparsity
 from mayo.net.tf.gate.base import GateError
 from mayo.net.tf.gate.naive import NaiveGatedConvolution
 from mayo.net.tf.gate.squeeze import SqueezeExciteGatedConvolution
@@ -45,15 +46,30 @@ class GateLayers(object):
 
     @staticmethod
     def _gate_density_formatter(estimator):
-        gates = estimator.get_values('gate.active')
-        if not gates:
+        counts = estimator.get_values('gate.counts').values()
+        counts = [c for c in counts if c is not None]
+        if not counts:
             return 'gate: off'
-        valid = total = 0
-        for layer, gate in gates.items():
-            valid += np.sum(gate.astype(np.float32) != 0)
-            total += gate.size
+        valid = sum(c[0] for c in counts)
+        total = sum(c[1] for c in counts)
         return 'gate: {}'.format(Percent(valid / total))
 
+    @memoize_property
+    def gate_gammas(self):
+        """Gate predictor outputs of enabled gated convolutions.  """
+        return {}
+
+    def _gate_statistics(self, node):
+        try:
+            counts, union = self.estimator.get_value('gate.stream', node)
+        except (KeyError, IndexError):
+            return None
+        if not counts[1]:
+            return None
+        density = Percent(counts[0] / counts[1])
+        active = Percent(np.mean(union))
+        return density, active
+
     @memoize_method
     def _register_gate_formatters(self):
         self.session.estimator.register_formatter(self._gate_loss_formatter)
@@ -77,42 +93,27 @@ class GateLayers(object):
             raise GatePolicyTypeError('Unrecognized gated convolution policy.')
         return cls(self, node, params, gate_params, tensor).instantiate()
 
-    def _estimate_overhead(
-            self, in_shape, out_shape, in_density, active_density, params):
-        in_channels = int(in_shape[-1] * in_density)
-        out_channels = int(out_shape[-1] * active_density)
-        factor = params.get('factor', 0)
-        if factor <= 0:
-            macs = in_channels * out_channels
-            # FC uses number of weights = (MACs + bias parameters)
-            weights = macs + out_channels
-        else:
-            mid_channels = math.ceil(params['num_outputs'] / factor)
-            macs = in_channels * mid_channels
-            macs += mid_channels * out_channels
-            weights = NotImplemented
-        # gamma multiplication overhead
-        macs += multiply(out_shape[1:])
-        return weights, macs
-
     def estimate_gated_convolution(
             self, node, in_info, in_shape, out_shape, params):
         out_info = self._estimate_convolution(in_shape, out_shape, params)
         active_density = 1
         if params.get('enable', True):
+            statistics = self._gate_statistics(node)
+            if statistics is not None:
+                density, active_density = statistics
+                out_info['active'] = active_density
+                out_info['density'] = density
             try:
-                mask = self.estimator.get_history('gate.active', node)
+                # full gate maps are only available when plotting
+                out_info['_mask'] = self.estimator.get_history(
+                    'gate.active', node)
             except KeyError:
                 pass
-            else:
-                density, active_density = mask_density(mask)
-                out_info['_mask'] = mask
-                out_info['active'] = active_density
-                out_info['density'] = density
         o = self._weight_overrider(node)
-        out_info = apply_sparsity(o, in_info, out_info, in_shape, out_shape)
+        out_info = apply_sparsity(
+            o, self._weight_infos, in_info, out_info, in_shape, out_shape)
         in_density = in_info.get('density', 1)
-        oweights, omacs = self._estimate_overhead(
+        oweights, omacs = estimate_gate_overhead(
             in_shape, out_shape, in_density, active_density, params)
         out_info['weights'] += oweights
         out_info['macs'] += omacs
@@ -1,10 +1,43 @@
 import math
 
-import scipy
+import scipy.linalg
 import numpy as np
 import tensorflow as tf
 
 
+def dense_hadamard(value):
+    """Multiplies the last dimension of `value` with a Hadamard matrix.  """
+    channels = int(value.shape[-1])
+    hadamard = scipy.linalg.hadamard(channels)
+    hadamard = tf.constant(hadamard, dtype=tf.float32)
+    transformed = tf.reshape(value, [-1, channels]) @ hadamard
+    return tf.reshape(transformed, tf.shape(value))
+
+
+def walsh_hadamard(value, block=1):
+    """
+    Fast Walsh-Hadamard transform on the last dimension of `value`.
+
+    Each butterfly stage views the tensor as [-1, 2, width] and replaces the
+    halves (a, b) with (a + b, a - b), until the width is no larger than
+    `block`, where the remaining blocks are multiplied with a dense Hadamard
+    matrix.  A `block` of 0 uses the dense matrix directly.
+    """
+    channels = int(value.shape[-1])
+    if not block:
+        return dense_hadamard(value)
+    shape = tf.shape(value)
+    width = channels
+    while width > block:
+        width //= 2
+        transformed = tf.reshape(value, [-1, 2, width])
+        lower, upper = tf.unstack(transformed, axis=1)
+        value = tf.stack([lower + upper, lower - upper], axis=1)
+    if width > 1:
+        value = dense_hadamard(tf.reshape(value, [-1, width]))
+    return tf.reshape(value, shape)
+
+
 class HadamardLayers(object):
     @staticmethod
     def _is_power_of_two(num):
@@ -33,31 +66,8 @@ class HadamardLayers(object):
                 name='channel_scale', shape=shape, initializer=init)
             tensor *= channel_scales
 
-        def slow(value):
-            channels = int(value.shape[-1])
-            hadamard = scipy.linalg.hadamard(channels)
-            hadamard = tf.constant(hadamard, dtype=tf.float32)
-            # flatten input tensor
-            flattened = tf.reshape(value, [-1, channels])
-            # transform with hadamard
-            transformed = flattened @ hadamard
-            return tf.reshape(transformed, shape=value.shape)
-
-        def fast(value, granularity):
-            # fast walsh-hadamard transform
-            channels = value.shape[-1]
-            if channels == 1:
-                return value
-            if granularity == 0 or channels <= granularity:
-                return slow(value)
-            lower, upper = tf.split(value, 2, axis=-1)
-            lower, upper = lower + upper, lower - upper
-            lower = fast(lower, granularity)
-            upper = fast(upper, granularity)
-            return tf.concat((lower, upper), axis=-1)
-
         # hadamard
-        tensor = fast(tensor, params.pop('block', 0))
+        tensor = walsh_hadamard(tensor, params.pop('block', 0))
 
         # normalization & activation
         with tf.variable_scope(params.get('scope')):
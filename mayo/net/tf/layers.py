@@ -1,7 +1,13 @@
+import math
+
 import numpy as np
 import tensorflow as tf
 from tensorflow.contrib import slim
 
+from mayo import sparse
+from mayo.log import log
+from mayo.util import memoize_property
+from mayo.override import LowRankApproximation
 from mayo.net.tf.base import TFNetBase
 from mayo.net.tf.transform import use_name_not_scope
 from mayo.net.tf.estimate import LayerEstimateMixin
@@ -9,7 +15,176 @@ from mayo.net.tf.estimate import LayerEstimateMixin
 
 class Layers(TFNetBase, LayerEstimateMixin):
     """ Create a TensorFlow graph from "config.model" model definition.  """
+    @memoize_property
+    def _sparse_layers(self):
+        config = self.session.config.system.sparse
+        if self.is_training or not config.get('load'):
+            return {}
+        layers = {}
+        for name, layer in sparse.load(config.load).items():
+            if sparse.density(layer) < config.threshold:
+                layers[name] = layer
+        return layers
+
+    def _sparse_layer(self, node):
+        if not sparse.sparse_executable(node.params):
+            return None
+        return self._sparse_layers.get(node.formatted_name())
+
+    def _instantiate_sparse(self, node, tensor, params, layer):
+        """
+        Executes a fully-connected layer or 1x1 convolution as a sparse
+        matrix multiplication with the exported weights.
+        """
+        rows = int(layer['shape'][-1])
+        cols = int(np.prod(layer['shape'][:-1]))
+        log.debug(
+            'Instantiating {!r} as a sparse layer with density {}.'
+            .format(node.formatted_name(), sparse.density(layer)))
+        weights = tf.SparseTensor(
+            sparse.coo_indices(layer), layer['values'], [rows, cols])
+        stride = params.get('stride', 1)
+        if node.params.type == 'convolution' and stride not in (1, [1, 1]):
+            if isinstance(stride, int):
+                stride = [stride, stride]
+            tensor = tensor[:, ::stride[0], ::stride[1], :]
+        out_shape = tf.concat([tf.shape(tensor)[:-1], [rows]], axis=0)
+        # [C_out, C_in] x [C_in, N] = [C_out, N]
+        inputs = tf.reshape(tensor, [-1, cols])
+        output = tf.sparse_tensor_dense_matmul(weights, inputs, adjoint_b=True)
+        output = tf.reshape(tf.transpose(output), out_shape)
+        return self._finalize(output, params, rows)
+
+    def _finalize(self, output, params, channels):
+        # biases, normalization & activation follow slim conventions
+        scope = params['scope']
+        normalizer_fn = params.get('normalizer_fn', None)
+        activation_fn = params.get('activation_fn', tf.nn.relu)
+        if normalizer_fn:
+            normalizer_params = params.get('normalizer_params', {})
+            normalizer_params = dict(
+                normalizer_params, scope=scope + '/BatchNorm')
+            output = normalizer_fn(output, **normalizer_params)
+        elif params.get('biases_initializer', True) is not None:
+            biases = tf.get_variable(
+                '{}/biases'.format(scope), [channels],
+                initializer=tf.zeros_initializer())
+            output = tf.nn.bias_add(output, biases)
+        if activation_fn:
+            output = activation_fn(output)
+        return output
+
+    @staticmethod
+    def _weights_shape(node, tensor, params):
+        channels = int(tensor.shape[-1])
+        if node.params.type == 'fully_connected':
+            return [channels, params['num_outputs']]
+        kernel = params['kernel_size']
+        if isinstance(kernel, int):
+            kernel = [kernel, kernel]
+        return list(kernel) + [channels, params['num_outputs']]
+
+    @staticmethod
+    def _activation_shapes(node, tensor, params):
+        in_shape = [1] + [int(d) for d in tensor.shape[1:]]
+        if node.params.type == 'fully_connected':
+            return in_shape, [1, params['num_outputs']]
+        _, height, width, _ = in_shape
+        kernel = params['kernel_size']
+        if isinstance(kernel, int):
+            kernel = [kernel, kernel]
+        stride = params.get('stride', 1)
+        if isinstance(stride, int):
+            stride = [stride, stride]
+        if params.get('padding', 'SAME') == 'VALID':
+            height -= kernel[0] - 1
+            width -= kernel[1] - 1
+        out_shape = [
+            1, int(math.ceil(height / stride[0])),
+            int(math.ceil(width / stride[1])), params['num_outputs']]
+        return in_shape, out_shape
+
+    def _low_rank(self, node, tensor, params):
+        if self.is_training:
+            return None
+        if node.params.get('num_groups', 1) != 1:
+            return None
+        if node.params.get('rate', 1) not in (1, [1, 1]):
+            return None
+        overriders = self._transformer._overriders.get(node, {})
+        o = overriders.get('weights')
+        if not isinstance(o, LowRankApproximation):
+            return None
+        shape = self._weights_shape(node, tensor, params)
+        in_shape, out_shape = self._activation_shapes(node, tensor, params)
+        if not o.is_factored(shape, in_shape, out_shape):
+            return None
+        return o
+
+    def _instantiate_low_rank(self, node, tensor, params, overrider):
+        """
+        Executes a layer as two thin layers with the factored weights of its
+        low-rank approximation.
+        """
+        scope = params['scope']
+        num_outputs = params['num_outputs']
+        fully_connected = node.params.type == 'fully_connected'
+        shape = self._weights_shape(node, tensor, params)
+        # the full weights are kept in checkpoints, creating them also
+        # applies the overrider
+        tf.get_variable(
+            '{}/weights'.format(scope), shape,
+            initializer=params.get(
+                'weights_initializer',
+                tf.contrib.layers.xavier_initializer()),
+            regularizer=params.get('weights_regularizer', None))
+        log.debug(
+            'Instantiating {!r} as factored layers with rank {}.'
+            .format(node.formatted_name(), overrider.info().rank))
+        first, second = overrider.factors()
+        if fully_connected:
+            output = tf.matmul(tf.matmul(tensor, first), second)
+            return self._finalize(output, params, num_outputs)
+        stride = params.get('stride', 1)
+        if isinstance(stride, int):
+            stride = [stride, stride]
+        padding = params.get('padding', 'SAME')
+        # K_h x 1 then 1 x K_w, both paddings are separable
+        output = tf.nn.conv2d(tensor, first, [1, stride[0], 1, 1], padding)
+        output = tf.nn.conv2d(output, second, [1, 1, stride[1], 1], padding)
+        return self._finalize(output, params, num_outputs)
+
+    @staticmethod
+    def _grouped_convolution(tensor, weights, groups, stride, padding):
+        """
+        Group-wise convolution with a single kernel.  `weights` has shape
+        [K_h, K_w, C_in / groups, groups x M], where the slices of M output
+        channels convolve their respective groups of input channels.
+        """
+        kh, kw, group_channels, out_channels = (
+            int(d) for d in weights.shape)
+        multiplier = out_channels // groups
+        if group_channels == 1 and stride[1] == stride[2]:
+            # each group is a single channel, i.e. a depthwise convolution
+            # with M outputs for each channel, in the same output order
+            weights = tf.reshape(weights, [kh, kw, groups, multiplier])
+            return tf.nn.depthwise_conv2d(tensor, weights, stride, padding)
+        # block-diagonal weights [K_h, K_w, C_in, groups x M]
+        weights = tf.reshape(
+            weights, [kh, kw, 1, group_channels, groups, multiplier])
+        mask = np.eye(groups, dtype=np.float32).reshape(
+            [1, 1, groups, 1, groups, 1])
+        weights = tf.reshape(
+            weights * mask, [kh, kw, groups * group_channels, out_channels])
+        return tf.nn.conv2d(tensor, weights, stride, padding)
+
     def instantiate_convolution(self, node, tensor, params):
+        layer = self._sparse_layer(node)
+        if layer is not None:
+            return self._instantiate_sparse(node, tensor, params, layer)
+        overrider = self._low_rank(node, tensor, params)
+        if overrider is not None:
+            return self._instantiate_low_rank(node, tensor, params, overrider)
         scope = params.get('scope')
         norm_scope = scope + '/BatchNorm'
         groups = params.pop('num_groups', 1)
@@ -60,17 +235,11 @@ class Layers(TFNetBase, LayerEstimateMixin):
         weights = tf.get_variable(
             '{}/groupwise_weights'.format(scope), weights_shape,
             initializer=weights_initializer, regularizer=weights_regularizer)
-        weights_slices = tf.split(weights, groups, axis=-1)
 
         # convolution
-        input_slices = tf.split(tensor, groups, axis=-1)
-        output_slices = []
-        iterator = enumerate(zip(input_slices, weights_slices))
-        for i, (each, weights) in iterator:
-            with tf.name_scope('{}_{}'.format(scope, i)):
-                each = tf.nn.conv2d(each, weights, stride, padding)
-            output_slices.append(each)
-        output = tf.concat(output_slices, axis=-1)
+        with tf.name_scope(scope):
+            output = self._grouped_convolution(
+                tensor, weights, groups, stride, padding)
 
         # add bias
         use_bias = params.pop('use_bias', True)
@@ -137,6 +306,12 @@ class Layers(TFNetBase, LayerEstimateMixin):
         return slim.max_pool2d(tensor, **params)
 
     def instantiate_fully_connected(self, node, tensor, params):
+        layer = self._sparse_layer(node)
+        if layer is not None:
+            return self._instantiate_sparse(node, tensor, params, layer)
+        overrider = self._low_rank(node, tensor, params)
+        if overrider is not None:
+            return self._instantiate_low_rank(node, tensor, params, overrider)
         return slim.fully_connected(tensor, **params)
 
     def instantiate_softmax(self, node, tensor, params):
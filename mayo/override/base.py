@@ -29,6 +29,53 @@ def _getter_not_initialized(*args, **kwargs):
         'It is most likely that the overrider is not applied.')
 
 
+def _is_tensor(value):
+    return isinstance(value, (tf.Tensor, tf.Variable))
+
+
+def run_fetches(session, fetches):
+    """
+    Evaluates all tensors in `fetches`, a nested structure of dicts, lists
+    and tuples, with a single `session.run()`, and returns the same
+    structure with tensors replaced by their values.  Other values are left
+    unchanged.
+    """
+    tensors = []
+
+    def collect(value):
+        if isinstance(value, dict):
+            value = value.values()
+        elif not isinstance(value, (list, tuple)):
+            if _is_tensor(value):
+                tensors.append(value)
+            return
+        for each in value:
+            collect(each)
+
+    collect(fetches)
+    values = iter(session.run(tensors) if tensors else [])
+
+    def pack(value):
+        if isinstance(value, dict):
+            return {k: pack(v) for k, v in value.items()}
+        if isinstance(value, (list, tuple)):
+            return value.__class__(pack(v) for v in value)
+        if _is_tensor(value):
+            return next(values)
+        return value
+
+    return pack(fetches)
+
+
+def batch_info(session, overriders):
+    """
+    Gathers `.info()` of all `overriders`, with tensors required by all of
+    them fetched in a single run.  Overriders not yet applied give `None`.
+    """
+    values = run_fetches(session, [o.info_fetches() for o in overriders])
+    return [o.info(v) for o, v in zip(overriders, values)]
+
+
 class Parameter(object):
     """ `tf.Variable`-based overrider hyperparameter.  """
     _dtype_map = {
@@ -229,11 +276,21 @@ class OverriderBase(object):
             return
         self.session.assign(self.before, self.after)
 
-    def dump(self):
-        return dict(self._dump(), name=self.name)
+    def dump_fetches(self):
+        """Tensors required by `.dump()`.  """
+        return self._parameter_variables
+
+    def dump(self, values=None):
+        """
+        Dumps overrider parameters, `values` are the evaluated
+        `.dump_fetches()`, which are fetched if not provided.
+        """
+        if values is None:
+            values = run_fetches(self.session, self.dump_fetches())
+        return dict(self._dump(values), name=self.name)
 
-    def _dump(self):
-        return self.session.run(self._parameter_variables)
+    def _dump(self, values):
+        return values
 
     def reset(self):
         """Reset internal variables to their respective initial values.  """
@@ -247,15 +304,33 @@ class OverriderBase(object):
         kwargs['name'] = self.name
         return Tuple(**kwargs)
 
-    def _info(self):
+    def _info_fetches(self):
+        """
+        Override this method to declare the tensors required by `._info()`
+        in a nested structure of dicts and lists.
+        """
+        return {}
+
+    def info_fetches(self):
+        if not self._applied:
+            return {}
+        return self._info_fetches()
+
+    def _info(self, values):
+        """
+        Override this method to summarize the overrider with `values`, the
+        evaluated `._info_fetches()`.
+        """
         return self._info_tuple()
 
-    def info(self):
+    def info(self, values=None):
         if not self._applied:
             return None
-        return self._info()
+        if values is None:
+            values = run_fetches(self.session, self.info_fetches())
+        return self._info(values)
 
-    def estimate(self, layer_info, info):
+    def estimate(self, layer_info, info, in_shape, out_shape):
         """ Override this method to modify layer estimation statistics.  """
         return layer_info
 
@@ -324,10 +399,15 @@ class ChainOverrider(OverriderBase, collections.Sequence):
         for o in self._overriders:
             o.reset()
 
-    def _dump(self):
-        return [o.dump() for o in self._overriders]
+    def dump_fetches(self):
+        return [o.dump_fetches() for o in self._overriders]
+
+    def dump(self, values=None):
+        if values is None:
+            values = run_fetches(self.session, self.dump_fetches())
+        return [o.dump(v) for o, v in zip(self._overriders, values)]
 
-    def _info(self):
+    def _info(self, values):
         return self._info_tuple(overriders=self._overriders)
 
     def __repr__(self):
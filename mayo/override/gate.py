@@ -6,10 +6,13 @@ from mayo.override.base import OverriderBase, Parameter
 
 
 class GaterBase(OverriderBase):
-    def _info(self):
+    def _info_fetches(self):
         # FIXME it doesn't make sense to run `gate` once as its density
         # varies from run to run.
-        gate = util.cast(self.session.run(self.gate), int)
+        return {'gate': self.gate}
+
+    def _info(self, values):
+        gate = util.cast(values['gate'], int)
         density = Percent(util.sum(gate) / util.count(gate))
         return self._info_tuple(
             gate=self.gate.name, density=density, count_=gate.size)
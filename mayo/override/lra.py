@@ -1,70 +1,161 @@
 import tensorflow as tf
-import numpy as np
 
+from mayo.util.linalg import truncated_svd
 from mayo.override.base import OverriderBase, Parameter
 
 
 class LowRankApproximation(OverriderBase):
+    """
+    Approximates weights with their top singular triplets.
+
+    Convolution weights [K_h, K_w, C_in, C_out] are viewed as a
+    [K_h x C_in, K_w x C_out] matrix, so that a rank-r approximation is
+    equivalent to a K_h x 1 convolution with r outputs followed by a 1 x K_w
+    convolution.  Fully-connected weights are approximated directly as two
+    thin matrices.  With `factored`, inference instantiates these two layers
+    instead of reconstructing the weights, if they need fewer MACs.
+    """
     singular = Parameter('singular', None, None, 'float')
     left = Parameter('left', None, None, 'float')
     right = Parameter('right', None, None, 'float')
 
-    def __init__(self, session, should_update=True, ranks=0):
+    def __init__(
+            self, session, should_update=True, ranks=0, rank=None,
+            factored=True, oversampling=10, iterations=2):
         super().__init__(session, should_update)
         # ranks to prune away
         self.ranks = ranks
+        # ranks to keep, overrides `ranks` if specified
+        self.rank = rank
+        self.factored = factored
+        self.oversampling = oversampling
+        self.iterations = iterations
 
-    def _parameter_initial(self, value):
-        dimensions = value.shape
-        left_dimension = dimensions[0] * dimensions[2]
-        right_dimension = dimensions[1] * dimensions[3]
-        left_shape = (left_dimension, left_dimension)
-        right_shape = (right_dimension, right_dimension)
-        rows = int(left_dimension)
-        columns = int(right_dimension)
+    @staticmethod
+    def matrix_shape(shape):
+        shape = [int(d) for d in shape]
+        if len(shape) == 4:
+            kh, kw, cin, cout = shape
+            return kh * cin, kw * cout
+        if len(shape) == 2:
+            return tuple(shape)
+        raise ValueError(
+            'Low-rank approximation expects convolution or fully-connected '
+            'weights, found shape {!r}.'.format(shape))
+
+    def kept_rank(self, shape):
+        rows, columns = self.matrix_shape(shape)
+        full = min(rows, columns)
+        rank = full - self.ranks if self.rank is None else self.rank
+        if not 0 < rank <= full:
+            raise ValueError(
+                'Rank {} is out of range for weights of shape {!r}.'
+                .format(rank, shape))
+        return rank
+
+    def macs(self, shape, in_shape, out_shape):
+        """
+        The MACs of a layer with weights of `shape`, input and output
+        activations of `in_shape` and `out_shape`, and the MACs of its two
+        factored layers.
+        """
+        rank = self.kept_rank(shape)
+        if len(shape) == 2:
+            rows, columns = shape
+            return rows * columns, rank * (rows + columns)
+        kh, kw, cin, cout = shape
+        _, _, in_width, _ = in_shape
+        _, out_height, out_width, _ = out_shape
+        full = out_height * out_width * kh * kw * cin * cout
+        # the K_h x 1 convolution only strides along the height, its output
+        # has the output height and the input width
+        first = out_height * in_width * kh * cin * rank
+        second = out_height * out_width * kw * rank * cout
+        return full, first + second
 
-        singular_shape = left_dimension if rows < columns else right_dimension
+    def is_factored(self, shape, in_shape, out_shape):
+        """
+        Whether layers with weights of `shape`, input and output activations
+        of `in_shape` and `out_shape` are executed as two thin layers, which
+        is only when these are cheaper than the full layer.
+        """
+        if not self.factored:
+            return False
+        shape = [int(d) for d in shape]
+        full, factored = self.macs(shape, in_shape, out_shape)
+        return factored < full
 
+    def _parameter_initial(self, value):
+        rows, columns = self.matrix_shape(value.shape)
+        rank = self.kept_rank(value.shape)
         self._parameter_config = {
             'singular': {
                 'initial': tf.ones_initializer(dtype=tf.float32),
-                'shape': singular_shape,
+                'shape': [rank],
             },
             'left': {
                 'initial': tf.ones_initializer(dtype=tf.float32),
-                'shape': left_shape,
+                'shape': [rows, rank],
             },
             'right': {
                 'initial': tf.ones_initializer(dtype=tf.float32),
-                'shape': right_shape,
+                'shape': [rank, columns],
             }
         }
-        return (rows, columns)
 
     def _apply(self, value):
-        rows, columns = self._parameter_initial(value)
-        if rows < columns:
-            singular = tf.expand_dims(self.singular, 1) * tf.eye(rows, columns)
-        else:
-            singular = tf.expand_dims(self.singular, 0) * tf.eye(rows, columns)
+        self._parameter_initial(value)
+        reconstruct = tf.matmul(self.left * self.singular, self.right)
+        if len(value.shape) == 2:
+            return reconstruct
+        kh, kw, cin, cout = (int(d) for d in value.shape)
+        reconstruct = tf.reshape(reconstruct, [kh, cin, kw, cout])
+        return tf.transpose(reconstruct, [0, 2, 1, 3])
 
-        svd_construct = tf.matmul(
-            tf.matmul(self.left, singular), self.right)
-        return tf.reshape(svd_construct, value.shape)
+    def factors(self):
+        """
+        The factored weights, i.e. [K_h, 1, C_in, r] and [1, K_w, r, C_out]
+        convolution kernels, or [C_in, r] and [r, C_out] matrices.
+        """
+        first = self.left * self.singular
+        second = self.right
+        shape = [int(d) for d in self.before.shape]
+        if len(shape) == 2:
+            return first, second
+        kh, kw, cin, cout = shape
+        rank = int(self.singular.shape[0])
+        first = tf.reshape(first, [kh, 1, cin, rank])
+        second = tf.reshape(second, [rank, kw, cout])
+        second = tf.expand_dims(tf.transpose(second, [1, 0, 2]), 0)
+        return first, second
 
     def _update(self):
         value = self.session.run(self.before)
-        dimensions = value.shape
-        if len(dimensions) == 4:
-            meshed = np.reshape(
-                value,
-                [dimensions[0] * dimensions[2], dimensions[1] * dimensions[3]])
-        elif len(dimensions) == 2:
-            meshed = value
-        else:
-            raise ValueError('uh')
-        left, singular, right = np.linalg.svd(meshed, full_matrices=True)
-        singular[-self.ranks:] = 0.0
+        if value.ndim == 4:
+            value = value.transpose([0, 2, 1, 3])
+        value = value.reshape(self.matrix_shape(self.before.shape))
+        left, singular, right = truncated_svd(
+            value, self.kept_rank(self.before.shape),
+            self.oversampling, self.iterations)
         self.session.assign(self.left, left)
         self.session.assign(self.singular, singular)
         self.session.assign(self.right, right)
+
+    def _info(self, values):
+        rows, columns = self.matrix_shape(self.before.shape)
+        return self._info_tuple(
+            rank=self.kept_rank(self.before.shape), full=min(rows, columns))
+
+    def estimate(self, layer_info, info, in_shape, out_shape):
+        shape = [int(d) for d in self.before.shape]
+        if not self.is_factored(shape, in_shape, out_shape):
+            return layer_info
+        full, factored = self.macs(shape, in_shape, out_shape)
+        rows, columns = self.matrix_shape(shape)
+        rank = self.kept_rank(shape)
+        weights = rank * (rows + columns) / (rows * columns)
+        update = {
+            'macs': int(layer_info.get('macs', 0) * factored / full),
+            'weights': int(layer_info.get('weights', 0) * weights),
+        }
+        return dict(layer_info, **update)
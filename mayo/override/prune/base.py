@@ -28,8 +28,11 @@ class PrunerBase(OverriderBase):
         mask = self._updated_mask(self.before, self.mask)
         self.session.assign(self.mask, mask)
 
-    def _info(self):
-        mask = util.cast(self.session.run(self.mask), int)
+    def _info_fetches(self):
+        return {'mask': self.mask}
+
+    def _info(self, values):
+        mask = util.cast(values['mask'], int)
         density = Percent(util.sum(mask) / util.count(mask))
         return self._info_tuple(
             mask=self.mask.name, density=density, count_=mask.size)
@@ -63,7 +66,9 @@ class ChannelPrunerBase(OverriderBase):
                 'shape': self.num_channels,
             },
         }
-        mask = tf.reshape(self.mask, (1, 1, 1, -1))
+        mask = self.mask
+        if util.is_tensor(mask):
+            mask = tf.reshape(mask, (1, 1, 1, -1))
         return value * util.cast(mask, float)
 
     def _updated_mask(self, var, mask):
@@ -74,8 +79,11 @@ class ChannelPrunerBase(OverriderBase):
         mask = self._updated_mask(self.before, self.mask)
         self.session.assign(self.mask, mask)
 
-    def _info(self):
-        mask = util.cast(self.session.run(self.mask), int)
+    def _info_fetches(self):
+        return {'mask': self.mask}
+
+    def _info(self, values):
+        mask = util.cast(values['mask'], int)
         density = Percent(util.sum(mask) / util.count(mask))
         return self._info_tuple(
             mask=self.mask.name, density=density, count_=mask.size)
@@ -22,9 +22,12 @@ class MeanStdPruner(PrunerBase):
     def _updated_mask(self, var, mask):
         return util.abs(var) > self._threshold(var)
 
-    def _info(self):
-        _, mask, density, count = super()._info()
-        alpha = self.session.run(self.alpha)
+    def _info_fetches(self):
+        return dict(super()._info_fetches(), alpha=self.alpha)
+
+    def _info(self, values):
+        _, mask, density, count = super()._info(values)
+        alpha = values['alpha']
         return self._info_tuple(
             mask=mask, alpha=alpha, density=density, count_=count)
 
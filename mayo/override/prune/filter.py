@@ -43,9 +43,12 @@ class FilterPruner(PrunerBase):
         # mean, var = tf.nn.moments(util.abs(tensor), axes=[0, 1])
         return l1_norm > self._threshold(l1_norm, density)
 
-    def _info(self):
-        _, mask, density, count = super()._info()
-        density = self.session.run(self.density)
+    def _info_fetches(self):
+        return dict(super()._info_fetches(), density=self.density)
+
+    def _info(self, values):
+        _, mask, density, count = super()._info(values)
+        density = values['density']
         return self._info_tuple(
             mask=mask, density=density, count_=count)
 
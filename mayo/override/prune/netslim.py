@@ -105,7 +105,7 @@ class NetworkSlimmer(ChannelPrunerBase):
             return util.logical_and(mask, new_mask)
         return new_mask
 
-    def estimate(self, layer_info, info):
+    def estimate(self, layer_info, info, in_shape, out_shape):
         mask = [self.session.run(self.mask)]
         macs = layer_info.get('macs', 0)
         weights = layer_info.get('weights', 0)
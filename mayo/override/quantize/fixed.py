@@ -77,10 +77,12 @@ class FixedPointQuantizer(QuantizerBase):
     def _apply(self, value):
         return self._quantize(value)
 
-    def _info(self):
-        width = int(self.eval(self.width))
-        point = int(self.eval(self.point))
-        return self._info_tuple(width=width, point=point)
+    def _info_fetches(self):
+        return {'width': self.width, 'point': self.point}
+
+    def _info(self, values):
+        return self._info_tuple(
+            width=int(values['width']), point=int(values['point']))
 
 
 class DynamicFixedPointQuantizerBase(FixedPointQuantizer):
@@ -212,6 +214,9 @@ class LogQuantizer(QuantizerBase):
     def _update(self):
         self.quantizer.update()
 
-    def _info(self):
-        info = self.quantizer.info()._asdict()
+    def _info_fetches(self):
+        return self.quantizer.info_fetches()
+
+    def _info(self, values):
+        info = self.quantizer.info(values)._asdict()
         return self._info_tuple(**info)
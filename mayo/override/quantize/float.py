@@ -145,13 +145,18 @@ class FloatingPointQuantizer(QuantizerBase):
         loss = ((value - quantized) ** 2).mean()
         return (loss, exponent_bias)
 
-    def _info(self):
-        width = int(self.eval(self.width))
-        mantissa_width = int(self.eval(self.mantissa_width))
-        exponent_bias = int(self.eval(self.exponent_bias))
+    def _info_fetches(self):
+        return {
+            'width': self.width,
+            'mantissa_width': self.mantissa_width,
+            'exponent_bias': self.exponent_bias,
+        }
+
+    def _info(self, values):
         return self._info_tuple(
-            width=width, mantissa_width=mantissa_width,
-            exponent_bias=exponent_bias)
+            width=int(values['width']),
+            mantissa_width=int(values['mantissa_width']),
+            exponent_bias=int(values['exponent_bias']))
 
     def _update(self):
         value = self.eval(self.before)
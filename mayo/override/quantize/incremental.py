@@ -80,8 +80,14 @@ class IncrementalQuantizer(OverriderBase):
         new_mask = self._policy(value, quantized, mask, self.interval)
         self.session.assign(self.mask, new_mask)
 
-    def dump(self):
-        return self.quantizer.dump()
+    def dump_fetches(self):
+        return self.quantizer.dump_fetches()
 
-    def _info(self):
-        return self.quantizer._info()
+    def dump(self, values=None):
+        return self.quantizer.dump(values)
+
+    def _info_fetches(self):
+        return self.quantizer._info_fetches()
+
+    def _info(self, values):
+        return self.quantizer._info(values)
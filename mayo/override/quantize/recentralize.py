@@ -121,10 +121,16 @@ class Recentralizer(OverriderBase):
         for quantizer in self.parameter_quantizers.values():
             quantizer.update()
 
-    def _info(self):
-        info = self.quantizer.info()._asdict()
+    def _info_fetches(self):
+        fetches = {
+            name: quantizer.info_fetches()
+            for name, quantizer in self.parameter_quantizers.items()}
+        return {'quantizer': self.quantizer.info_fetches(), 'params': fetches}
+
+    def _info(self, values):
+        info = self.quantizer.info(values['quantizer'])._asdict()
         for name, quantizer in self.parameter_quantizers.items():
-            param_info = quantizer.info()
+            param_info = quantizer.info(values['params'][name])
             param_info = {
                 '{}_{}'.format(name, key): value
                 for key, value in param_info._asdict().items()
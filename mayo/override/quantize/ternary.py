@@ -45,9 +45,11 @@ class TernaryQuantizer(QuantizerBase):
     def _apply(self, value):
         return self._quantize(value)
 
-    def _info(self):
-        base = int(self.eval(self.base))
-        return self._info_tuple(width=2, base=base)
+    def _info_fetches(self):
+        return {'base': self.base}
+
+    def _info(self, values):
+        return self._info_tuple(width=2, base=int(values['base']))
 
 
 class ChannelTernaryQuantizer(TernaryQuantizer):
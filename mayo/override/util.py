@@ -28,7 +28,7 @@ def cast(value, dtype):
         dtypes = {
             float: np.float32,
             int: np.int32,
-            bool: np.bool,
+            bool: np.bool_,
         }
         return np.cast[dtypes[dtype]](value)
     dtypes = {
@@ -2,7 +2,9 @@ import re
 import os
 import ast
 import copy
+import glob
 import operator
+import functools
 import collections
 
 import yaml
@@ -10,12 +12,85 @@ import yaml
 from mayo.util import recursive_apply, import_from_string
 
 
+# the C-accelerated loader if available, which constructs the same objects
+_Loader = getattr(yaml, 'CLoader', yaml.Loader)
+# parsed YAML files, keyed by their absolute paths
+_yaml_cache = {}
+
+
+def _parse_yaml(path):
+    path = os.path.abspath(path)
+    stat = os.stat(path)
+    version = (stat.st_mtime_ns, stat.st_size)
+    cached = _yaml_cache.get(path)
+    if cached is not None and cached[0] == version:
+        return cached[1]
+    with open(path, 'r') as f:
+        data = yaml.load(f, Loader=_Loader)
+    _yaml_cache[path] = (version, data)
+    return data
+
+
+def load_yaml(path):
+    """
+    Loads a YAML file.  Parsed files are cached until they are modified,
+    and each call returns a new copy of the content, which can be mutated
+    freely.
+    """
+    return copy.deepcopy(_parse_yaml(path))
+
+
+def warm_yaml_cache(paths):
+    """
+    Parses and caches YAML files in `paths`, which can also be directories
+    to search recursively for YAML files.
+    """
+    for path in paths:
+        if not os.path.isdir(path):
+            _parse_yaml(path)
+            continue
+        for suffix in ('yaml', 'yml'):
+            pattern = os.path.join(path, '**', '*.' + suffix)
+            for each in glob.glob(pattern, recursive=True):
+                _parse_yaml(each)
+
+
+_placeholder_regex = re.compile(
+    r'\$\((\.?[_a-zA-Z][_a-zA-Z0-9\.\s\n\t]*)\)', re.MULTILINE)
+
+
+@functools.lru_cache(maxsize=None)
+def _parse_expression(content):
+    return ast.parse(content, mode='eval').body
+
+
+@functools.lru_cache(maxsize=None)
+def _split_dot_path(dot_path_key):
+    dot_path = dot_path_key.split('.')
+    # escape \.
+    new_dot_path = []
+    for v in dot_path:
+        if new_dot_path and new_dot_path[-1].endswith('\\'):
+            new_dot_path[-1] += '.' + v
+        else:
+            new_dot_path.append(v)
+    return tuple(new_dot_path)
+
+
+def _copy_sequences(value):
+    if isinstance(value, (tuple, list, set, frozenset)):
+        return value.__class__(_copy_sequences(v) for v in value)
+    return value
+
+
 class YamlTag(object):
     tag = None
 
     @classmethod
     def register(cls):
         yaml.add_constructor(cls.tag, cls.constructor)
+        if _Loader is not yaml.Loader:
+            yaml.add_constructor(cls.tag, cls.constructor, Loader=_Loader)
         yaml.add_representer(cls, cls.representer)
 
     @classmethod
@@ -65,8 +140,7 @@ class ArithTag(YamlScalarTag):
     }
 
     def value(self):
-        tree = ast.parse(self.content, mode='eval').body
-        return self._eval(tree)
+        return self._eval(_parse_expression(self.content))
 
     def _eval(self, n):
         if isinstance(n, ast.Num):
@@ -144,6 +218,16 @@ ExecTag.register()
 EvalTag.register()
 
 
+class _ResolvedCache(dict):
+    """ Resolved values of keys in a configuration tree.  """
+    def __init__(self):
+        super().__init__()
+        # number of evaluations of tags other than !arith, values that
+        # depend on them are not cached, as each evaluation can produce
+        # a new object
+        self.num_volatile = 0
+
+
 class _DotDict(collections.MutableMapping):
     def __init__(self, data, root=None, normalize=True):
         if not isinstance(data, collections.Mapping):
@@ -152,12 +236,23 @@ class _DotDict(collections.MutableMapping):
                     self.__class__, type(data)))
         super().__init__()
         self.set('_root', root or self)
+        if root is None:
+            cache = _ResolvedCache()
+        elif isinstance(root, _DotDict):
+            cache = root._cache
+        else:
+            # we cannot track changes in a foreign root mapping
+            cache = None
+        self.set('_cache', cache)
         if normalize:
             data = self._normalize(data)
         self.set('_mapping', data)
 
     def _normalize(self, value):
         def normalize_map(mapping):
+            if all(isinstance(k, str) and '.' not in k for k in mapping):
+                # no dot-path keys to expand
+                return mapping
             d = _DotDict({}, normalize=False)
             for key, value in mapping.items():
                 d[key] = value
@@ -181,7 +276,14 @@ class _DotDict(collections.MutableMapping):
                 d[k] = md_k
 
     def merge(self, md):
-        self._merge(self, md)
+        self._merge(self, self._normalize(md))
+        self._invalidate()
+
+    def _invalidate(self):
+        # placeholders can refer to any key in the tree, so a change
+        # anywhere invalidates all resolved values
+        if self._cache is not None:
+            self._cache.clear()
 
     @staticmethod
     def _dot_path(dot_path_key, dictionary, setdefault=None):
@@ -191,18 +293,10 @@ class _DotDict(collections.MutableMapping):
                 'current object {!r} is not key-addressable.'
                 .format(dot_path_key, key, keyable))
         try:
-            dot_path = dot_path_key.split('.')
-        except AttributeError:
+            *dot_path, final_key = _split_dot_path(dot_path_key)
+        except (AttributeError, TypeError):
             raise KeyError(
                 'Key path {!r} is not a string'.format(dot_path_key))
-        # escape \.
-        new_dot_path = []
-        for v in dot_path:
-            if new_dot_path and new_dot_path[-1].endswith('\\'):
-                new_dot_path[-1] += '.' + v
-            else:
-                new_dot_path.append(v)
-        *dot_path, final_key = new_dot_path
         keyable = dictionary
         for index, key in enumerate(dot_path):
             try:
@@ -232,12 +326,15 @@ class _DotDict(collections.MutableMapping):
 
     def _eval(self, value, parent):
         def eval_tag(value):
+            if not isinstance(value, ArithTag) and self._cache is not None:
+                self._cache.num_volatile += 1
             return value.__class__(self._eval(value.content, parent)).value()
 
         def eval_str(value):
-            regex = r'\$\((\.?[_a-zA-Z][_a-zA-Z0-9\.\s\n\t]*)\)'
+            if '$(' not in value:
+                return value
             while True:
-                keys = re.findall(regex, value, re.MULTILINE)
+                keys = _placeholder_regex.findall(value)
                 if not keys:
                     break
                 for k in keys:
@@ -277,8 +374,26 @@ class _DotDict(collections.MutableMapping):
         return recursive_apply(value, funcs, skip_map)
 
     def __getitem__(self, key):
-        obj, key = self._dot_path(key, self._mapping)
-        return self._eval(obj[key], obj)
+        cache = self._cache
+        if cache is None:
+            obj, key = self._dot_path(key, self._mapping)
+            return self._eval(obj[key], obj)
+        try:
+            mapping, value = cache[id(self._mapping), key]
+        except (KeyError, TypeError):
+            pass
+        else:
+            if mapping is self._mapping:
+                return _copy_sequences(value)
+        obj, final_key = self._dot_path(key, self._mapping)
+        num_volatile = cache.num_volatile
+        value = self._eval(obj[final_key], obj)
+        if cache.num_volatile == num_volatile:
+            # keeps a reference to the mapping, so that its id is not
+            # reused while the entry is alive
+            cache[id(self._mapping), key] = (self._mapping, value)
+            return _copy_sequences(value)
+        return value
     __getattr__ = __getitem__
 
     def __setitem__(self, key, value):
@@ -286,6 +401,7 @@ class _DotDict(collections.MutableMapping):
         if isinstance(value, _DotDict):
             value = value._mapping
         obj[key] = value
+        self._invalidate()
     __setattr__ = __setitem__
 
     def set(self, key, value):
@@ -295,6 +411,7 @@ class _DotDict(collections.MutableMapping):
     def __delitem__(self, key):
         obj, key = self._dot_path(key, self._mapping)
         del obj[key]
+        self._invalidate()
     __delattr__ = __delitem__
 
     def __iter__(self):
@@ -315,13 +432,17 @@ class ConfigBase(_DotDict):
 
     def merge(self, dictionary):
         super().merge(dictionary)
+        # only normalize the parts of the dictionary the hooks look for
+        roots = {k.split('.')[0] for k in self._merge_hook}
+        dictionary = _DotDict({
+            k: v for k, v in dictionary.items()
+            if str(k).split('.')[0] in roots})
         for key, func in self._merge_hook.items():
-            if key in _DotDict(dictionary):
+            if key in dictionary:
                 func()
 
     def yaml_update(self, file):
-        with open(file, 'r') as f:
-            dictionary = yaml.load(f)
+        dictionary = load_yaml(file)
         imports = dictionary.pop('_import', None)
         if imports:
             if isinstance(imports, str):
@@ -334,7 +455,7 @@ class ConfigBase(_DotDict):
 
     def override_update(self, key, value):
         if isinstance(value, str):
-            value = yaml.load(value)
+            value = yaml.load(value, Loader=_Loader)
         self.merge({key: value})
 
     def to_yaml(self, file=None):
@@ -1,8 +1,8 @@
 from mayo.session.train import Train
 from mayo.session.test import Test
-from mayo.session.eval import Evaluate
+from mayo.session.eval import Evaluate, Plotting
 from mayo.session.search import Search
 from mayo.session.profile import Profile
 
 
-__all__ = [Train, Test, Evaluate, Search, Profile]
+__all__ = [Train, Test, Evaluate, Plotting, Search, Profile]
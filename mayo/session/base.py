@@ -9,6 +9,7 @@ from mayo.util import (
     memoize_property, flatten, object_from_params,
     Change, Table, Percent, print_variables)
 from mayo.estimate import ResourceEstimator
+from mayo.evaluate import shard_size
 from mayo.override import ChainOverrider
 from mayo.session.checkpoint import CheckpointHandler
 
@@ -57,6 +58,8 @@ class SessionMeta(type):
 
 class SessionBase(object, metaclass=SessionMeta):
     mode = None
+    # full gate maps are memory-intensive, and only kept for plotting
+    keep_gate_maps = False
 
     def __init__(self, config):
         super().__init__()
@@ -135,7 +138,11 @@ class SessionBase(object, metaclass=SessionMeta):
     def num_examples(self):
         if self.mode == 'test':
             return len(self.task._preprocessor.files)
-        return self.config.dataset.num_examples_per_epoch[self.mode]
+        num_examples = self.config.dataset.num_examples_per_epoch[self.mode]
+        shard = self.config.system.preprocess.get('shard', {})
+        # number of records in the shard read by this session
+        return shard_size(
+            num_examples, shard.get('num', 1), shard.get('index', 0))
 
     @property
     def num_gpus(self):
@@ -205,11 +212,42 @@ class SessionBase(object, metaclass=SessionMeta):
         self._run_assignments()
 
     def overriders_dump(self):
-        data = self._overriders_call('dump')
+        from mayo.override.base import run_fetches
+        values = run_fetches(self, self._overriders_call('dump_fetches'))
+        data = {}
+        for node, overriders in self.overriders.items():
+            odata = data.setdefault(node, {})
+            for k, o in overriders.items():
+                if k == 'gradient':
+                    odata[k] = {
+                        gk: go.dump(values[node][k][gk])
+                        for gk, go in o.items()}
+                else:
+                    odata[k] = o.dump(values[node][k])
         name = '-'.join([self.config.model.name, self.config.dataset.name])
         log.info('Dumping overrider parameters to {!r}...'.format(name))
         np.save(name, data)
 
+    def set_gate_density(self, density):
+        """Adjusts the density of all gated convolutions.  """
+        from mayo.net.tf.gate.base import density_collection
+        variables = self.get_collection(density_collection, first_gpu=True)
+        if not variables:
+            log.warn('There are no gated convolutions to adjust.')
+        for var in variables:
+            self.assign(var, density)
+
+    @memoize_property
+    def _gate_statistics_initializer(self):
+        from mayo.net.tf.gate.base import statistics_collection
+        variables = self.get_collection(statistics_collection, first_gpu=True)
+        return tf.variables_initializer(variables)
+
+    def reset_gate_statistics(self):
+        """Resets streaming statistics of gated convolutions.  """
+        self.raw_run(self._gate_statistics_initializer)
+        self.estimator.flush_all('gate.stream')
+
     def get_collection(self, key, first_gpu=False):
         func = lambda net, *args: tf.get_collection(key)
         collections = list(self.task.map(func))
@@ -288,7 +326,7 @@ class SessionBase(object, metaclass=SessionMeta):
     def _initialize_variables(self):
         # ensure variables are initialized
         uninit_vars = []
-        for var in self.global_variables():
+        for var in self.global_variables() + tf.local_variables():
             if var not in self.initialized_variables:
                 uninit_vars.append(var)
         if uninit_vars:
@@ -353,3 +391,18 @@ class SessionBase(object, metaclass=SessionMeta):
     def plot(self):
         from mayo.plot import Plot
         Plot(self, self.config).plot()
+
+    def shrink(self):
+        from mayo.shrink import Shrink
+        self.load_checkpoint(self.config.system.checkpoint.load)
+        return Shrink(self, self.config).shrink()
+
+    def export_sparse(self, path):
+        from mayo.sparse import SparseExport
+        self.load_checkpoint(self.config.system.checkpoint.load)
+        SparseExport(self, self.config).export(path)
+
+    def export_compressed(self, path):
+        from mayo.compress import Compress
+        self.load_checkpoint(self.config.system.checkpoint.load)
+        Compress(self, self.config).export(path)
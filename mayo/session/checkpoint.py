@@ -3,8 +3,10 @@ import re
 import glob
 
 import yaml
+import numpy as np
 import tensorflow as tf
 
+from mayo import compress
 from mayo.log import log
 from mayo.util import format_shape, print_variables
 
@@ -43,6 +45,15 @@ class CheckpointHandler(object):
         self._checkpoint_directories[is_saving] = path
         return path
 
+    def directory(self):
+        """The directory from which checkpoints are loaded.  """
+        return self._directory(False)
+
+    def index_file(self, epoch):
+        """The index file of the checkpoint at `epoch`.  """
+        name = '{}-{}.index'.format(self._checkpoint_basename, epoch)
+        return os.path.join(self._directory(False), name)
+
     def _directory_glob(self, directory=None):
         directory = directory or self._directory(False)
         return glob.glob(os.path.join(
@@ -94,6 +105,8 @@ class CheckpointHandler(object):
         if key is False or (key != 0 and not key):
             log.debug('Checkpoint loading disabled.')
             return []
+        if isinstance(key, str) and key.endswith(compress.suffix):
+            return self._load_compressed(key)
         try:
             path = self._path(key, False)
         except CheckpointManifestNotFoundError as e:
@@ -148,6 +161,29 @@ class CheckpointHandler(object):
         log.debug('Checkpoint restored.')
         return restore_vars
 
+    def _load_compressed(self, key):
+        path = key
+        if not os.path.exists(path):
+            path = os.path.join(self._directory(False), key)
+        log.info('Loading packed-integer container from {!r}...'.format(path))
+        if not os.path.exists(path):
+            raise CheckpointNotFoundError(
+                'Container {!r} not found.'.format(path))
+        values = compress.load(path)
+        restore_vars = []
+        missing_vars = []
+        for v in self._global_variables():
+            value = values.get(v.op.name)
+            if value is None:
+                missing_vars.append(v.op.name)
+                continue
+            # feeds the initializer, so no new operations are created
+            v.load(value, self.tf_session)
+            restore_vars.append(v)
+        desc = 'Variables to be restored but missing in container'
+        print_variables(desc, missing_vars, 'warn')
+        return restore_vars
+
     def save(self, key):
         cp_path = self._path(key, True)
         if isinstance(key, int):
@@ -163,3 +199,25 @@ class CheckpointHandler(object):
             log.warn(
                 'Unable to save a checkpoint because we have '
                 'no space left on device.')
+
+    def save_values(self, key, values):
+        """
+        Saves a mapping of variable names to values as a checkpoint, the
+        values may differ in shapes from the variables in our graph.
+        """
+        cp_path = self._path(key, True)
+        log.info('Saving checkpoint values to {!r}...'.format(cp_path))
+        with tf.Graph().as_default() as graph:
+            feed = {}
+            variables = []
+            for name, value in values.items():
+                value = np.asarray(value)
+                placeholder = tf.placeholder(
+                    tf.as_dtype(value.dtype), value.shape)
+                variables.append(tf.Variable(
+                    placeholder, name=name, trainable=False))
+                feed[placeholder] = value
+            with tf.Session(graph=graph) as session:
+                session.run(tf.variables_initializer(variables), feed)
+                saver = tf.train.Saver(variables)
+                saver.save(session, cp_path, write_meta_graph=False)
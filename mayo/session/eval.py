@@ -1,13 +1,27 @@
+import os
+import sys
+import copy
+import json
 import math
+import tempfile
 
 from mayo.log import log
-from mayo.util import Table
+from mayo.util import Table, Percent
+from mayo.util.process import cpu_subsets, spawn
+from mayo.evaluate import EvalCache, eval_range, eval_table, percent_stats
 from mayo.session.base import SessionBase
+from mayo.session.checkpoint import CheckpointHandler
 
 
 class Evaluate(SessionBase):
     mode = 'validate'
 
+    def __init__(self, config):
+        # building the graph writes into the configuration, the evaluation
+        # cache hashes it as it was before
+        self._raw_config = copy.deepcopy(config.asdict(eval=False))
+        super().__init__(config)
+
     def _finalize(self):
         self.task.eval()
         super()._finalize()
@@ -17,7 +31,15 @@ class Evaluate(SessionBase):
         if key is None:
             key = self.config.system.checkpoint.load
         self.load_checkpoint(key)
+        return self._eval(keyboard_interrupt)
+
+    def _eval(self, keyboard_interrupt=True):
+        self._run_eval(keyboard_interrupt)
+        return self.task.post_eval()
+
+    def _run_eval(self, keyboard_interrupt):
         self.run(self.imgs_seen.initializer)
+        self.reset_gate_statistics()
         # evaluation
         log.info('Starting evaluation...')
         num_iterations = math.ceil(self.num_examples / self.batch_size)
@@ -30,36 +52,224 @@ class Evaluate(SessionBase):
                 raise e
         else:
             log.info('Evaluation complete.')
-        return self.task.post_eval()
 
-    def _range(self, epochs):
-        eval_range = self.config.get('eval.range', {})
-        from_epoch = eval_range.get('from', 0)
-        to_epoch = eval_range.get('to', -1)
-        step = eval_range.get('step', 1)
-        for e in epochs[::step]:
-            if e < from_epoch:
-                continue
-            if to_epoch > 0 and e > to_epoch:
-                continue
-            yield e
+    def eval_counts(self, key=None):
+        """
+        Evaluates the checkpoint `key` on the shard of the validation set
+        in "system.preprocess.shard", and returns metric sums that can be
+        merged across shards.
+        """
+        if key is None:
+            key = self.config.system.checkpoint.load
+        self.load_checkpoint(key)
+        self._run_eval(keyboard_interrupt=False)
+        counts = self.task.eval_counts()
+        # flushes evaluation history
+        self.task.post_eval()
+        return counts
 
     def eval_all(self):
         log.info('Evaluating all checkpoints...')
-        epochs = list(self._range(self.checkpoint.list_epochs()))
+        epochs = list(eval_range(self.config, self.checkpoint.list_epochs()))
         epochs_to_eval = ', '.join(str(e) for e in epochs)
         log.info('Checkpoints to evaluate: {}'.format(epochs_to_eval))
-        table = None
+        cache = EvalCache(self._raw_config, self.checkpoint)
+        results = {}
         # ensures imgs_seen initialized and loaded
         try:
             for e in epochs:
-                with log.demote():
-                    stats = self.eval(e, keyboard_interrupt=False)
-                table = table or Table(['epoch'] + list(sorted(stats)))
-                table.add_row(dict({'epoch': e}, **stats))
+                stats = cache.get(e)
+                if stats is None:
+                    with log.demote():
+                        stats = self.eval(e, keyboard_interrupt=False)
+                    cache.set(e, stats)
+                results[e] = stats
                 infos = ['epoch: {}'.format(e)]
-                infos += ['{}: {}'.format(k, v) for k, v in stats.items()]
+                infos += [
+                    '{}: {}'.format(k, v) for k, v in stats.items()
+                    if k != 'epoch']
+                log.info(', '.join(infos))
+        except KeyboardInterrupt:
+            pass
+        return eval_table(epochs, results)
+
+    def _macs(self):
+        stats = self.task.nets[0].estimate()
+        return sum(
+            s.get('macs', 0) for s in stats.values() if isinstance(s, dict))
+
+    def eval_densities(self, densities):
+        """
+        Evaluates a gated model at multiple gate densities by adjusting them
+        in-place, reusing the graph and the loaded checkpoint.
+        """
+        self.load_checkpoint(self.config.system.checkpoint.load)
+        table = None
+        try:
+            for density in densities:
+                self.set_gate_density(density)
+                with log.demote():
+                    stats = self._eval(keyboard_interrupt=False)
+                keys = ['density', 'macs'] + list(sorted(stats))
+                stats = dict(stats, density=density, macs=self._macs())
+                table = table or Table(keys)
+                table.add_row(stats)
+                infos = ['{}: {}'.format(k, stats[k]) for k in keys]
                 log.info(', '.join(infos))
         except KeyboardInterrupt:
             pass
         return table
+
+
+class Plotting(Evaluate):
+    """An evaluation session that keeps full gate maps for plotting.  """
+    keep_gate_maps = True
+
+
+def eval_all_parallel(config, num_workers):
+    """
+    Evaluates all checkpoints, as `Evaluate.eval_all()`, with checkpoints
+    split across `num_workers` processes, each pinned to a subset of CPUs,
+    and evaluating its checkpoints in turn within a single session.
+    """
+    checkpoint = CheckpointHandler(None, config.system.search_path.checkpoint)
+    epochs = list(eval_range(config, checkpoint.list_epochs()))
+    cache = EvalCache(config.asdict(eval=False), checkpoint)
+    results = {e: cache.get(e) for e in epochs}
+    pending = [e for e in epochs if results[e] is None]
+    chunks = [pending[i::num_workers] for i in range(num_workers)]
+    chunks = [c for c in chunks if c]
+    log.info(
+        'Evaluating {} of {} checkpoints with {} workers, the rest are '
+        'cached...'.format(len(pending), len(epochs), len(chunks)))
+    if not chunks:
+        return eval_table(epochs, results)
+    with tempfile.TemporaryDirectory() as directory:
+        config_file = os.path.join(directory, 'config.yaml')
+        config.to_yaml(config_file)
+        workers = []
+        subsets = cpu_subsets(len(chunks))
+        for i, (cpus, chunk) in enumerate(zip(subsets, chunks)):
+            output = os.path.join(directory, 'worker-{}.json'.format(i))
+            chunk = ','.join(str(e) for e in chunk)
+            workers.append(
+                (spawn(
+                    __name__, 'checkpoints', config_file, output, chunk,
+                    cpus=cpus),
+                 output))
+        _wait([worker for worker, _ in workers])
+        for worker, output in workers:
+            if worker.returncode:
+                log.warn(
+                    'Worker exited with code {}, its remaining checkpoints '
+                    'are not evaluated.'.format(worker.returncode))
+            try:
+                with open(output, 'r') as f:
+                    lines = f.readlines()
+            except FileNotFoundError:
+                continue
+            for line in lines:
+                stats = percent_stats(json.loads(line))
+                epoch = stats['epoch']
+                results[epoch] = stats
+                cache.set(epoch, stats)
+    return eval_table(epochs, results)
+
+
+def _wait(workers):
+    try:
+        for worker in workers:
+            worker.wait()
+    except KeyboardInterrupt:
+        log.info('Stopping workers...')
+        for worker in workers:
+            worker.terminate()
+            worker.wait()
+
+
+def eval_sharded(config, num_shards):
+    """
+    Evaluates the checkpoint in "system.checkpoint.load" with the
+    validation set split into `num_shards` shards, each evaluated by a
+    process pinned to a subset of CPUs.  Metric sums from all shards are
+    merged into exact totals.
+    """
+    num_examples = config.dataset.num_examples_per_epoch.validate
+    if num_shards > num_examples:
+        raise ValueError(
+            'Unable to split {} examples into {} shards.'
+            .format(num_examples, num_shards))
+    log.info(
+        'Evaluating {} examples in {} shards...'
+        .format(num_examples, num_shards))
+    with tempfile.TemporaryDirectory() as directory:
+        config_file = os.path.join(directory, 'config.yaml')
+        config.to_yaml(config_file)
+        workers = []
+        outputs = []
+        for i, cpus in enumerate(cpu_subsets(num_shards)):
+            output = os.path.join(directory, 'shard-{}.json'.format(i))
+            args = ['shard', config_file, output, i, num_shards]
+            workers.append(spawn(__name__, *args, cpus=cpus))
+            outputs.append(output)
+        _wait(workers)
+        totals = {}
+        for i, output in enumerate(outputs):
+            try:
+                with open(output, 'r') as f:
+                    counts = json.load(f)
+            except FileNotFoundError:
+                raise RuntimeError(
+                    'Shard {} of {} failed to complete evaluation.'
+                    .format(i, num_shards))
+            for key, value in counts.items():
+                totals[key] = totals.get(key, 0) + value
+    total = totals.pop('total')
+    if total != num_examples:
+        log.warn(
+            'Shards evaluated {} examples, but {} were expected.'
+            .format(total, num_examples))
+    stats = {k: Percent(v / total) for k, v in totals.items()}
+    infos = ['{}: {}'.format(k, v) for k, v in sorted(stats.items())]
+    log.info('    {} [{} images]'.format(', '.join(infos), total))
+    return stats
+
+
+def _load_config(config_file):
+    from mayo.config import Config
+    config = Config()
+    config.yaml_update(config_file)
+    return config
+
+
+def _work_checkpoints(config_file, output, epochs):
+    """Evaluates checkpoints at `epochs` and appends results to `output`.  """
+    session = Evaluate(_load_config(config_file))
+    for e in epochs.split(','):
+        e = int(e)
+        with log.demote():
+            stats = session.eval(e, keyboard_interrupt=False)
+        with open(output, 'a') as f:
+            f.write(json.dumps(dict(stats, epoch=e)) + '\n')
+
+
+def _work_shard(config_file, output, index, num_shards):
+    """Evaluates the `index`-th shard and writes metric sums to `output`.  """
+    config = _load_config(config_file)
+    config['system.preprocess.shard'] = {
+        'num': int(num_shards), 'index': int(index)}
+    counts = Evaluate(config).eval_counts()
+    temp = output + '.tmp'
+    with open(temp, 'w') as f:
+        json.dump(counts, f)
+    os.replace(temp, output)
+
+
+_workers = {
+    'checkpoints': _work_checkpoints,
+    'shard': _work_shard,
+}
+
+
+if __name__ == '__main__':
+    _workers[sys.argv[1]](*sys.argv[2:])
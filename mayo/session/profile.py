@@ -1,6 +1,7 @@
 import tensorflow as tf
 
 from mayo.log import log
+from mayo.override.base import run_fetches
 from mayo.session.train import Train
 from mayo.util import Table
 
@@ -44,14 +45,15 @@ class Profile(Train):
         if not num_epochs:
             # for key, _ in priority_ranks:
             #     for o in overriders[key]:
-            for o, key in self.generate_overriders(overriders, prod_key=True):                
+            for o, key in self.generate_overriders(overriders, prod_key=True):
                 target_values[o] = {}
                 o.update()
                 for keyword, rules in name_to_rules.items():
                     if keyword == type(o).__name__:
                         for target in rules.targets:
-                            target_values[o][target] = self.run(
-                                getattr(o, target))
+                            target_values[o][target] = getattr(o, target)
+            # fetch targets of all overriders at once
+            target_values = run_fetches(self, target_values)
         else:
             target_values = self.profiled_search(overriders, name_to_rules)
         self.present(overriders, target_values, export_ckpt)
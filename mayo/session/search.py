@@ -152,10 +152,26 @@ class Search(SearchBase):
     def _init_search(self):
         super()._init_search()
         self.blacklist = set()
+        # nodes with updated hyperparameters since the last estimate,
+        # `None` estimates all nodes
+        self._changed_nodes = None
+
+    def backtrack(self):
+        super().backtrack()
+        # the checkpoint restores all layers
+        self._changed_nodes = None
+
+    def fine_tune(self):
+        tolerable = super().fine_tune()
+        # overriders and weights of all layers are updated by fine-tuning,
+        # so all memoized estimates are stale
+        self._changed_nodes = None
+        return tolerable
 
     def _priority(self, blacklist=None):
         key = self.config.search.cost_key
-        info = self.task.nets[0].estimate()
+        info = self.task.nets[0].estimate(self._changed_nodes)
+        self._changed_nodes = set()
         priority = []
         for node, stats in info.items():
             if node not in self.targets:
@@ -196,6 +212,7 @@ class Search(SearchBase):
             self.blacklist.add(node)
             return True
         self.assign(var, value)
+        self._changed_nodes.add(node)
         info['from'] = value
         log.info(
             'Updated hyperparameter {!r} in layer {!r} with a new value {}.'
@@ -0,0 +1,280 @@
+import copy
+import collections
+
+import numpy as np
+
+from mayo.log import log
+from mayo.util import object_from_params, Percent, Table
+from mayo.net.graph import LayerNode
+
+
+class ShrinkError(Exception):
+    """Unable to physically remove pruned channels.  """
+
+
+class _Channels(object):
+    """
+    Channels of a tensor which are kept after shrinking.
+
+    keep: a boolean vector, True if the channel is kept.
+    producers:
+        the layer nodes whose output channels are forwarded to this tensor
+        without reordering, these nodes can be asked to keep more channels.
+    """
+    def __init__(self, keep, producers=()):
+        super().__init__()
+        self.keep = np.asarray(keep, dtype=bool)
+        self.producers = tuple(producers)
+
+    @classmethod
+    def full(cls, channels, producers=()):
+        return cls(np.ones(channels, dtype=bool), producers)
+
+
+class Shrink(object):
+    """
+    Physically shrinks channel-pruned layers.
+
+    Channel masks of `ChannelPrunerBase` (e.g. `NetworkSlimmer`) and
+    `FilterPruner` overriders are propagated through the model DAG, where
+    convolutions and fully-connected layers remove pruned output channels
+    and consume only the surviving input channels.  It produces a model
+    description with reduced `num_outputs` and a checkpoint with sliced
+    variables.
+    """
+    _passthrough_types = [
+        'identity', 'activation', 'dropout',
+        'max_pool', 'average_pool', 'local_response_normalization',
+        'squeeze', 'pad', 'crop', 'reduce_mean',
+    ]
+
+    def __init__(self, session, config):
+        super().__init__()
+        self.session = session
+        self.config = config
+        self.net = session.task.nets[0]
+        self._shapes = self.net.shapes(unified=True)
+        self._masks = self._fetch_masks()
+
+    def _channel_pruners(self, node):
+        for key, overrider in self.net.overriders.get(node, {}).items():
+            if key == 'gradient':
+                continue
+            if isinstance(overrider, collections.Sequence):
+                # chained overriders
+                yield from overrider
+            else:
+                yield overrider
+
+    def _fetch_masks(self):
+        if not self.net.overriders:
+            return {}
+        # overriders are already imported by their instantiation
+        from mayo.override.prune.base import ChannelPrunerBase
+        from mayo.override.prune.filter import FilterPruner
+        masks = {}
+        for node in self.net.overriders:
+            for o in self._channel_pruners(node):
+                if isinstance(o, (ChannelPrunerBase, FilterPruner)):
+                    masks.setdefault(node, []).append(o)
+        # a single run for all masks
+        values = self.session.run(
+            {o: o.mask for os in masks.values() for o in os})
+        output_masks = {}
+        for node, overriders in masks.items():
+            keep = None
+            for o in overriders:
+                mask = values[o].astype(bool)
+                if isinstance(o, FilterPruner):
+                    # a filter survives if any of its kernels is active
+                    mask = np.any(mask, axis=0)
+                keep = mask if keep is None else np.logical_and(keep, mask)
+            output_masks[node] = keep
+        return output_masks
+
+    def _num_channels(self, node):
+        return self._shapes[node][-1]
+
+    def _output_keep(self, node):
+        keep = self._masks.get(node)
+        if keep is None:
+            keep = np.ones(self._num_channels(node), dtype=bool)
+        required = self._required.get(node)
+        if required is not None:
+            keep = np.logical_or(keep, required)
+        return keep
+
+    def _record(self, node, in_keep, out_keep):
+        self._slices[node] = (in_keep, out_keep)
+
+    def _input(self, node, _):
+        return _Channels.full(self._num_channels(node))
+
+    def _split(self, node, value):
+        return [value] * len(node.successors)
+
+    def _layer(self, node, value):
+        try:
+            func, params = object_from_params(node.params, self, '_shrink_')
+        except NotImplementedError:
+            func = self._shrink_generic
+            params = node.params
+        return func(node, value, params)
+
+    def _shrink_generic(self, node, value, params):
+        if params['type'] in self._passthrough_types:
+            return value
+        if isinstance(value, list) or not np.all(value.keep):
+            raise ShrinkError(
+                'We do not know how to shrink the input channels of layer '
+                '{!r} with type {!r}.'
+                .format(node.formatted_name(), params['type']))
+        return _Channels.full(self._num_channels(node))
+
+    def _shrink_convolution(self, node, value, params):
+        if params.get('num_groups', 1) != 1:
+            if not np.all(value.keep) or node in self._masks:
+                raise ShrinkError(
+                    'Shrinking group-wise convolution {!r} is not supported.'
+                    .format(node.formatted_name()))
+            return _Channels.full(self._num_channels(node))
+        out_keep = self._output_keep(node)
+        self._record(node, value.keep, out_keep)
+        return _Channels(out_keep, [node])
+
+    _shrink_fully_connected = _shrink_convolution
+
+    def _shrink_depthwise_convolution(self, node, value, params):
+        if params.get('depth_multiplier', 1) != 1:
+            if not np.all(value.keep):
+                raise ShrinkError(
+                    'Shrinking depthwise convolution {!r} with a depth '
+                    'multiplier is not supported.'
+                    .format(node.formatted_name()))
+            return _Channels.full(self._num_channels(node))
+        if node in self._masks:
+            log.warn(
+                'Channel pruning of depthwise convolution {!r} is ignored, '
+                'as it follows the channels of its input.'
+                .format(node.formatted_name()))
+        self._record(node, value.keep, value.keep)
+        return value
+
+    def _shrink_batch_normalization(self, node, value, params):
+        # channel-wise variables follow the channels of the input
+        self._record(node, value.keep, value.keep)
+        return value
+
+    def _shrink_flatten(self, node, value, params):
+        # NHWC flattening repeats the channel mask for each pixel
+        pixels = int(np.prod(self._shapes[node.predecessors[0]][1:-1]))
+        return _Channels(np.tile(value.keep, pixels))
+
+    def _shrink_concat(self, node, values, params):
+        axis = params.get('axis', -1)
+        if axis not in (-1, 3):
+            raise ShrinkError(
+                'Concatenation {!r} must be along the channel axis to be '
+                'shrunk.'.format(node.formatted_name()))
+        return _Channels(np.concatenate([v.keep for v in values]))
+
+    def _shrink_add(self, node, values, params):
+        # element-wise additions require all inputs to keep the same channels
+        keep = np.logical_or.reduce([v.keep for v in values])
+        producers = []
+        for v in values:
+            producers += v.producers
+            if np.all(v.keep == keep):
+                continue
+            if not v.producers:
+                raise ShrinkError(
+                    'Unable to align channels of the inputs to {!r}.'
+                    .format(node.formatted_name()))
+            for p in v.producers:
+                required = self._required.get(p, keep)
+                self._required[p] = np.logical_or(required, keep)
+            self._changed = True
+        return _Channels(keep, producers)
+
+    _shrink_mul = _shrink_add
+
+    def _propagate(self):
+        self._required = {}
+        analyzers = {
+            'input': self._input,
+            'split': self._split,
+            'layer': self._layer,
+        }
+        while True:
+            self._changed = False
+            self._slices = {}
+            self.net.dataflow_analysis(analyzers)
+            if not self._changed:
+                return self._slices
+
+    @staticmethod
+    def _slice(value, in_keep, out_keep):
+        if value.ndim >= 2 and value.shape[-2] == in_keep.size:
+            value = value[..., in_keep, :]
+        if value.ndim >= 1 and value.shape[-1] == out_keep.size:
+            value = value[..., out_keep]
+        return value
+
+    def _owner(self, name):
+        for node in self._slices:
+            if name.startswith(node.formatted_name() + '/'):
+                return node
+
+    def _sliced_variables(self):
+        variables = {v.op.name: v for v in self.session.global_variables()}
+        values = self.session.run(variables)
+        for name, value in values.items():
+            node = self._owner(name)
+            if node is None or not isinstance(value, np.ndarray):
+                continue
+            new_value = self._slice(value, *self._slices[node])
+            if new_value.shape != value.shape:
+                log.debug(
+                    'Shrinking variable {!r} from {} to {}.'
+                    .format(name, value.shape, new_value.shape))
+            values[name] = new_value
+        return values
+
+    def _layer_params(self, model, node):
+        layers = model['layers']
+        for module in node.module[1:]:
+            layers = layers[module]['layers']
+        return layers[node.name]
+
+    def _shrunk_model(self):
+        model = copy.deepcopy(self.config.model.asdict())
+        for node, (_, out_keep) in self._slices.items():
+            params = self._layer_params(model, node)
+            if params['type'] in (
+                    'depthwise_convolution', 'batch_normalization'):
+                continue
+            if np.all(out_keep):
+                continue
+            params['num_outputs'] = int(np.sum(out_keep))
+        return model
+
+    def _info(self):
+        table = Table(['layer', 'inputs', 'outputs', 'kept'])
+        for node, (in_keep, out_keep) in self._slices.items():
+            if not isinstance(node, LayerNode):
+                continue
+            in_channels = '{}/{}'.format(np.sum(in_keep), in_keep.size)
+            out_channels = '{}/{}'.format(np.sum(out_keep), out_keep.size)
+            kept = Percent(np.sum(out_keep) / out_keep.size)
+            table.add_row((
+                node.formatted_name(), in_channels, out_channels, kept))
+        return table
+
+    def shrink(self, name='shrunk'):
+        log.info('Propagating channel masks...')
+        self._propagate()
+        values = self._sliced_variables()
+        model = self._shrunk_model()
+        print(self._info().format())
+        self.session.checkpoint.save_values(name, values)
+        return model
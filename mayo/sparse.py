@@ -0,0 +1,197 @@
+import time
+import collections
+
+import numpy as np
+import scipy.sparse
+
+from mayo.log import log
+from mayo.util import Percent, Bits, Table, unknown
+
+
+class SparseError(Exception):
+    """Unable to encode or execute a sparse layer.  """
+
+
+def _matrix_shape(shape):
+    # weights [..., C_in, C_out] are viewed as a [C_out, ... x C_in] matrix
+    rows = int(shape[-1])
+    cols = int(np.prod(shape[:-1]))
+    return rows, cols
+
+
+def encode(value):
+    """
+    Encodes a pruned weight tensor of shape [..., C_in, C_out].
+
+    It returns the CSR encoding (`indptr`, `indices`, `values`) of the
+    transposed 2-D view [C_out, ... x C_in] of the weights, so each row holds
+    the non-zero weights of an output channel, and a bit-packed `mask` of the
+    original tensor.
+    """
+    matrix = value.reshape(-1, value.shape[-1]).T
+    csr = scipy.sparse.csr_matrix(matrix)
+    # smallest index types that fit
+    index_dtype = np.uint16 if matrix.shape[1] <= 2 ** 16 else np.uint32
+    pointer_dtype = np.uint32 if csr.nnz < 2 ** 32 else np.uint64
+    return {
+        'shape': np.array(value.shape, dtype=np.int64),
+        'indptr': csr.indptr.astype(pointer_dtype),
+        'indices': csr.indices.astype(index_dtype),
+        'values': csr.data,
+        'mask': np.packbits(value != 0, axis=None),
+    }
+
+
+def decode(layer):
+    """Reconstructs the dense weights from an encoded layer.  """
+    shape = tuple(layer['shape'])
+    return csr_matrix(layer).toarray().T.reshape(shape)
+
+
+def decode_mask(layer):
+    shape = tuple(layer['shape'])
+    mask = np.unpackbits(layer['mask'])[:int(np.prod(shape))]
+    return mask.astype(bool).reshape(shape)
+
+
+def csr_matrix(layer):
+    return scipy.sparse.csr_matrix(
+        (layer['values'], layer['indices'], layer['indptr']),
+        shape=_matrix_shape(layer['shape']))
+
+
+def coo_indices(layer):
+    """Row-major [nnz, 2] indices of the encoded matrix.  """
+    rows, _ = _matrix_shape(layer['shape'])
+    indptr = layer['indptr'].astype(np.int64)
+    row = np.repeat(np.arange(rows, dtype=np.int64), np.diff(indptr))
+    return np.stack([row, layer['indices'].astype(np.int64)], axis=1)
+
+
+def density(layer):
+    return Percent(layer['values'].size / np.prod(layer['shape']))
+
+
+def size(layer):
+    keys = ['indptr', 'indices', 'values']
+    return Bits(8 * sum(layer[k].nbytes for k in keys))
+
+
+def save(path, layers):
+    arrays = {}
+    for name, layer in layers.items():
+        for key, value in layer.items():
+            arrays['{}/{}'.format(name, key)] = value
+    np.savez_compressed(path, **arrays)
+
+
+def load(path):
+    layers = {}
+    with np.load(path) as data:
+        for key in data.files:
+            name, field = key.rsplit('/', 1)
+            layers.setdefault(name, {})[field] = data[key]
+    return layers
+
+
+def sparse_executable(params):
+    """
+    Tests if a layer can be executed as a single sparse matrix multiplication,
+    i.e. it is a fully-connected layer or a 1x1 convolution.
+    """
+    if params['type'] == 'fully_connected':
+        return True
+    if params['type'] != 'convolution':
+        return False
+    if params.get('num_groups', 1) != 1:
+        return False
+    return params.get('kernel_size') in (1, [1, 1], (1, 1))
+
+
+class SparseExport(object):
+    """
+    Exports fine-grained pruned weights in a compressed sparse format and
+    measures the speedup of sparse matrix multiplication over its dense
+    counterpart for layers that can be executed sparsely.
+    """
+    def __init__(self, session, config):
+        super().__init__()
+        self.session = session
+        self.config = config
+        self.net = session.task.nets[0]
+
+    def _pruned_nodes(self):
+        # overriders are already imported by their instantiation
+        from mayo.override.prune.base import PrunerBase
+        for node, overriders in self.net.overriders.items():
+            o = overriders.get('weights')
+            if isinstance(o, collections.Sequence):
+                # chained overriders
+                pruned = any(isinstance(each, PrunerBase) for each in o)
+            else:
+                pruned = isinstance(o, PrunerBase)
+            if pruned:
+                yield node
+
+    def _encode(self):
+        weights = {
+            node: self.net.variables[node]['weights']
+            for node in self._pruned_nodes()}
+        # overridden weights are both masked and quantized
+        values = self.session.run(weights)
+        return {node: encode(value) for node, value in values.items()}
+
+    @staticmethod
+    def _time(func, repeat):
+        func()  # warm up
+        durations = []
+        for _ in range(repeat):
+            start = time.time()
+            func()
+            durations.append(time.time() - start)
+        return min(durations)
+
+    def _benchmark(self, node, layer, repeat):
+        shape = self.net.shapes(unified=True)[node]
+        shape = [self.session.batch_size if s is None else s for s in shape]
+        # 1x1 convolutions multiply each pixel with the weights
+        samples = int(np.prod(shape[:-1]))
+        _, cols = _matrix_shape(layer['shape'])
+        inputs = np.random.randn(cols, samples).astype(layer['values'].dtype)
+        dense = decode(layer).reshape(-1, layer['shape'][-1]).T
+        sparse = csr_matrix(layer)
+        dense_time = self._time(lambda: dense.dot(inputs), repeat)
+        sparse_time = self._time(lambda: sparse.dot(inputs), repeat)
+        return dense_time, sparse_time
+
+    def _info(self, layers, repeat):
+        estimates = self.net.estimate()
+        threshold = self.config.system.sparse.threshold
+        table = Table([
+            'layer', 'shape', 'density', 'size', 'macs',
+            'dense (ms)', 'sparse (ms)', 'speedup'])
+        for node, layer in layers.items():
+            stats = estimates.get(node, {})
+            macs = stats.get('macs', unknown)
+            if sparse_executable(node.params):
+                dense, sparse = self._benchmark(node, layer, repeat)
+                speedup = '{:.2f}x'.format(dense / sparse)
+                if density(layer) >= threshold:
+                    speedup += ' (dense)'
+                dense, sparse = (
+                    '{:.3f}'.format(t * 1000) for t in (dense, sparse))
+            else:
+                dense = sparse = speedup = unknown
+            table.add_row((
+                node.formatted_name(), list(layer['shape']), density(layer),
+                size(layer), macs, dense, sparse, speedup))
+        table.footer_sum('macs')
+        return table
+
+    def export(self, path, repeat=10):
+        layers = self._encode()
+        if not layers:
+            raise SparseError('There are no pruned weights to export.')
+        print(self._info(layers, repeat).format())
+        save(path, {node.formatted_name(): l for node, l in layers.items()})
+        log.info('Sparse weights exported to {!r}.'.format(path))
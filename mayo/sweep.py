@@ -0,0 +1,623 @@
+import os
+import re
+import sys
+import json
+import time
+import sqlite3
+import hashlib
+import itertools
+import traceback
+import contextlib
+import collections
+
+import yaml
+
+from mayo.log import log
+from mayo.util import Table
+from mayo.util.process import cpu_subsets, spawn
+from mayo.parse import _split_dot_path
+from mayo.net.graph import Graph
+
+
+class SweepError(Exception):
+    """A sweep point cannot be evaluated without rebuilding the graph.  """
+
+
+_missing = object()
+
+
+def _leaves(value, path=()):
+    if isinstance(value, collections.Mapping):
+        for k, v in value.items():
+            yield from _leaves(v, path + (k, ))
+    else:
+        yield path, value
+
+
+def _raw(config, path):
+    """The unresolved value at `path` in `config`, or `_missing`.  """
+    try:
+        obj, key = config._dot_path('.'.join(path), config._mapping)
+        return obj[key]
+    except (KeyError, IndexError, ValueError):
+        return _missing
+
+
+@contextlib.contextmanager
+def _overridden(config, values):
+    """
+    Temporarily updates `config` with dot-path keys in `values`.  Original
+    values are restored without resolving their placeholders, and mappings
+    created for new keys are removed.
+    """
+    originals = []
+    for key in values:
+        path = _split_dot_path(key)
+        for i in range(1, len(path) + 1):
+            value = _raw(config, path[:i])
+            if value is _missing:
+                # the outermost mapping created for the key
+                path = path[:i]
+                break
+        originals.append((path, value))
+    try:
+        for key, value in values.items():
+            config[key] = value
+        yield config
+    finally:
+        for path, value in reversed(originals):
+            key = '.'.join(path)
+            if value is not _missing:
+                obj, key = config._dot_path(key, config._mapping)
+                obj[key] = value
+            elif _raw(config, path) is not _missing:
+                del config[key]
+        config._invalidate()
+
+
+def _lookup(value, path):
+    for key in path:
+        if not isinstance(value, collections.Mapping):
+            return _missing
+        value = value.get(key, _missing)
+    return value
+
+
+class Sweep(object):
+    """
+    Evaluates a grid of overrider parameters and configuration values in a
+    single evaluation session, reusing its graph and loaded checkpoint.
+
+    `sweep.grid` is a list of axes, each with the `values` to sweep, and
+    every combination of them is a sweep point.  An axis either sets a
+    configuration `key`, e.g. `_gate.density`, or overrider parameters
+    matched by a `regex` searched in "<overrider name>.<parameter>", e.g.
+    `conv.*/weights/FixedPointQuantizer.width`.  Configuration keys may only
+    change overrider parameters and gate densities in the model, points
+    that need any other change to the graph are rejected before anything
+    is evaluated.
+
+    With a positive `sweep.fine_tune`, each point is fine-tuned for that
+    many epochs from the loaded checkpoint in the training session `tuner`
+    before evaluation.  Otherwise, parameters that only take effect when
+    overriders are updated, e.g. pruning thresholds, keep the values of the
+    loaded checkpoint.
+    """
+    _checkpoint = 'sweep'
+
+    def __init__(self, session, config, tuner=None):
+        super().__init__()
+        self.session = session
+        self.config = config
+        self.tuner = tuner
+        self.fine_tune = config.get('sweep.fine_tune', 0)
+        if self.fine_tune and tuner is None:
+            raise ValueError('Fine-tuning requires a training session.')
+        grid = config.get('sweep.grid') or []
+        if not grid:
+            raise ValueError(
+                'Nothing to sweep, please specify a list of axes in '
+                '"sweep.grid".')
+        self.keys = []
+        self._config_keys = []
+        for axis in grid:
+            if 'key' in axis:
+                self._config_keys.append(axis['key'])
+            elif 'regex' not in axis:
+                raise ValueError(
+                    'Sweep axis {!r} must specify either a configuration '
+                    '"key" or a "regex" of overrider parameters.'
+                    .format(axis))
+            self.keys.append(axis.get('key', axis.get('regex')))
+        values = (axis['values'] for axis in grid)
+        self.points = list(itertools.product(*values))
+        self._overriders = {}
+        self._plans = self._plan()
+
+    def _overrider_map(self, session):
+        """
+        Maps (node, key, overrider class name) to applied overriders of
+        `session`, where key is a path in the "overrider" layer parameter.
+        """
+        try:
+            return self._overriders[session]
+        except KeyError:
+            pass
+        overriders = {}
+
+        def add(node, key, overrider):
+            # chains of overriders are sequences
+            if isinstance(overrider, collections.Sequence):
+                chain = list(overrider)
+            else:
+                chain = [overrider]
+            for o in chain:
+                overriders[node, key, o.__class__.__name__] = o
+
+        for node, node_overriders in session.overriders.items():
+            for key, o in node_overriders.items():
+                if key != 'gradient':
+                    add(node, (key, ), o)
+                    continue
+                for gkey, go in o.items():
+                    add(node, (key, gkey), go)
+        self._overriders[session] = overriders
+        return overriders
+
+    def _sessions(self):
+        return [s for s in (self.session, self.tuner) if s is not None]
+
+    def _regex_targets(self, regex):
+        targets = set()
+        for session in self._sessions():
+            for (node, key, cls), o in self._overrider_map(session).items():
+                for param in o.parameters:
+                    name = '{}.{}'.format(o.name, param)
+                    if re.search(regex, name):
+                        targets.add(('overrider', node, key, cls, param))
+        if not targets:
+            raise SweepError(
+                'Regex {!r} does not match any overrider parameter.'
+                .format(regex))
+        return targets
+
+    def _layer_params(self, values):
+        with _overridden(self.config, values):
+            graph = Graph(self.config.model)
+            params = {n: n.params.asdict() for n in graph.layer_nodes()}
+        return set(graph.edges()), params
+
+    def _config_target(self, node, path, params):
+        desc = '{}.{}'.format(node.formatted_name(), '.'.join(path))
+        if path == ('gate_params', 'density'):
+            if params.get('type') == 'gated_convolution':
+                return ('density', node)
+        elif path[:1] == ('overrider', ) and len(path) >= 4:
+            key, param = path[1:-2], path[-1]
+            cls = _lookup(params, path[:-1] + ('type', ))
+            cls = cls.split('.')[-1] if isinstance(cls, str) else None
+            for session in self._sessions():
+                o = self._overrider_map(session).get((node, key, cls))
+                if o is not None and param in o.parameters:
+                    return ('overrider', node, key, cls, param)
+        raise SweepError(
+            'Changing {!r} requires the graph to be rebuilt.'.format(desc))
+
+    def _plan(self):
+        """
+        Checks all points and returns, for each of them, the values to
+        assign to each target, a target is either an overrider parameter or
+        the density of a gated convolution.
+        """
+        config_keys = self._config_keys
+        regex_targets = {
+            k: self._regex_targets(k)
+            for k in self.keys if k not in config_keys}
+        point_params = []
+        config_targets = {}
+        if config_keys:
+            edges, baseline = self._layer_params({})
+            paths = set()
+            for point in self.points:
+                values = {
+                    k: v for k, v in zip(self.keys, point)
+                    if k in config_keys}
+                point_edges, params = self._layer_params(values)
+                if point_edges != edges or set(params) != set(baseline):
+                    raise SweepError(
+                        'Point {} changes the layers of the model.'
+                        .format(values))
+                for node, node_params in params.items():
+                    before = dict(_leaves(baseline[node]))
+                    for path, value in _leaves(node_params):
+                        if before.pop(path, _missing) != value:
+                            paths.add((node, path))
+                    # removed parameters
+                    paths.update((node, path) for path in before)
+                point_params.append(params)
+            config_targets = {
+                (node, path): self._config_target(
+                    node, path, baseline[node])
+                for node, path in paths}
+        plans = []
+        for index, point in enumerate(self.points):
+            plan = []
+            for key, value in zip(self.keys, point):
+                plan += [(t, value) for t in regex_targets.get(key, ())]
+            for (node, path), target in config_targets.items():
+                value = _lookup(point_params[index][node], path)
+                plan.append((target, value))
+            plans.append(plan)
+        return plans
+
+    def _density_variable(self, session, node):
+        from mayo.net.tf.gate.base import density_collection
+        name = '{}/gate/density'.format(node.formatted_name())
+        for var in session.get_collection(density_collection, True):
+            if var.op.name.endswith(name):
+                return var
+        return None
+
+    def _assign(self, session, plan):
+        overriders = self._overrider_map(session)
+        for target, value in plan:
+            if target[0] == 'density':
+                var = self._density_variable(session, target[1])
+                if var is not None:
+                    session.assign(var, value)
+                continue
+            _, node, key, cls, param = target
+            o = overriders.get((node, key, cls))
+            if o is not None:
+                setattr(o, param, value)
+        session._overrider_assign_parameters()
+
+    def _tune(self, plan):
+        tuner = self.tuner
+        tuner.load_checkpoint(self.config.system.checkpoint.load)
+        self._assign(tuner, plan)
+        tuner.reset_num_epochs()
+        tuner.overriders_update()
+        epoch = 0
+        while epoch < self.fine_tune:
+            epoch, _ = tuner.run(
+                [tuner.num_epochs, tuner._train_op], batch=True)
+        tuner.save_checkpoint(self._checkpoint)
+
+    def sweep(self):
+        log.info('Sweeping {} points...'.format(len(self.points)))
+        session = self.session
+        if not self.fine_tune:
+            session.load_checkpoint(self.config.system.checkpoint.load)
+        table = None
+        try:
+            for point, plan in zip(self.points, self._plans):
+                with session.ensure_graph_unchanged('Sweep'):
+                    with log.demote():
+                        if self.fine_tune:
+                            self._tune(plan)
+                            session.load_checkpoint(self._checkpoint)
+                        self._assign(session, plan)
+                        stats = session._eval(keyboard_interrupt=False)
+                keys = self.keys + ['macs'] + list(sorted(stats))
+                stats = dict(stats, macs=session._macs())
+                stats.update(zip(self.keys, point))
+                table = table or Table(keys)
+                table.add_row(stats)
+                infos = ['{}: {}'.format(k, stats[k]) for k in keys]
+                log.info(', '.join(infos))
+        except KeyboardInterrupt:
+            pass
+        return table
+
+
+def _json(value):
+    def default(value):
+        if isinstance(value, Table):
+            return value.plumb()
+        for attr in ('tolist', 'item'):
+            if hasattr(value, attr):
+                return getattr(value, attr)()
+        return str(value)
+    return json.dumps(value, default=default, sort_keys=True)
+
+
+class SweepStore(object):
+    """
+    A queue of sweep jobs and their results in an SQLite database, shared by
+    the worker processes of `SweepPool`.  Jobs are keyed by the hash of
+    their resolved configuration and actions, so adding the same job again
+    does nothing, and the results in the "jobs" table can be queried directly,
+    e.g. with `json_extract(results, '$.eval.top1')`.
+    """
+    _schema = """
+        CREATE TABLE IF NOT EXISTS jobs (
+            hash TEXT PRIMARY KEY,
+            point TEXT NOT NULL,
+            config TEXT NOT NULL,
+            actions TEXT NOT NULL,
+            status TEXT NOT NULL DEFAULT 'pending',
+            worker INTEGER,
+            started REAL,
+            finished REAL,
+            checkpoint TEXT,
+            results TEXT,
+            info TEXT,
+            error TEXT)
+    """
+
+    def __init__(self, path):
+        super().__init__()
+        self.path = path
+        self._connection = sqlite3.connect(
+            path, timeout=60, isolation_level=None)
+        self._connection.row_factory = sqlite3.Row
+        self._connection.execute('PRAGMA journal_mode=WAL')
+        self._connection.execute(self._schema)
+
+    @contextlib.contextmanager
+    def _transaction(self):
+        self._connection.execute('BEGIN IMMEDIATE')
+        try:
+            yield self._connection
+        except BaseException:
+            self._connection.execute('ROLLBACK')
+            raise
+        self._connection.execute('COMMIT')
+
+    def add(self, point, config, actions, resolved=None):
+        """
+        Adds a job unless it already exists, and returns its hash.  Jobs
+        are identified by `resolved`, the configuration with placeholders
+        resolved, which defaults to `config`.
+        """
+        actions = _json(actions)
+        content = (resolved or config) + actions
+        key = hashlib.sha1(content.encode('utf-8')).hexdigest()
+        with self._transaction() as db:
+            db.execute(
+                'INSERT OR IGNORE INTO jobs (hash, point, config, actions) '
+                'VALUES (?, ?, ?, ?)', (key, _json(point), config, actions))
+        return key
+
+    def claim(self, worker):
+        """Marks the next pending job as run by `worker` and returns it.  """
+        with self._transaction() as db:
+            job = db.execute(
+                "SELECT * FROM jobs WHERE status = 'pending' "
+                "ORDER BY rowid LIMIT 1").fetchone()
+            if job is None:
+                return None
+            db.execute(
+                "UPDATE jobs SET status = 'running', worker = ?, started = ? "
+                "WHERE hash = ?", (worker, time.time(), job['hash']))
+        return job
+
+    def finish(self, key, status, **columns):
+        columns = dict(columns, status=status, finished=time.time())
+        assignments = ', '.join('{} = ?'.format(c) for c in columns)
+        with self._transaction() as db:
+            db.execute(
+                'UPDATE jobs SET {} WHERE hash = ?'.format(assignments),
+                list(columns.values()) + [key])
+
+    def abandon(self, worker, error):
+        """Fails the job of `worker`, which exited unexpectedly.  """
+        with self._transaction() as db:
+            db.execute(
+                "UPDATE jobs SET status = 'failed', error = ?, finished = ? "
+                "WHERE status = 'running' AND worker = ?",
+                (error, time.time(), worker))
+
+    def recover(self):
+        """
+        Requeues jobs left running by workers that no longer exist, e.g.
+        after a crash, and returns the number of requeued jobs.
+        """
+        def alive(pid):
+            try:
+                os.kill(pid, 0)
+            except ProcessLookupError:
+                return False
+            except PermissionError:
+                pass
+            return True
+
+        with self._transaction() as db:
+            jobs = db.execute(
+                "SELECT hash, worker FROM jobs WHERE status = 'running'")
+            jobs = [j['hash'] for j in jobs if not alive(j['worker'])]
+            db.executemany(
+                "UPDATE jobs SET status = 'pending', worker = NULL "
+                "WHERE hash = ?", [(j, ) for j in jobs])
+        return len(jobs)
+
+    def count(self, status):
+        return self._connection.execute(
+            'SELECT COUNT(*) FROM jobs WHERE status = ?',
+            (status, )).fetchone()[0]
+
+    def table(self, keys, hashes):
+        """Tabulates points and scalar metrics of jobs in `hashes`.  """
+        rows = []
+        metrics = []
+        hashes = set(hashes)
+        jobs = self._connection.execute('SELECT * FROM jobs ORDER BY rowid')
+        for job in jobs:
+            if job['hash'] not in hashes:
+                continue
+            row = dict(json.loads(job['point']))
+            results = json.loads(job['results'] or '{}')
+            for action, result in results.items():
+                if not isinstance(result, dict):
+                    continue
+                for k, v in result.items():
+                    if isinstance(v, (dict, list)):
+                        continue
+                    name = '{}.{}'.format(action, k)
+                    if name not in metrics:
+                        metrics.append(name)
+                    row[name] = v
+            row.update(status=job['status'], checkpoint=job['checkpoint'])
+            rows.append(row)
+        table = Table(keys + ['status'] + metrics + ['checkpoint'])
+        for row in rows:
+            table.add_row(row)
+        return table
+
+
+class SweepPool(object):
+    """
+    Runs `sweep.pool.actions` for each point in `sweep.grid` in a pool of
+    `sweep.pool.workers` processes, each pinned to its own subset of CPUs.
+
+    Jobs and results are kept in the `SweepStore` at `sweep.pool.store`,
+    and each job saves its configuration, log and checkpoints in a
+    directory named after its hash, next to the store.  Finished jobs are
+    never run again, and jobs interrupted by a crash are requeued when the
+    sweep is restarted.  Only configuration keys can be swept, as each job
+    builds its own graph.
+    """
+    _poll_interval = 5
+
+    def __init__(self, config, commands):
+        super().__init__()
+        pool = config.get('sweep.pool', {})
+        self.workers = pool.get('workers', 1)
+        self.actions = list(pool.get('actions', ['eval']))
+        self.store = SweepStore(pool.get('store', 'sweep.db'))
+        self.directory = os.path.splitext(os.path.abspath(self.store.path))[0]
+        for action in self.actions:
+            if action not in commands or action == 'sweep':
+                raise ValueError(
+                    'Unrecognized sweep action {!r}.'.format(action))
+        self.keys = []
+        grid = config.get('sweep.grid') or []
+        for axis in grid:
+            if 'key' not in axis:
+                raise ValueError(
+                    'Sweeping in a pool of processes supports only '
+                    'configuration keys, found axis {!r}.'.format(axis))
+            self.keys.append(axis['key'])
+        values = (axis['values'] for axis in grid)
+        self.hashes = []
+        self._add_jobs(config, list(itertools.product(*values)))
+
+    def _add_jobs(self, config, points):
+        # the sweep description is not part of jobs
+        sweep = config.asdict(eval=False).pop('sweep')
+        config._invalidate()
+        try:
+            for point in points:
+                point = dict(zip(self.keys, point))
+                with _overridden(config, point):
+                    text = config.to_yaml()
+                    resolved = yaml.dump(config.asdict())
+                key = self.store.add(point, text, self.actions, resolved)
+                self.hashes.append(key)
+        finally:
+            config.asdict(eval=False)['sweep'] = sweep
+            config._invalidate()
+
+    def _spawn(self, cpus):
+        return spawn('mayo.sweep', self.store.path, self.directory, cpus=cpus)
+
+    def run(self):
+        recovered = self.store.recover()
+        if recovered:
+            log.info('Requeued {} interrupted jobs.'.format(recovered))
+        total = self.store.count('pending')
+        log.info(
+            'Running {} jobs with {} workers...'
+            .format(total, min(total, self.workers)))
+        workers = {}
+        for cpus in cpu_subsets(self.workers)[:total]:
+            workers[self._spawn(cpus)] = cpus
+        try:
+            while workers:
+                time.sleep(self._poll_interval)
+                for worker, cpus in list(workers.items()):
+                    code = worker.poll()
+                    if code is None:
+                        continue
+                    del workers[worker]
+                    if code == 0:
+                        continue
+                    self.store.abandon(
+                        worker.pid,
+                        'Worker exited with code {}.'.format(code))
+                    if self.store.count('pending'):
+                        workers[self._spawn(cpus)] = cpus
+                pending = self.store.count('pending')
+                log.info(
+                    'Sweep: {}/{} jobs started.'
+                    .format(total - pending, total), update=True)
+        except KeyboardInterrupt:
+            log.info('Stopping workers, unfinished jobs resume next time.')
+            for worker in workers:
+                worker.terminate()
+            for worker in workers:
+                worker.wait()
+        log.info(
+            'Sweep: {} jobs done, {} failed.'.format(
+                self.store.count('done'), self.store.count('failed')))
+        return self.store.table(self.keys, self.hashes)
+
+
+def _run_job(job, directory):
+    from mayo.cli import CLI
+    cli = CLI()
+    path = os.path.join(directory, 'config.yaml')
+    with open(path, 'w') as f:
+        f.write(job['config'])
+    cli.config.yaml_update(path)
+    # keeps checkpoints of jobs apart
+    search_path = cli.config.system.search_path.checkpoint
+    load = [directory] + list(search_path.load)
+    cli.config['system.search_path.checkpoint.save'] = [directory]
+    cli.config['system.search_path.checkpoint.load'] = load
+    commands = cli.commands()
+    results = {}
+    for action in json.loads(job['actions']):
+        log.key('Executing command {!r}...'.format(action))
+        results[action] = commands[action]()
+    info = None
+    if cli.session is not None:
+        info = cli.session.info(plumbing=True)
+    return results, info
+
+
+def _work(path, directory):
+    """Runs jobs from the store at `path` until none is pending.  """
+    store = SweepStore(path)
+    while True:
+        job = store.claim(os.getpid())
+        if job is None:
+            return
+        job_directory = os.path.join(directory, job['hash'][:16])
+        os.makedirs(job_directory, exist_ok=True)
+        # redirects all outputs of the job, including TensorFlow's
+        sys.stdout.flush()
+        sys.stderr.flush()
+        with open(os.path.join(job_directory, 'log'), 'a') as f:
+            os.dup2(f.fileno(), sys.stdout.fileno())
+            os.dup2(f.fileno(), sys.stderr.fileno())
+        try:
+            results, info = _run_job(job, job_directory)
+        except (Exception, SystemExit):
+            traceback.print_exc()
+            store.finish(job['hash'], 'failed', error=traceback.format_exc())
+            continue
+        finally:
+            sys.stdout.flush()
+            sys.stderr.flush()
+        checkpoint = None
+        if any(f.startswith('checkpoint') for f in os.listdir(job_directory)):
+            checkpoint = job_directory
+        store.finish(
+            job['hash'], 'done', results=_json(results), info=_json(info),
+            checkpoint=checkpoint)
+
+
+if __name__ == '__main__':
+    _work(*sys.argv[1:3])
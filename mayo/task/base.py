@@ -115,6 +115,12 @@ class TFTaskBase(object):
             'Please impelement .post_eval() which computes an info dict '
             'for the evaluation metrics.')
 
+    def eval_counts(self):
+        raise NotImplementedError(
+            'Please implement .eval_counts() which returns the sums of the '
+            'evaluation metrics, and the number of examples as "total", '
+            'for merging evaluation results across shards.')
+
     def test(self, name, prediction):
         raise NotImplementedError(
             'Please implement .test() which produces human-readable output '
@@ -94,10 +94,10 @@ class Classify(ImageTaskBase):
                 tensor, name, 'eval', history='infinite',
                 formatter=functools.partial(formatter, name=name))
 
-    def post_eval(self):
-        stats = {}
-        num_examples = self.session.num_examples
-        num_remaining = num_examples % self.session.batch_size
+    def eval_counts(self):
+        counts = {}
+        batch_size = self.session.batch_size
+        num_remaining = self.session.num_examples % batch_size or batch_size
         for key in ('top1', 'top5'):
             history = self.estimator.get_history(key, 'eval')
             history[-1] = history[-1][:num_remaining]
@@ -105,13 +105,21 @@ class Classify(ImageTaskBase):
             for h in history:
                 valids += np.sum(h)
                 total += len(h)
-            stats[key] = Percent(valids / total)
+            counts[key] = float(valids)
+            counts['total'] = total
+        return counts
+
+    def post_eval(self):
+        counts = self.eval_counts()
+        stats = {}
+        for key in ('top1', 'top5'):
+            stats[key] = Percent(counts[key] / counts['total'])
             self.estimator.flush(key, 'eval')
             self.estimator.add(stats, 'accuracy', 'eval')
             self._formatted_history = {}
         log.info(
             '    top1: {}, top5: {} [{} images]'
-            .format(stats['top1'], stats['top5'], num_examples))
+            .format(stats['top1'], stats['top5'], counts['total']))
         return stats
 
     def test(self, names, inputs, predictions):
@@ -117,7 +117,13 @@ class Preprocess(object):
         # file names
         num_gpus = self.system.num_gpus
         batch_size = self.system.batch_size_per_gpu * num_gpus
-        dataset = tf.data.Dataset.from_tensor_slices(self.files)
+        shard = self.system.preprocess.get('shard', {})
+        num_shards = shard.get('num', 1)
+        files = self.files
+        if num_shards > 1:
+            # all shards must agree on the order of records
+            files = sorted(files)
+        dataset = tf.data.Dataset.from_tensor_slices(files)
         if self.mode == 'train':
             # shuffle .tfrecord files
             dataset = dataset.shuffle(buffer_size=len(self.files))
@@ -127,6 +133,9 @@ class Preprocess(object):
         else:
             # tfrecord files to images
             dataset = dataset.flat_map(tf.data.TFRecordDataset)
+            if num_shards > 1:
+                # records are sharded before they are decoded
+                dataset = dataset.shard(num_shards, shard.get('index', 0))
             dataset = dataset.repeat()
             func = self._preprocess_records
 
@@ -1,5 +1,7 @@
 import collections
 
+from mayo.util.common import is_tf_instance
+
 
 def unique(items):
     found = set()
@@ -21,8 +23,9 @@ def flatten(items, skip_none=False):
 
 
 def ensure_list(item_or_list):
-    import tensorflow as tf
-    if isinstance(item_or_list, (str, collections.Mapping, tf.Tensor)):
+    if isinstance(item_or_list, (str, collections.Mapping)):
+        return [item_or_list]
+    if is_tf_instance(item_or_list, 'Tensor'):
         return [item_or_list]
     if isinstance(item_or_list, list):
         return item_or_list
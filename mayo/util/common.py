@@ -1,15 +1,22 @@
+import sys
 import types
 import functools
 import contextlib
 
-import tensorflow as tf
-
 
 class ShapeError(ValueError):
     """Incorrect shape.  """
 
 
+def is_tf_instance(value, name):
+    # avoid importing TensorFlow, which is slow, as the value cannot be
+    # one of its objects if it is not yet imported
+    tf = sys.modules.get('tensorflow')
+    return tf is not None and isinstance(value, getattr(tf, name))
+
+
 def map_fn(func, inputs, dtype=None, static=False):
+    import tensorflow as tf
     if not static:
         return tf.map_fn(func, inputs, dtype=dtype)
     inputs = [tf.unstack(i, axis=0) for i in inputs]
@@ -21,6 +28,7 @@ def map_fn(func, inputs, dtype=None, static=False):
 
 def pad_to_shape(tensor, shape, default_value=0):
     # FIXME annoying hack for batching different sized shapes
+    import tensorflow as tf
     tensor_shape = tf.unstack(tf.shape(tensor))
     paddings = [
         [0, max_size - size]
@@ -1,7 +1,7 @@
 import math
 import collections
 
-import tensorflow as tf
+from mayo.util.common import is_tf_instance
 
 
 def format_shape(shape):
@@ -158,9 +158,9 @@ class Table(collections.Sequence):
         elif isinstance(value, float):
             value = '{:{width}.{prec}}'.format(
                 value, width=width or 0, prec=3)
-        elif isinstance(value, tf.Variable):
+        elif is_tf_instance(value, 'Variable'):
             value = value.name
-        elif isinstance(value, tf.TensorShape):
+        elif is_tf_instance(value, 'TensorShape'):
             value = format_shape(value)
         elif isinstance(value, (list, tuple)):
             value = ', '.join(self._format_value(v) for v in value)
@@ -221,9 +221,9 @@ class Table(collections.Sequence):
             return {
                 self._plumb_value(k): self._plumb_value(v)
                 for k, v in value.items()}
-        if isinstance(value, tf.Variable):
+        if is_tf_instance(value, 'Variable'):
             return value.name
-        if isinstance(value, tf.TensorShape):
+        if is_tf_instance(value, 'TensorShape'):
             return [int(s) for s in value]
         return str(value)
 
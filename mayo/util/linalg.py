@@ -0,0 +1,25 @@
+import numpy as np
+
+
+def truncated_svd(matrix, rank, oversampling=10, iterations=2, seed=None):
+    """
+    Computes the top-`rank` singular triplets of `matrix` with a randomized
+    range finder (Halko et al., 2011), falling back to a thin SVD when the
+    sketch would not be smaller than the matrix.
+    """
+    rows, columns = matrix.shape
+    sketch = rank + oversampling
+    if sketch >= min(rows, columns):
+        left, singular, right = np.linalg.svd(matrix, full_matrices=False)
+        return left[:, :rank], singular[:rank], right[:rank]
+    random = np.random.RandomState(seed)
+    projection = random.randn(columns, sketch).astype(matrix.dtype)
+    basis, _ = np.linalg.qr(matrix.dot(projection))
+    # power iterations sharpen the decay of the singular values
+    for _ in range(iterations):
+        basis, _ = np.linalg.qr(matrix.T.dot(basis))
+        basis, _ = np.linalg.qr(matrix.dot(basis))
+    left, singular, right = np.linalg.svd(
+        basis.T.dot(matrix), full_matrices=False)
+    left = basis.dot(left)
+    return left[:, :rank], singular[:rank], right[:rank]
@@ -1,5 +1,7 @@
 import os
+import types
 import functools
+import importlib
 import collections
 from importlib.util import spec_from_file_location, module_from_spec
 
@@ -31,7 +33,13 @@ def import_from_dot_path(path, m=None):
         except KeyError:
             m = __import__(root)
     for c in components:
-        m = getattr(m, c)
+        try:
+            m = getattr(m, c)
+        except AttributeError:
+            if not isinstance(m, types.ModuleType):
+                raise
+            # submodules are not necessarily imported with their packages
+            m = importlib.import_module('{}.{}'.format(m.__name__, c))
     return m
 
 
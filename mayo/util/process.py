@@ -0,0 +1,37 @@
+import os
+import sys
+import functools
+import subprocess
+
+
+def cpu_subsets(num):
+    """
+    Splits the CPUs available to this process into `num` contiguous subsets,
+    or gives empty subsets if CPU affinity is not supported.
+    """
+    try:
+        cpus = sorted(os.sched_getaffinity(0))
+    except AttributeError:
+        return [[]] * num
+    if num >= len(cpus):
+        return [[cpus[i % len(cpus)]] for i in range(num)]
+    size = len(cpus) // num
+    return [cpus[i * size:(i + 1) * size] for i in range(num)]
+
+
+def spawn(module, *args, cpus=None, **kwargs):
+    """
+    Runs `python -m <module> <args>...` in a new process pinned to `cpus`,
+    where the process can import mayo without relying on the working
+    directory.  `kwargs` are passed to `subprocess.Popen`.
+    """
+    root = os.path.dirname(os.path.dirname(os.path.dirname(
+        os.path.abspath(__file__))))
+    paths = [root] + os.environ.get('PYTHONPATH', '').split(os.pathsep)
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(paths))
+    command = [sys.executable, '-m', module] + [str(a) for a in args]
+    preexec_fn = None
+    if cpus and hasattr(os, 'sched_setaffinity'):
+        preexec_fn = functools.partial(os.sched_setaffinity, 0, cpus)
+    return subprocess.Popen(
+        command, env=env, preexec_fn=preexec_fn, **kwargs)
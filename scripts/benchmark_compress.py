@@ -0,0 +1,64 @@
+"""
+Benchmarks loading packed-integer codes against loading the same number of
+raw float32 values.
+
+Usage: python scripts/benchmark_compress.py [size] [repeat]
+"""
+import os
+import sys
+import time
+import tempfile
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from mayo import compress  # noqa
+
+
+def measure(func, repeat):
+    func()
+    durations = []
+    for _ in range(repeat):
+        start = time.time()
+        func()
+        durations.append(time.time() - start)
+    return min(durations)
+
+
+def benchmark(directory, width, size, repeat):
+    codes = np.random.randint(0, 2 ** width, size=size, dtype=np.int64)
+    data = compress.pack_bits(codes, width)
+    path = os.path.join(directory, 'codes' + compress.suffix)
+    entry = {
+        'name': 'codes', 'shape': [size], 'dtype': '<f4',
+        'codec': 'fixed', 'params': {'width': width, 'point': 0},
+        'bits': width,
+    }
+    compress.save(path, [(entry, data)])
+    unpack = measure(lambda: compress.unpack_bits(data, width, size), repeat)
+    load = measure(lambda: compress.load_codes(path), repeat)
+    identical = np.array_equal(compress.load_codes(path)['codes'][0], codes)
+    return unpack, load, identical
+
+
+def main():
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 4 * 1024 * 1024
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'raw.npy')
+        np.save(path, np.random.randn(size).astype(np.float32))
+        raw = measure(lambda: np.load(path), repeat)
+        print('{:>6} {:>12} {:>12} {:>10} {:>10}'.format(
+            'width', 'unpack (ms)', 'load (ms)', 'vs. raw', 'identical'))
+        print('{:>6} {:>12} {:>12.3f} {:>10} {:>10}'.format(
+            'raw', '', raw * 1000, '1.00x', ''))
+        for width in [1, 2, 3, 4, 5, 6, 8, 12, 13, 16, 24, 31, 32]:
+            unpack, load, identical = benchmark(
+                directory, width, size, repeat)
+            print('{:>6} {:>12.3f} {:>12.3f} {:>10} {:>10}'.format(
+                width, unpack * 1000, load * 1000,
+                '{:.2f}x'.format(load / raw), str(identical)))
+
+
+if __name__ == '__main__':
+    main()
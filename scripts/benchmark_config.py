@@ -0,0 +1,73 @@
+"""
+Measures the time to assemble a configuration from YAML files, with files
+parsed from scratch and from the parsed-YAML cache, the time of frequently
+accessed configuration keys, with values resolved from scratch and from the
+resolved-value cache, and the time to build the graph of a model from its
+configuration.
+
+Usage: python scripts/benchmark_config.py [model] [dataset] [repeat]
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from mayo.config import Config  # noqa
+from mayo.parse import _yaml_cache  # noqa
+from mayo.net.graph import Graph  # noqa
+
+
+keys = [
+    'system.batch_size_per_gpu',
+    'system.num_gpus',
+    'system.search_path.checkpoint.load',
+    'model.name',
+    'model.layers',
+    'dataset.task.preprocess',
+]
+
+
+def measure(func, repeat, setup=None):
+    durations = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        start = time.time()
+        func()
+        durations.append(time.time() - start)
+    return min(durations)
+
+
+def main():
+    model, dataset, repeat = sys.argv[1:] + [
+        'models/resnet_v2_50.yaml', 'datasets/imagenet.yaml', '1000',
+    ][len(sys.argv) - 1:]
+    repeat = int(repeat)
+
+    def assemble():
+        config = Config()
+        config.yaml_update(model)
+        config.yaml_update(dataset)
+        return config
+
+    assembly_repeat = max(repeat // 100, 1)
+    parsed = measure(assemble, assembly_repeat, _yaml_cache.clear)
+    cached = measure(assemble, assembly_repeat)
+    print('{:<40} {:>15} {:>15}'.format('', 'parsed (ms)', 'cached (ms)'))
+    print('{:<40} {:>15.2f} {:>15.2f}'.format(
+        'assembly', parsed * 1000, cached * 1000))
+    config = assemble()
+    print('{:<40} {:>15} {:>15}'.format(
+        'key', 'resolved (us)', 'cached (us)'))
+    for key in keys:
+        func = lambda: config[key]
+        resolved = measure(func, repeat, config._invalidate)
+        cached = measure(func, repeat)
+        print('{:<40} {:>15.2f} {:>15.2f}'.format(
+            key, resolved * 1e6, cached * 1e6))
+    duration = measure(lambda: Graph(config.model), assembly_repeat)
+    print('{:<40} {:>15.2f}'.format('graph (ms)', duration * 1000))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+"""
+Measures the CPU latency of sparse gated convolutions, which compute only
+active output channels, against dense convolutions followed by masking, at
+several gate densities.
+
+Usage: python scripts/benchmark_gate.py [batch] [size] [channels] [repeat]
+"""
+import os
+import sys
+import time
+
+import numpy as np
+import tensorflow as tf
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from mayo.net.tf.gate.base import sparse_convolution  # noqa
+
+
+def measure(session, tensor, repeat):
+    session.run(tensor)
+    durations = []
+    for _ in range(repeat):
+        start = time.time()
+        session.run(tensor)
+        durations.append(time.time() - start)
+    return min(durations)
+
+
+def benchmark(batch, size, channels, density, repeat, kernel=3):
+    graph = tf.Graph()
+    with graph.as_default():
+        inputs = tf.constant(np.random.randn(
+            batch, size, size, channels).astype(np.float32))
+        weights = tf.constant(np.random.randn(
+            kernel, kernel, channels, channels).astype(np.float32))
+        # the top channels of random gate responses are active
+        gamma = np.random.rand(batch, channels)
+        num_active = int(np.ceil(channels * density))
+        threshold = -np.sort(-gamma, axis=1)[:, num_active - 1:num_active]
+        actives = tf.constant(gamma >= threshold)
+        mask = tf.cast(actives, tf.float32)[:, None, None, :]
+        dense = mask * tf.nn.conv2d(inputs, weights, [1, 1, 1, 1], 'SAME')
+        sparse = sparse_convolution(inputs, weights, actives, 1, 'SAME')
+        error = tf.reduce_max(tf.abs(dense - sparse))
+    with tf.Session(graph=graph) as session:
+        dense_time = measure(session, dense, repeat)
+        sparse_time = measure(session, sparse, repeat)
+        error = session.run(error)
+    macs = batch * size * size * kernel * kernel * channels * num_active
+    return macs, dense_time, sparse_time, error
+
+
+def main():
+    args = [int(a) for a in sys.argv[1:]]
+    batch, size, channels, repeat = args + [32, 16, 256, 10][len(args):]
+    print('{:>8} {:>14} {:>11} {:>12} {:>8} {:>10}'.format(
+        'density', 'macs', 'dense (ms)', 'sparse (ms)', 'speedup', 'error'))
+    for density in (0.1, 0.25, 0.5, 0.75, 1.0):
+        macs, dense, sparse, error = benchmark(
+            batch, size, channels, density, repeat)
+        row = '{:>8.2f} {:>14,} {:>11.3f} {:>12.3f} {:>7.2f}x {:>10.2e}'
+        print(row.format(
+            density, macs, dense * 1000, sparse * 1000, dense / sparse,
+            error))
+
+
+if __name__ == '__main__':
+    main()
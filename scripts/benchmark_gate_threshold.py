@@ -0,0 +1,68 @@
+"""
+Compares the histogram-based global gate threshold estimator against the
+exact top-k threshold on random gate responses of ResNet-50-like layers, in
+terms of threshold error, deviation from the target density and CPU time.
+
+Usage: python scripts/benchmark_gate_threshold.py [batch] [bins] [repeat]
+"""
+import os
+import sys
+import time
+
+import numpy as np
+import tensorflow as tf
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from mayo.net.tf.gate.base import (  # noqa
+    top_k_threshold, histogram_threshold)
+
+
+channels = [64] * 6 + [128] * 8 + [256] * 12 + [512] * 6 + [2048] * 3
+
+
+def measure(session, tensor, repeat):
+    session.run(tensor)
+    durations = []
+    for _ in range(repeat):
+        start = time.time()
+        session.run(tensor)
+        durations.append(time.time() - start)
+    return min(durations)
+
+
+def benchmark(batch, bins, density, repeat):
+    graph = tf.Graph()
+    with graph.as_default():
+        gammas = [
+            tf.constant(np.abs(np.random.randn(batch, c)).astype(np.float32))
+            for c in channels]
+        exact = top_k_threshold(gammas, density)
+        approx = histogram_threshold(gammas, density, bins)
+        flattened = tf.concat(gammas, axis=-1)
+        densities = [
+            tf.reduce_mean(tf.cast(flattened > t, tf.float32), axis=-1)
+            for t in (exact, approx)]
+    with tf.Session(graph=graph) as session:
+        exact_time = measure(session, exact, repeat)
+        approx_time = measure(session, approx, repeat)
+        exact, approx, densities = session.run([exact, approx, densities])
+    error = np.max(np.abs(exact - approx))
+    density_error = np.max(np.abs(densities[1] - densities[0]))
+    return error, density_error, exact_time, approx_time
+
+
+def main():
+    args = [int(a) for a in sys.argv[1:]]
+    batch, bins, repeat = args + [64, 1024, 10][len(args):]
+    print('{:>8} {:>12} {:>14} {:>11} {:>15}'.format(
+        'density', 'max error', 'density error', 'exact (ms)',
+        'histogram (ms)'))
+    for density in (0.1, 0.25, 0.5, 0.75, 0.9):
+        error, density_error, exact, approx = benchmark(
+            batch, bins, density, repeat)
+        print('{:>8.2f} {:>12.2e} {:>14.2e} {:>11.3f} {:>15.3f}'.format(
+            density, error, density_error, exact * 1000, approx * 1000))
+
+
+if __name__ == '__main__':
+    main()
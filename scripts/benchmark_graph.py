@@ -0,0 +1,71 @@
+"""
+Measures the time to build the graph of every model in `models/`, i.e.
+parsing the model description, simplifying and validating the graph,
+which happens before any TensorFlow operation is created, and the time to
+restore it from a snapshot with `system.graph_cache.enable=true`.
+
+Usage: python scripts/benchmark_graph.py [repeat] [dataset]
+"""
+import os
+import sys
+import glob
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from mayo.config import Config  # noqa
+from mayo.net.graph import Graph, cached_graph  # noqa
+
+
+def model_config(path, dataset):
+    config = Config()
+    config.yaml_update(path)
+    model = config.get('model', {})
+    if 'name' not in model or 'layers' not in model:
+        # not a complete model description
+        return None
+    # some models refer to dataset properties
+    config.yaml_update(dataset)
+    return config
+
+
+def measure(func, model, repeat):
+    durations = []
+    for _ in range(repeat):
+        start = time.time()
+        graph = func(model)
+        durations.append(time.time() - start)
+    return graph, min(durations)
+
+
+def main():
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+    dataset = sys.argv[2] if len(sys.argv) > 2 else 'datasets/imagenet.yaml'
+    root = os.path.join(os.path.dirname(__file__), '..')
+    paths = sorted(glob.glob(
+        os.path.join(root, 'models', '**', '*.yaml'), recursive=True))
+    print('{:<48} {:>6} {:>6} {:>10} {:>13}'.format(
+        'model', 'nodes', 'edges', 'time (ms)', 'restore (ms)'))
+    total = total_restore = 0
+    for path in paths:
+        name = os.path.relpath(path, root)
+        try:
+            config = model_config(path, os.path.join(root, dataset))
+            if config is None:
+                continue
+            graph, duration = measure(Graph, config.model, repeat)
+            # the first call takes the snapshot
+            _, restore = measure(cached_graph, config.model, repeat + 1)
+        except Exception as e:
+            print('{:<48} failed: {!r}'.format(name, e))
+            continue
+        total += duration
+        total_restore += restore
+        print('{:<48} {:>6} {:>6} {:>10.2f} {:>13.2f}'.format(
+            name, len(graph.nx_graph), graph.nx_graph.number_of_edges(),
+            duration * 1000, restore * 1000))
+    print('{:<48} {:>6} {:>6} {:>10.2f} {:>13.2f}'.format(
+        'total', '', '', total * 1000, total_restore * 1000))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+"""
+Benchmarks the butterfly Walsh-Hadamard transform against the dense matrix
+multiplication and the recursive split/concat transform it replaces.
+
+Usage: python scripts/benchmark_hadamard.py [batch] [repeat]
+"""
+import os
+import sys
+import time
+
+import numpy as np
+import tensorflow as tf
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from mayo.net.tf.hadamard import dense_hadamard, walsh_hadamard  # noqa
+
+
+def recursive_hadamard(value):
+    # the previous implementation, kept for comparison
+    channels = int(value.shape[-1])
+    if channels == 1:
+        return value
+    lower, upper = tf.split(value, 2, axis=-1)
+    lower, upper = lower + upper, lower - upper
+    lower = recursive_hadamard(lower)
+    upper = recursive_hadamard(upper)
+    return tf.concat((lower, upper), axis=-1)
+
+
+def measure(session, tensor, feed, repeat):
+    session.run(tensor, feed)
+    durations = []
+    for _ in range(repeat):
+        start = time.time()
+        session.run(tensor, feed)
+        durations.append(time.time() - start)
+    return min(durations)
+
+
+def benchmark(channels, batch, repeat):
+    graph = tf.Graph()
+    with graph.as_default():
+        value = tf.placeholder(tf.float32, [None, channels])
+        transforms = {}
+        nodes = {}
+        for name, func in [
+                ('dense', dense_hadamard),
+                ('recursive', recursive_hadamard),
+                ('butterfly', walsh_hadamard)]:
+            count = len(graph.get_operations())
+            transforms[name] = func(value)
+            nodes[name] = len(graph.get_operations()) - count
+    feed = {value: np.random.randn(batch, channels).astype(np.float32)}
+    results = {}
+    with tf.Session(graph=graph) as session:
+        outputs = session.run(transforms, feed)
+        for name, tensor in transforms.items():
+            results[name] = measure(session, tensor, feed, repeat)
+    identical = np.array_equal(outputs['recursive'], outputs['butterfly'])
+    return results, nodes, identical
+
+
+def main():
+    batch = int(sys.argv[1]) if len(sys.argv) > 1 else 1024
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    names = ['dense', 'recursive', 'butterfly']
+    print('{:>8} {:>30} {:>30} {:>10}'.format(
+        'channels', 'time (ms): ' + '/'.join(names),
+        'graph nodes: ' + '/'.join(names), 'identical'))
+    for log_channels in range(4, 12):
+        channels = 2 ** log_channels
+        results, nodes, identical = benchmark(channels, batch, repeat)
+        times = '/'.join('{:.3f}'.format(results[n] * 1000) for n in names)
+        counts = '/'.join(str(nodes[n]) for n in names)
+        print('{:>8} {:>30} {:>30} {:>10}'.format(
+            channels, times, counts, str(identical)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+"""
+Measures the start-up time of the command line interface for commands that
+do not need TensorFlow, i.e. `./my --help` and `./my <yaml>... export`, and
+reports whether each of them imports TensorFlow.
+
+Usage: python scripts/benchmark_startup.py [repeat] [yaml]...
+"""
+import os
+import sys
+import time
+import tempfile
+import subprocess
+
+
+root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+# runs `my.py` and reports if TensorFlow is imported on exit
+runner = """
+import atexit, runpy, sys
+atexit.register(lambda: print('tensorflow' in sys.modules, file=sys.stderr))
+sys.argv = sys.argv[1:]
+runpy.run_path(sys.argv[0], run_name='__main__')
+"""
+
+
+def measure(args, repeat):
+    command = [sys.executable, '-c', runner, os.path.join(root, 'my.py')]
+    command += args
+    # runs in a temporary directory to keep exported files out of the way
+    paths = [root] + os.environ.get('PYTHONPATH', '').split(os.pathsep)
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(paths))
+    durations = []
+    with tempfile.TemporaryDirectory() as path:
+        for _ in range(repeat):
+            start = time.time()
+            process = subprocess.run(
+                command, cwd=path, env=env,
+                stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+            durations.append(time.time() - start)
+    errors = process.stderr.decode('utf-8').strip().splitlines()
+    if process.returncode or not errors:
+        raise RuntimeError(
+            'Command {!r} failed:\n{}'.format(
+                ' '.join(args), '\n'.join(errors)))
+    return min(durations), errors[-1] == 'True'
+
+
+def main():
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    yamls = sys.argv[2:] or ['models/lenet5.yaml', 'datasets/mnist.yaml']
+    yamls = [os.path.abspath(y) for y in yamls]
+    commands = {
+        'my --help': ['--help'],
+        'my <yaml> export': yamls + ['export'],
+    }
+    print('{:<20} {:>10} {:>12}'.format('command', 'time (s)', 'tensorflow'))
+    for name, args in commands.items():
+        duration, imported = measure(args, repeat)
+        print('{:<20} {:>10.3f} {:>12}'.format(
+            name, duration, 'imported' if imported else '-'))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,118 @@
+import os
+import tempfile
+
+import numpy as np
+
+from common import TestCase
+
+from mayo import compress
+
+
+class TestCodecs(TestCase):
+    def setUp(self):
+        self.random = np.random.RandomState(0)
+
+    def test_pack_bits(self):
+        for width in (1, 3, 8, 13, 32):
+            codes = self.random.randint(0, 2 ** width, size=37)
+            data = compress.pack_bits(codes, width)
+            self.assertEqual(data.size, (37 * width + 7) // 8)
+            unpacked = compress.unpack_bits(data, width, codes.size)
+            np.testing.assert_array_equal(unpacked, codes)
+
+    def test_bit_order(self):
+        # codes are concatenated least significant bit first
+        for width in range(1, 35):
+            codes = self.random.randint(0, 2 ** width, size=21, dtype=np.int64)
+            bits = [(int(c) >> i) & 1 for c in codes for i in range(width)]
+            bits += [0] * (-len(bits) % 8)
+            expected = [
+                sum(b << i for i, b in enumerate(bits[i:i + 8]))
+                for i in range(0, len(bits), 8)]
+            data = compress.pack_bits(codes, width)
+            np.testing.assert_array_equal(data, expected)
+            np.testing.assert_array_equal(
+                compress.unpack_bits(data, width, codes.size), codes)
+
+    def test_byte_aligned(self):
+        for width, dtype in [(8, '<u1'), (16, '<u2'), (32, '<u4')]:
+            codes = self.random.randint(
+                0, 2 ** width, size=13, dtype=np.int64).astype(dtype)
+            data = compress.pack_bits(codes, width)
+            self.assertEqual(data.tobytes(), codes.tobytes())
+            unpacked = compress.unpack_bits(data, width, codes.size)
+            self.assertEqual(unpacked.dtype, codes.dtype)
+            np.testing.assert_array_equal(unpacked, codes)
+
+    def _round_trip(self, codec, value, params, bits):
+        encode, decode = compress._codecs[codec]
+        codes, width = encode(value, **params)
+        self.assertEqual(width, bits)
+        self.assertTrue(np.all(codes >= 0))
+        self.assertTrue(np.all(codes < 2 ** width))
+        packed = compress.pack_bits(codes, width)
+        codes = compress.unpack_bits(packed, width, value.size)
+        np.testing.assert_array_equal(
+            decode(codes, value.shape, **params), value)
+
+    def test_fixed(self):
+        # 8-bit values with 2 integral bits are multiples of 1 / 64 in [-2, 2)
+        value = self.random.randint(-128, 128, size=(3, 5)) / 64
+        self._round_trip('fixed', value, {'width': 8, 'point': 2}, 8)
+
+    def test_shift(self):
+        # 3-bit exponents with a bias of 4 represent 2 ** [-4, 3]
+        exponent = self.random.randint(-4, 4, size=(4, 6))
+        sign = self.random.choice([-1, 0, 1], size=(4, 6))
+        value = sign * 2.0 ** exponent
+        self._round_trip(
+            'shift', value, {'width': 3, 'exponent_bias': 4}, 5)
+
+    def test_ternary(self):
+        scale = [0.5, 0.25, 1.5]
+        value = self.random.choice([-1, 0, 1], size=(2, 3)) * 4 * np.array(
+            scale)
+        self._round_trip('ternary', value, {'base': 2, 'scale': scale}, 2)
+
+
+class TestContainer(TestCase):
+    def setUp(self):
+        self.temp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.temp.name, 'model' + compress.suffix)
+
+    def tearDown(self):
+        self.temp.cleanup()
+
+    def test_save_load(self):
+        random = np.random.RandomState(0)
+        weights = (random.randint(-8, 8, size=(3, 3, 2, 4)) / 4).astype(
+            np.float32)
+        biases = random.randn(4).astype(np.float32)
+        params = {'width': 4, 'point': 2}
+        codes, bits = compress.encode_fixed(weights, **params)
+        entries = [
+            ({'name': 'conv/weights', 'shape': list(weights.shape),
+              'dtype': weights.dtype.str, 'codec': 'fixed',
+              'params': params, 'bits': bits},
+             compress.pack_bits(codes, bits)),
+            ({'name': 'conv/biases', 'shape': [4],
+              'dtype': biases.dtype.str, 'codec': 'raw'},
+             biases),
+        ]
+        compress.save(self.path, entries)
+        values = compress.load(self.path)
+        self.assertEqual(list(values), ['conv/weights', 'conv/biases'])
+        np.testing.assert_array_equal(values['conv/weights'], weights)
+        self.assertEqual(values['conv/weights'].dtype, np.float32)
+        np.testing.assert_array_equal(values['conv/biases'], biases)
+        loaded, entry = compress.load_codes(self.path)['conv/weights']
+        np.testing.assert_array_equal(loaded, codes.reshape(weights.shape))
+        self.assertEqual(entry['params'], params)
+        # 72 4-bit codes
+        self.assertEqual(entry['nbytes'], 36)
+
+    def test_not_container(self):
+        with open(self.path, 'wb') as f:
+            f.write(b'\0' * 32)
+        with self.assertRaises(compress.CompressError):
+            compress.load(self.path)
@@ -1,8 +1,12 @@
+import os
+import tempfile
+
 from common import TestCase
 
 import yaml
 
-from mayo.config import ArithTag, _DotDict, BaseConfig, Config
+from mayo.config import Config
+from mayo.parse import ArithTag, _DotDict, ConfigBase, load_yaml
 
 
 class TestYamlTags(TestCase):
@@ -16,6 +20,27 @@ class TestYamlTags(TestCase):
         self.assertEqual(yaml.dump(tag).strip(), text)
 
 
+class TestLoadYaml(TestCase):
+    def test_cached_copy(self):
+        path = 'models/lenet5.yaml'
+        loaded = load_yaml(path)
+        loaded['model']['name'] = None
+        self.assertNotEqual(load_yaml(path)['model']['name'], None)
+
+    def test_modified(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'test.yaml')
+            with open(path, 'w') as f:
+                f.write('a: 1\n')
+            self.assertEqual(load_yaml(path), {'a': 1})
+            with open(path, 'w') as f:
+                f.write('a: 2\n')
+            # ensures the modification time changes on coarse filesystems
+            stat = os.stat(path)
+            os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+            self.assertEqual(load_yaml(path), {'a': 2})
+
+
 class TestDotDict(TestCase):
     def setUp(self):
         self.od = {'a': 1, 'b': {'c': 2}}
@@ -97,10 +122,26 @@ class TestDotDict(TestCase):
         d = _DotDict(od)
         self.assertEqual(d['a'], 2)
 
+    def test_link_after_set(self):
+        d = _DotDict({'a': '$(b.c)', 'b': {'c': 1}})
+        self.assertEqual(d.a, 1)
+        d.b.c = 2
+        self.assertEqual(d.a, 2)
+        d.merge({'b': {'c': 3}})
+        self.assertEqual(d.a, 3)
+        del d['b.c']
+        with self.assertRaises(KeyError):
+            d.a
+
+    def test_cached_list_copy(self):
+        d = _DotDict({'a': [1, [2]]})
+        d.a[1].append(3)
+        self.assertEqual(d.a, [1, [2]])
+
 
 class TestBaseConfig(TestCase):
     def setUp(self):
-        self.config = BaseConfig()
+        self.config = ConfigBase()
 
     def test_hook(self):
         def hook():
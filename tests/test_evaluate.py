@@ -0,0 +1,126 @@
+import os
+import tempfile
+
+from common import TestCase
+
+from mayo.config import Config
+from mayo.evaluate import EvalCache, eval_range, shard_size
+from mayo.util import Percent
+from mayo.util.process import cpu_subsets
+
+
+class _Checkpoint(object):
+    def __init__(self, directory):
+        self.path = directory
+
+    def directory(self):
+        return self.path
+
+    def index_file(self, epoch):
+        return os.path.join(self.path, 'checkpoint-{}.index'.format(epoch))
+
+
+class TestEvalCache(TestCase):
+    def setUp(self):
+        self.temp = tempfile.TemporaryDirectory()
+        self.checkpoint = _Checkpoint(self.temp.name)
+        self.config = {'model': {'name': 'lenet5'}, 'system': {'num_gpus': 1}}
+        for epoch in (1, 2):
+            self._write_index(epoch, 'tensors at {}'.format(epoch))
+
+    def tearDown(self):
+        self.temp.cleanup()
+
+    def _write_index(self, epoch, content):
+        with open(self.checkpoint.index_file(epoch), 'w') as f:
+            f.write(content)
+
+    def _cache(self):
+        return EvalCache(self.config, self.checkpoint)
+
+    def test_get(self):
+        self._cache().set(1, {'top1': 0.5})
+        cache = self._cache()
+        stats = cache.get(1)
+        self.assertEqual(stats, {'top1': 0.5, 'epoch': 1})
+        self.assertIsInstance(stats['top1'], Percent)
+        self.assertNotIsInstance(stats['epoch'], Percent)
+        self.assertIsNone(cache.get(2))
+
+    def test_index_changed(self):
+        self._cache().set(1, {'top1': 0.5})
+        self._write_index(1, 'retrained tensors')
+        self.assertIsNone(self._cache().get(1))
+
+    def test_config_changed(self):
+        self._cache().set(1, {'top1': 0.5})
+        self.config['model'] = {'name': 'alexnet'}
+        self.assertIsNone(self._cache().get(1))
+
+    def test_config_ignored(self):
+        self._cache().set(1, {'top1': 0.5})
+        self.config['system'] = {'num_gpus': 2}
+        self.config['eval'] = {'workers': 4}
+        self.assertIsNotNone(self._cache().get(1))
+
+    def test_corrupted(self):
+        with open(os.path.join(self.temp.name, EvalCache.file_name), 'w') as f:
+            f.write('{')
+        self.assertIsNone(self._cache().get(1))
+
+
+class TestEvalRange(TestCase):
+    def _range(self, epochs, **kwargs):
+        config = Config()
+        if kwargs:
+            config.eval = {'range': kwargs}
+        return list(eval_range(config, epochs))
+
+    def test_range(self):
+        epochs = list(range(10))
+        self.assertEqual(self._range(epochs), epochs)
+        self.assertEqual(self._range(epochs, **{'from': 7}), [7, 8, 9])
+        self.assertEqual(self._range(epochs, to=2), [0, 1, 2])
+        self.assertEqual(self._range(epochs, step=3), [0, 3, 6, 9])
+        self.assertEqual(
+            self._range(epochs, **{'from': 2, 'to': 8, 'step': 2}),
+            [2, 4, 6, 8])
+
+
+class TestShardSize(TestCase):
+    def test_sizes(self):
+        for num_examples in (1, 7, 10, 50000):
+            for num_shards in range(1, min(num_examples, 8) + 1):
+                records = list(range(num_examples))
+                sizes = [
+                    shard_size(num_examples, num_shards, i)
+                    for i in range(num_shards)]
+                expected = [
+                    len(records[i::num_shards]) for i in range(num_shards)]
+                self.assertEqual(sizes, expected)
+                self.assertEqual(sum(sizes), num_examples)
+
+
+class TestCpuSubsets(TestCase):
+    def setUp(self):
+        try:
+            self.cpus = sorted(os.sched_getaffinity(0))
+        except AttributeError:
+            self.skipTest('CPU affinity is not supported.')
+
+    def test_disjoint(self):
+        num = max(1, len(self.cpus) // 2)
+        subsets = cpu_subsets(num)
+        self.assertEqual(len(subsets), num)
+        cpus = [c for s in subsets for c in s]
+        self.assertEqual(len(cpus), len(set(cpus)))
+        self.assertTrue(set(cpus) <= set(self.cpus))
+        self.assertTrue(all(subsets))
+
+    def test_oversubscribed(self):
+        num = len(self.cpus) + 1
+        subsets = cpu_subsets(num)
+        self.assertEqual(len(subsets), num)
+        for s in subsets:
+            self.assertEqual(len(s), 1)
+            self.assertIn(s[0], self.cpus)
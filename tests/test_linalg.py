@@ -0,0 +1,42 @@
+import numpy as np
+
+from common import TestCase
+
+from mayo.util.linalg import truncated_svd
+
+
+class TestTruncatedSVD(TestCase):
+    def _matrix(self, rows, columns):
+        random = np.random.RandomState(0)
+        left, _ = np.linalg.qr(random.randn(rows, rows))
+        right, _ = np.linalg.qr(random.randn(columns, columns))
+        # quickly decaying singular values
+        full = min(rows, columns)
+        singular = np.zeros((rows, columns))
+        singular[range(full), range(full)] = 0.5 ** np.arange(full)
+        return left.dot(singular).dot(right)
+
+    def _check(self, matrix, rank):
+        left, singular, right = truncated_svd(matrix, rank, seed=0)
+        self.assertEqual(left.shape, (matrix.shape[0], rank))
+        self.assertEqual(singular.shape, (rank, ))
+        self.assertEqual(right.shape, (rank, matrix.shape[1]))
+        _, expected, _ = np.linalg.svd(matrix, full_matrices=False)
+        np.testing.assert_allclose(singular, expected[:rank], rtol=1e-6)
+        # the best rank-r approximation has the residual of the remaining
+        # singular values
+        residual = matrix - (left * singular).dot(right)
+        np.testing.assert_allclose(
+            np.linalg.norm(residual), np.linalg.norm(expected[rank:]),
+            atol=1e-6)
+        np.testing.assert_allclose(
+            left.T.dot(left), np.eye(rank), atol=1e-6)
+        np.testing.assert_allclose(
+            right.dot(right.T), np.eye(rank), atol=1e-6)
+
+    def test_randomized(self):
+        self._check(self._matrix(200, 120), 8)
+
+    def test_thin(self):
+        # the sketch is not smaller than the matrix
+        self._check(self._matrix(30, 12), 4)
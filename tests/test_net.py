@@ -2,7 +2,9 @@ from common import TestCase
 
 import types
 import itertools
+import collections
 
+import numpy as np
 import networkx as nx
 import tensorflow as tf
 from tensorflow.contrib import slim
@@ -11,8 +13,12 @@ from mayo.config import Config
 from mayo.net.graph import Graph, TensorNode, LayerNode, JoinNode
 from mayo.net.base import NetBase
 from mayo.net.tf import TFNet
+from mayo.net.numpy import NumPyNet
+from mayo.net.static import StaticNet
+from mayo.net.tf.estimate import weight_statistics
 from mayo.net.tf.transform import ParameterTransformer
-from mayo.override import FixedPointQuantizer
+from mayo.override import (
+    ChainOverrider, FixedPointQuantizer, MeanStdPruner)
 
 
 class TestGraph(TestCase):
@@ -279,3 +285,69 @@ class TestTFNet(TestCase):
         net = TFNet(config.model, images, None, 10, False, False)
         logits = net.logits()
         self.assertSequenceEqual(logits.shape, [1, 10])
+
+
+class TestNumPyNet(TestCase):
+    model = {
+        'name': 'test',
+        'layers': {
+            'conv': {
+                'type': 'convolution', 'kernel_size': 3, 'stride': 2,
+                'padding': 'same', 'num_outputs': 4},
+            'pool': {
+                'type': 'average_pool', 'kernel_size': 2, 'stride': 2,
+                'padding': 'same'},
+        },
+        'graph': {'from': 'input', 'with': ['conv', 'pool'], 'to': 'output'},
+    }
+
+    def test_convolution_pool(self):
+        inputs = np.random.randn(2, 9, 9, 3).astype(np.float32)
+        variables = {
+            'test/conv/weights':
+                np.random.randn(3, 3, 3, 4).astype(np.float32),
+            'test/conv/biases': np.random.randn(4).astype(np.float32),
+        }
+        net = NumPyNet(self.model, {'input': inputs}, variables)
+        with tf.Graph().as_default(), tf.Session() as session:
+            tensor = tf.nn.conv2d(
+                inputs, variables['test/conv/weights'],
+                [1, 2, 2, 1], 'SAME')
+            tensor = tf.nn.relu(tensor + variables['test/conv/biases'])
+            tensor = tf.nn.avg_pool(tensor, [1, 2, 2, 1], [1, 2, 2, 1], 'SAME')
+            expected = session.run(tensor)
+        np.testing.assert_allclose(
+            net.outputs()['output'], expected, rtol=1e-4, atol=1e-5)
+
+
+class TestWeightStatistics(TestCase):
+    def test_static_agrees(self):
+        # the static estimator and the TensorFlow estimator with overrider
+        # infos use the same density and bit-width
+        config = Config()
+        config.yaml_update('models/lenet5.yaml')
+        config.yaml_update('datasets/mnist.yaml')
+        config['model.layers.conv0.overrider'] = {'weights': {
+            'dns': {'type': 'mayo.override.MeanStdPruner'},
+            'fixed': {
+                'type': 'mayo.override.FixedPointQuantizer',
+                'width': 6, 'point': 2},
+        }}
+        mask = np.arange(5 * 5 * 1 * 20).reshape(5, 5, 1, 20) % 4 == 0
+        net = StaticNet(config.model, {'input': (1, 28, 28, 1)})
+        node = {n.name: n for n in net.shapes()}['conv0']
+        net._variables['{}/weights/MeanStdPruner.mask'.format(
+            node.formatted_name())] = mask
+        pruner = MeanStdPruner(None)
+        quantizer = FixedPointQuantizer(None, width=6, point=2)
+        PrunerInfo = collections.namedtuple('PrunerInfo', ['density'])
+        QuantizerInfo = collections.namedtuple(
+            'QuantizerInfo', ['width', 'point'])
+        infos = {
+            pruner: PrunerInfo(density=mask.mean()),
+            quantizer: QuantizerInfo(width=6, point=2),
+        }
+        overrider = ChainOverrider(None, [pruner, quantizer])
+        expected = net._weight_statistics(node)
+        self.assertEqual(expected, (0.25, 6))
+        self.assertEqual(weight_statistics(overrider, infos), expected)
@@ -0,0 +1,116 @@
+import sys
+import subprocess
+
+import numpy as np
+import scipy.linalg
+
+from common import TestCase
+
+from mayo.net.numpy import NumPyNet
+from mayo.net.numpy.hadamard import walsh_hadamard
+from mayo.net.numpy.integer import integer_type, fraction_bits, accumulate
+
+
+class TestImport(TestCase):
+    def test_without_tensorflow(self):
+        code = (
+            'import sys\n'
+            'import mayo.net.numpy, mayo.compress, mayo.net.static\n'
+            'print("tensorflow" in sys.modules)\n')
+        output = subprocess.check_output([sys.executable, '-c', code])
+        self.assertEqual(output.decode().strip(), 'False')
+
+
+class TestInteger(TestCase):
+    def test_integer_type(self):
+        self.assertEqual(integer_type(8), np.int8)
+        self.assertEqual(integer_type(9), np.int16)
+        self.assertEqual(integer_type(32), np.int32)
+        self.assertEqual(integer_type(33), np.int64)
+
+    def test_fraction_bits(self):
+        self.assertEqual(fraction_bits(np.zeros(4)), (0, 0))
+        # 0.375 = 0.011b, 5 = 101b
+        self.assertEqual(fraction_bits(np.array([0.375, -5.0])), (3, 3))
+        self.assertEqual(fraction_bits(np.array([2.0, 4.0])), (-1, 3))
+
+    def test_accumulate(self):
+        acc = np.array([-9, -8, -1, 0, 7, 8, 20], dtype=np.int64)
+        # 4-bit accumulators hold [-8, 7]
+        saturated, overflows = accumulate(acc, 4, saturate=True)
+        self.assertEqual(overflows, 3)
+        self.assertEqual(list(saturated), [-8, -8, -1, 0, 7, 7, 7])
+        wrapped, overflows = accumulate(acc, 4, saturate=False)
+        self.assertEqual(overflows, 3)
+        self.assertEqual(list(wrapped), [7, -8, -1, 0, 7, -8, 4])
+
+    def test_accumulate_in_range(self):
+        acc = np.arange(-128, 128)
+        result, overflows = accumulate(acc, 8)
+        self.assertEqual(overflows, 0)
+        self.assertIs(result, acc)
+
+
+class TestWalshHadamard(TestCase):
+    def test_butterfly(self):
+        random = np.random.RandomState(0)
+        for channels in (2, 8, 64, 256):
+            value = random.randn(3, 5, channels)
+            expected = value @ scipy.linalg.hadamard(channels)
+            for block in (0, 1, 4, channels):
+                np.testing.assert_allclose(
+                    walsh_hadamard(value, block), expected, atol=1e-9)
+
+    def test_integer(self):
+        # butterfly stages of integers are exact
+        value = np.arange(4 * 32).reshape(4, 32)
+        np.testing.assert_array_equal(
+            walsh_hadamard(value), value @ scipy.linalg.hadamard(32))
+
+
+class TestGroupedConvolution(TestCase):
+    def _model(self, groups, num_outputs):
+        conv = {
+            'type': 'convolution', 'kernel_size': 3, 'padding': 'valid',
+            'num_outputs': num_outputs, 'num_groups': groups,
+            'activation_fn': None, 'biases_initializer': None,
+        }
+        return {
+            'name': 'grouped',
+            'layers': {'conv': conv},
+            'graph': {'from': 'input', 'with': 'conv', 'to': 'output'},
+        }
+
+    @staticmethod
+    def _convolve(value, weights):
+        n, h, w, _ = value.shape
+        kh, kw, _, channels = weights.shape
+        output = np.zeros((n, h - kh + 1, w - kw + 1, channels))
+        for i in range(output.shape[1]):
+            for j in range(output.shape[2]):
+                window = value[:, i:i + kh, j:j + kw, :]
+                output[:, i, j] = np.tensordot(window, weights, axes=3)
+        return output
+
+    def _check(self, channels, groups, multiplier):
+        random = np.random.RandomState(0)
+        value = random.randn(2, 6, 6, channels)
+        weights = random.randn(
+            3, 3, channels // groups, groups * multiplier)
+        variables = {'grouped/conv/groupwise_weights': weights}
+        model = self._model(groups, groups * multiplier)
+        output = NumPyNet(model, {'input': value}, variables).outputs()
+        # the i-th slice of outputs convolves the i-th group of inputs
+        expected = np.concatenate([
+            self._convolve(v, w) for v, w in zip(
+                np.split(value, groups, axis=-1),
+                np.split(weights, groups, axis=-1))], axis=-1)
+        np.testing.assert_allclose(output['output'], expected, atol=1e-9)
+
+    def test_groups(self):
+        self._check(8, 4, 3)
+
+    def test_depthwise(self):
+        # single-channel groups produce M outputs for each channel in turn,
+        # the output order of a depthwise convolution
+        self._check(4, 4, 2)
@@ -3,6 +3,7 @@ from common import TestCase
 import tensorflow as tf
 
 from mayo.override.base import OverriderBase, Parameter
+from mayo.override.lra import LowRankApproximation
 
 
 class VariableMock(object):
@@ -54,3 +55,31 @@ class TestParameter(TestCase):
         expect_var = VariableMock(
             'scope/Overrider.test', (), var.initializer, tf.int32, True)
         self.assertObjectEqual(var, expect_var)
+
+
+class TestLowRankApproximation(TestCase):
+    def test_macs(self):
+        overrider = LowRankApproximation(None, rank=40)
+        # 3 x 3 convolution with 64 channels, 32 x 32 input
+        shape = [3, 3, 64, 64]
+        macs = overrider.macs(shape, [1, 32, 32, 64], [1, 32, 32, 64])
+        self.assertEqual(macs, (
+            32 * 32 * 3 * 3 * 64 * 64,
+            32 * 32 * 3 * 64 * 40 + 32 * 32 * 3 * 40 * 64))
+        self.assertTrue(
+            overrider.is_factored(shape, [1, 32, 32, 64], [1, 32, 32, 64]))
+        # the first layer does not stride along the width, and computes 4x
+        # as many columns as the output has
+        in_shape, out_shape = [1, 32, 32, 64], [1, 32, 8, 64]
+        macs = overrider.macs(shape, in_shape, out_shape)
+        self.assertEqual(macs, (
+            32 * 8 * 3 * 3 * 64 * 64,
+            32 * 32 * 3 * 64 * 40 + 32 * 8 * 3 * 40 * 64))
+        self.assertFalse(overrider.is_factored(shape, in_shape, out_shape))
+
+    def test_fully_connected(self):
+        overrider = LowRankApproximation(None, rank=10)
+        macs = overrider.macs([100, 50], [1, 100], [1, 50])
+        self.assertEqual(macs, (100 * 50, 10 * (100 + 50)))
+        overrider.factored = False
+        self.assertFalse(overrider.is_factored([100, 50], [1, 100], [1, 50]))
@@ -0,0 +1,96 @@
+import numpy as np
+
+from common import TestCase
+
+from mayo.config import Config
+from mayo.net.graph import LayerNode
+from mayo.net.static import StaticNet
+from mayo.session.search import Search
+
+
+class _Task(object):
+    def __init__(self, net):
+        self.nets = [net]
+
+
+class _Estimator(object):
+    def get_value(self, name, mode):
+        return 1
+
+
+class _Search(Search):
+    """A search session with a static network in place of TensorFlow.  """
+    def __init__(self, config, net):
+        self.config = config
+        self.task = _Task(net)
+        self.estimator = _Estimator()
+        self.tolerable_baseline = 0
+        names = ('conv0', 'conv1', 'fc1', 'logits')
+        self.targets = {
+            node: {} for node in net._graph.nodes()
+            if isinstance(node, LayerNode) and node.name in names}
+        self._train_op = None
+        self._changed_nodes = None
+        self._epoch = 0
+
+    def __del__(self):
+        pass
+
+    def _key(self, node):
+        return '{}/weights/DynamicNetworkSurgeryPruner.mask'.format(
+            node.formatted_name())
+
+    def assign(self, node, density):
+        mask = np.zeros(100)
+        mask[:int(density * 100)] = 1
+        self.task.nets[0]._variables[self._key(node)] = mask
+
+    def reset_num_epochs(self):
+        pass
+
+    def overriders_update(self):
+        # updates masks of all layers
+        for i, node in enumerate(sorted(self.targets, key=str)):
+            self.assign(node, 0.1 * (i + 1) + 0.05 * self._epoch)
+
+    def run(self, ops, batch=False):
+        self._epoch += 1
+        return 1, None
+
+    def set_backtrack_to_here(self):
+        pass
+
+
+class TestSearch(TestCase):
+    def setUp(self):
+        self.config = Config()
+        self.config.yaml_update('models/override/lenet5.yaml')
+        self.config.yaml_update('models/override/prune/dns.yaml')
+        self.config.yaml_update('datasets/mnist.yaml')
+        self.config.search = {
+            'cost_key': 'weights', 'max_epochs': {'fine_tune': 1}}
+        self.inputs = {'input': (1, 28, 28, 1)}
+        self.net = StaticNet(self.config.model, self.inputs)
+        self.search = _Search(self.config, self.net)
+
+    def _full_priority(self):
+        net = StaticNet(self.config.model, self.inputs, self.net._variables)
+        priority = [
+            (str(node), stats['weights'])
+            for node, stats in net.estimate().items()
+            if node in self.search.targets]
+        return list(reversed(sorted(priority, key=lambda v: v[1])))
+
+    def assertPriority(self):
+        priority = [(str(n), p) for n, p in self.search._priority()]
+        self.assertEqual(priority, self._full_priority())
+
+    def test_priority_after_update(self):
+        self.assertPriority()
+        for i in range(4):
+            node, _ = self.search._priority()[0]
+            self.search.assign(node, 0.02 * (i + 1))
+            self.search._changed_nodes.add(node)
+            self.assertPriority()
+            self.search.fine_tune()
+            self.assertPriority()
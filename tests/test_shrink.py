@@ -0,0 +1,127 @@
+import numpy as np
+
+from common import TestCase
+
+from mayo.config import Config
+from mayo.net.static import StaticNet
+from mayo.shrink import Shrink, ShrinkError
+
+
+class _Net(StaticNet):
+    overriders = {}
+
+
+class _Task(object):
+    def __init__(self, net):
+        self.nets = [net]
+
+
+class _Variable(object):
+    def __init__(self, name):
+        self.op = self
+        self.name = name
+
+
+class _Session(object):
+    def __init__(self, net, variables=None):
+        self.task = _Task(net)
+        self.variables = variables or {}
+
+    def global_variables(self):
+        return [_Variable(name) for name in self.variables]
+
+    def run(self, fetches):
+        return {k: self.variables[v.op.name] for k, v in fetches.items()}
+
+
+class TestShrink(TestCase):
+    def setUp(self):
+        self.config = Config()
+        self.config.yaml_update('models/lenet5.yaml')
+        self.config.yaml_update('datasets/mnist.yaml')
+        self._shrink()
+
+    def _shrink(self, variables=None):
+        net = _Net(self.config.model, {'input': (1, 28, 28, 1)})
+        self.nodes = {
+            str(n.name): n for n in net.shapes() if n.name != 'input'}
+        self.shrink = Shrink(_Session(net, variables), self.config)
+
+    def _keep(self, channels, kept):
+        keep = np.zeros(channels, dtype=bool)
+        keep[kept] = True
+        return keep
+
+    def test_propagate(self):
+        conv0 = self._keep(20, range(0, 20, 2))
+        conv1 = self._keep(50, range(5))
+        self.shrink._masks = {
+            self.nodes['conv0']: conv0, self.nodes['conv1']: conv1}
+        slices = {
+            str(n.name): s for n, s in self.shrink._propagate().items()}
+        self.assertEqual(
+            set(slices), {'conv0', 'conv1', 'fc1', 'logits'})
+        in_keep, out_keep = slices['conv0']
+        self.assertTrue(np.all(in_keep))
+        np.testing.assert_array_equal(out_keep, conv0)
+        in_keep, out_keep = slices['conv1']
+        np.testing.assert_array_equal(in_keep, conv0)
+        np.testing.assert_array_equal(out_keep, conv1)
+        # NHWC flattening of [4, 4, 50] repeats the mask for each pixel
+        in_keep, out_keep = slices['fc1']
+        np.testing.assert_array_equal(in_keep, np.tile(conv1, 16))
+        self.assertTrue(np.all(out_keep))
+        model = self.shrink._shrunk_model()
+        self.assertEqual(model['layers']['conv0']['num_outputs'], 10)
+        self.assertEqual(model['layers']['conv1']['num_outputs'], 5)
+        self.assertEqual(model['layers']['fc1']['num_outputs'], 500)
+
+    def test_slice(self):
+        in_keep = self._keep(4, [0, 3])
+        out_keep = self._keep(6, [1, 2, 5])
+        weights = np.arange(3 * 3 * 4 * 6).reshape(3, 3, 4, 6)
+        sliced = Shrink._slice(weights, in_keep, out_keep)
+        self.assertEqual(sliced.shape, (3, 3, 2, 3))
+        np.testing.assert_array_equal(
+            sliced, weights[:, :, [0, 3]][..., [1, 2, 5]])
+        biases = np.arange(6)
+        np.testing.assert_array_equal(
+            Shrink._slice(biases, in_keep, out_keep), [1, 2, 5])
+        # variables without matching channels are kept
+        step = np.array(10)
+        self.assertIs(Shrink._slice(step, in_keep, out_keep), step)
+
+    def test_unsupported(self):
+        # layers of other types cannot consume partially kept channels
+        self.shrink._masks = {self.nodes['conv1']: self._keep(50, [0])}
+        self.nodes['pool1'].params['type'] = 'softmax'
+        with self.assertRaises(ShrinkError):
+            self.shrink._propagate()
+
+    def test_batch_normalization(self):
+        # standalone batch normalization after a pruned convolution
+        self.config['model.layers.bn0'] = {'type': 'batch_normalization'}
+        self.config['model.graph.with'] = [
+            'prep', 'conv0', 'bn0', 'pool0', 'conv1', 'pool1', 'flatten',
+            'dropout', 'fc1', 'logits']
+        variables = {
+            'lenet5/conv0/weights': np.ones((5, 5, 1, 20)),
+            'lenet5/bn0/gamma': np.arange(20.0),
+            'lenet5/bn0/moving_variance': np.arange(20.0),
+            'lenet5/conv1/weights': np.ones((5, 5, 20, 50)),
+            'global_step': np.array(100),
+        }
+        self._shrink(variables)
+        conv0 = self._keep(20, range(0, 20, 4))
+        self.shrink._masks = {self.nodes['conv0']: conv0}
+        self.shrink._propagate()
+        values = self.shrink._sliced_variables()
+        self.assertEqual(values['lenet5/conv0/weights'].shape, (5, 5, 1, 5))
+        for name in ('gamma', 'moving_variance'):
+            np.testing.assert_array_equal(
+                values['lenet5/bn0/' + name], [0, 4, 8, 12, 16])
+        self.assertEqual(values['lenet5/conv1/weights'].shape, (5, 5, 5, 50))
+        self.assertEqual(values['global_step'], 100)
+        model = self.shrink._shrunk_model()
+        self.assertEqual(model['layers']['conv0']['num_outputs'], 5)
+        self.assertNotIn('num_outputs', model['layers']['bn0'])
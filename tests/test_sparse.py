@@ -0,0 +1,62 @@
+import os
+import tempfile
+
+import numpy as np
+
+from common import TestCase
+
+from mayo import sparse
+
+
+class TestSparse(TestCase):
+    def setUp(self):
+        random = np.random.RandomState(0)
+        self.weights = random.randn(3, 3, 8, 16).astype(np.float32)
+        self.weights[random.rand(*self.weights.shape) < 0.8] = 0
+
+    def test_round_trip(self):
+        layer = sparse.encode(self.weights)
+        np.testing.assert_array_equal(sparse.decode(layer), self.weights)
+        np.testing.assert_array_equal(
+            sparse.decode_mask(layer), self.weights != 0)
+        self.assertEqual(layer['indices'].dtype, np.uint16)
+        self.assertAlmostEqual(
+            sparse.density(layer), np.mean(self.weights != 0))
+
+    def test_matrix(self):
+        layer = sparse.encode(self.weights)
+        # rows are output channels
+        matrix = self.weights.reshape(-1, 16).T
+        np.testing.assert_array_equal(
+            sparse.csr_matrix(layer).toarray(), matrix)
+        indices = sparse.coo_indices(layer)
+        np.testing.assert_array_equal(
+            indices, np.stack(np.nonzero(matrix), axis=1))
+
+    def test_empty(self):
+        layer = sparse.encode(np.zeros((4, 5), dtype=np.float32))
+        self.assertEqual(layer['values'].size, 0)
+        np.testing.assert_array_equal(sparse.decode(layer), np.zeros((4, 5)))
+
+    def test_save_load(self):
+        layers = {
+            'net/conv0': sparse.encode(self.weights),
+            'net/fc': sparse.encode(self.weights.reshape(72, 16)),
+        }
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'sparse.npz')
+            sparse.save(path, layers)
+            loaded = sparse.load(path)
+        self.assertEqual(set(loaded), set(layers))
+        for name, layer in layers.items():
+            np.testing.assert_array_equal(
+                sparse.decode(loaded[name]), sparse.decode(layer))
+
+    def test_sparse_executable(self):
+        self.assertTrue(sparse.sparse_executable({'type': 'fully_connected'}))
+        self.assertTrue(sparse.sparse_executable(
+            {'type': 'convolution', 'kernel_size': 1}))
+        self.assertFalse(sparse.sparse_executable(
+            {'type': 'convolution', 'kernel_size': 3}))
+        self.assertFalse(sparse.sparse_executable(
+            {'type': 'convolution', 'kernel_size': 1, 'num_groups': 2}))
@@ -0,0 +1,58 @@
+from common import TestCase
+
+from mayo.config import Config
+from mayo.net.static import StaticNet
+
+
+class TestStaticNet(TestCase):
+    def _net(self, model):
+        config = Config()
+        config.yaml_update(model)
+        config.yaml_update('datasets/mnist.yaml')
+        return StaticNet(config.model, {'input': (1, 28, 28, 1)})
+
+    @staticmethod
+    def _by_name(values):
+        return {str(node.name): value for node, value in values.items()}
+
+    def test_shapes(self):
+        shapes = self._by_name(self._net('models/lenet5.yaml').shapes())
+        expected = {
+            'conv0': (1, 24, 24, 20),
+            'pool0': (1, 12, 12, 20),
+            'conv1': (1, 8, 8, 50),
+            'pool1': (1, 4, 4, 50),
+            'flatten': (1, 800),
+            'fc1': (1, 500),
+            'logits': (1, 10),
+        }
+        for name, shape in expected.items():
+            self.assertEqual(tuple(shapes[name]), shape)
+
+    def test_estimate(self):
+        info = self._by_name(self._net('models/lenet5.yaml').estimate())
+        expected = {
+            # K_h x K_w x C_in x H x W x C_out
+            'conv0': (5 * 5 * 1 * 24 * 24 * 20, 5 * 5 * 1 * 20 + 20),
+            'conv1': (5 * 5 * 20 * 8 * 8 * 50, 5 * 5 * 20 * 50 + 50),
+            'fc1': (800 * 500, 800 * 500),
+            'logits': (500 * 10, 500 * 10),
+        }
+        for name, (macs, weights) in expected.items():
+            self.assertEqual(info[name]['macs'], macs)
+            self.assertEqual(info[name]['weights'], weights)
+
+    def test_gate_overhead(self):
+        info = self._by_name(self._net('models/gate/lenet5.yaml').estimate())
+        # gate predictor C_in x C_out with biases, and gamma multiplication
+        overhead = {
+            'conv0': (1 * 20 + 24 * 24 * 20, 1 * 20 + 20),
+            'conv1': (20 * 50 + 8 * 8 * 50, 20 * 50 + 50),
+        }
+        layer = {
+            'conv0': (5 * 5 * 1 * 24 * 24 * 20, 5 * 5 * 1 * 20 + 20),
+            'conv1': (5 * 5 * 20 * 8 * 8 * 50, 5 * 5 * 20 * 50 + 50),
+        }
+        for name, (macs, weights) in overhead.items():
+            self.assertEqual(info[name]['macs'], layer[name][0] + macs)
+            self.assertEqual(info[name]['weights'], layer[name][1] + weights)
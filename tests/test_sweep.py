@@ -0,0 +1,152 @@
+import os
+import tempfile
+
+from common import TestCase
+
+from mayo.config import Config
+from mayo.net.graph import Graph
+from mayo.sweep import Sweep, SweepError, SweepStore, _overridden
+
+
+class TestSweepStore(TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        path = os.path.join(self.directory.name, 'sweep.db')
+        self.store = SweepStore(path)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_deduplicate(self):
+        first = self.store.add({'a': 1}, 'a: 1', ['eval'])
+        second = self.store.add({'a': 1}, 'a: 1', ['eval'])
+        self.assertEqual(first, second)
+        self.assertEqual(self.store.count('pending'), 1)
+        self.store.add({'a': 1}, 'a: 1', ['train', 'eval'])
+        self.assertEqual(self.store.count('pending'), 2)
+
+    def test_deduplicate_resolved(self):
+        first = self.store.add(
+            {'a': 1}, 'a: 1\nb: $(a)', ['eval'], 'a: 1\nb: 1')
+        second = self.store.add({'b': 1}, 'a: 1\nb: 1', ['eval'])
+        self.assertEqual(first, second)
+        self.assertEqual(self.store.count('pending'), 1)
+
+    def test_claim_and_finish(self):
+        key = self.store.add({'a': 1}, 'a: 1', ['eval'])
+        job = self.store.claim(os.getpid())
+        self.assertEqual(job['hash'], key)
+        self.assertEqual(self.store.claim(os.getpid()), None)
+        self.store.finish(key, 'done', results='{"eval": {"top1": 0.5}}')
+        table = self.store.table(['a'], [key])
+        expected = 'a, status, eval.top1, checkpoint\n1, done, 0.5, None'
+        self.assertEqual(table.csv(), expected)
+
+    def test_recover(self):
+        self.store.add({'a': 1}, 'a: 1', ['eval'])
+        self.store.add({'a': 2}, 'a: 2', ['eval'])
+        self.store.claim(os.getpid())
+        # a process that cannot exist
+        self.store.claim(2 ** 22 + 1)
+        self.assertEqual(self.store.recover(), 1)
+        self.assertEqual(self.store.count('pending'), 1)
+        self.assertEqual(self.store.count('running'), 1)
+
+
+class TestOverridden(TestCase):
+    def test_restore(self):
+        config = Config()
+        config.override_update('foo.x', '1')
+        config.override_update('foo.y', '$(foo.x)')
+        values = {'foo.y': 3, 'foo.z.w': 4, 'bar.baz': 5}
+        with _overridden(config, values):
+            self.assertEqual(config['foo.y'], 3)
+            self.assertEqual(config['foo.z.w'], 4)
+            self.assertEqual(config['bar.baz'], 5)
+        mapping = config.asdict(eval=False)
+        self.assertEqual(mapping['foo'], {'x': 1, 'y': '$(foo.x)'})
+        self.assertNotIn('bar', mapping)
+        config['foo.x'] = 2
+        self.assertEqual(config['foo.y'], 2)
+
+
+class FixedPointQuantizer(object):
+    parameters = {'width': None, 'point': None}
+
+    def __init__(self, name):
+        self.name = name
+
+
+class _Session(object):
+    def __init__(self, config):
+        graph = Graph(config.model)
+        self.nodes = {n.name: n for n in graph.layer_nodes()}
+        self.overriders = {}
+        for node in graph.layer_nodes():
+            if node.params.get('overrider'):
+                name = '{}/weights/FixedPointQuantizer'.format(
+                    node.formatted_name())
+                self.overriders[node] = {
+                    'weights': FixedPointQuantizer(name)}
+
+
+class TestSweepPlan(TestCase):
+    def _sweep(self, yamls, grid):
+        config = Config()
+        for path in yamls:
+            config.yaml_update(path)
+        config.yaml_update('datasets/mnist.yaml')
+        config['sweep.grid'] = grid
+        session = _Session(config)
+        return session, Sweep(session, config)
+
+    def _gate_sweep(self, grid):
+        return self._sweep(['models/gate/lenet5.yaml'], grid)
+
+    def _fixed_sweep(self, grid):
+        yamls = [
+            'models/override/lenet5.yaml',
+            'models/override/quantize/fixed.yaml']
+        return self._sweep(yamls, grid)
+
+    def test_density(self):
+        grid = [{'key': '_gate.density', 'values': [0.5, 0.8]}]
+        session, sweep = self._gate_sweep(grid)
+        self.assertEqual(sweep.points, [(0.5, ), (0.8, )])
+        nodes = [session.nodes[n] for n in ('conv0', 'conv1')]
+        for plan, density in zip(sweep._plans, (0.5, 0.8)):
+            expected = {(('density', n), density) for n in nodes}
+            self.assertEqual(set(plan), expected)
+
+    def test_reject(self):
+        for key, values in [
+                ('_gate.policy', ['parametric', 'naive']),
+                ('model.layers.conv0.num_outputs', [16, 32])]:
+            grid = [{'key': key, 'values': values}]
+            with self.assertRaises(SweepError):
+                self._gate_sweep(grid)
+
+    def test_config_overrider(self):
+        key = '_overrider.weights.fixed.width'
+        session, sweep = self._fixed_sweep([{'key': key, 'values': [4, 6]}])
+        for plan, width in zip(sweep._plans, (4, 6)):
+            targets = {t for t, v in plan if v == width}
+            nodes = {t[1] for t in targets}
+            self.assertEqual(nodes, set(session.overriders))
+            expected = (('weights', ), 'FixedPointQuantizer', 'width')
+            for target in targets:
+                self.assertEqual(target[2:], expected)
+
+    def test_regex(self):
+        grid = [
+            {'regex': r'conv0/.*\.point', 'values': [1, 2]},
+            {'key': '_overrider.weights.fixed.width', 'values': [4]}]
+        session, sweep = self._fixed_sweep(grid)
+        self.assertEqual(len(sweep._plans), 2)
+        conv0 = session.nodes['conv0']
+        target = ('overrider', conv0, ('weights', ), 'FixedPointQuantizer')
+        for plan, point in zip(sweep._plans, (1, 2)):
+            self.assertIn((target + ('point', ), point), plan)
+            self.assertIn((target + ('width', ), 4), plan)
+        with self.assertRaises(SweepError):
+            self._fixed_sweep([{'regex': 'nothing', 'values': [1]}])